@@ -8,16 +8,18 @@ class AdminHandler:
     کلاس پایه پنل ادمین
     """
 
-    def __init__(self, bot, db_manager):
+    def __init__(self, bot, db_manager, router):
         """
         مقداردهی اولیه هندلر ادمین
 
         Args:
             bot (telebot.TeleBot): نمونه ربات تلگرام
             db_manager: مدیریت‌کننده پایگاه داده
+            router (UpdateRouter): مسیریاب مرکزی آپدیت‌ها
         """
         self.bot = bot
         self.db_manager = db_manager
+        self.router = router
         self.logger = logging.getLogger('chatogram.admin.AdminHandler')
 
         # ذخیره‌سازی داده‌های موقت
@@ -28,7 +30,7 @@ class AdminHandler:
         ثبت هندلرهای ادمین
         """
 
-        @self.bot.message_handler(commands=['admin'])
+        @self.router.message_handler(commands=['admin'])
         def handle_admin(message):
             try:
                 # بررسی دسترسی ادمین
@@ -47,9 +49,10 @@ class AdminHandler:
                 self.show_admin_main_menu(message.chat.id)
             except Exception as e:
                 self.logger.error(f"Error in admin handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # بازگشت به منوی اصلی ادمین
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_back_main")
+        @self.router.callback_query_handler(data="admin_back_main")
         def handle_admin_back_main(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -62,6 +65,7 @@ class AdminHandler:
                 self.show_admin_main_menu(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin back main handler: {str(e)}")
+                self.db_manager.mark_failed()
 
     def show_admin_main_menu(self, chat_id, message_id=None):
         """
@@ -122,7 +126,7 @@ class AdminHandler:
         Returns:
             int: تعداد کل کاربران
         """
-        conn = self.db_manager.get_connection()
+        conn = self.db_manager.get_read_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT COUNT(*) as count FROM users")
@@ -137,11 +141,11 @@ class AdminHandler:
         Returns:
             int: تعداد کاربران فعال امروز
         """
-        conn = self.db_manager.get_connection()
+        conn = self.db_manager.get_read_connection()
         cursor = conn.cursor()
 
         cursor.execute(
-            "SELECT COUNT(*) as count FROM users WHERE DATE(last_active) = DATE('now')"
+            "SELECT COUNT(*) as count FROM users WHERE last_active >= DATE('now')"
         )
         result = cursor.fetchone()
 
@@ -154,7 +158,7 @@ class AdminHandler:
         Returns:
             int: تعداد گزارشات در انتظار بررسی
         """
-        conn = self.db_manager.get_connection()
+        conn = self.db_manager.get_read_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT COUNT(*) as count FROM reports WHERE status = 'pending'")
@@ -169,7 +173,7 @@ class AdminHandler:
         Returns:
             int: تعداد چت‌های فعال
         """
-        conn = self.db_manager.get_connection()
+        conn = self.db_manager.get_read_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT COUNT(*) as count FROM chats WHERE is_active = 1")
@@ -197,7 +201,7 @@ class AdminHandler:
                 "INSERT INTO admin_logs (admin_id, action, details) VALUES (?, ?, ?)",
                 (admin_id, action, details)
             )
-            conn.commit()
+            self.db_manager.commit(conn)
 
             return True
         except Exception as e:
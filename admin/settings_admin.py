@@ -11,15 +11,16 @@ class SettingsAdmin(AdminHandler):
     کلاس مدیریت تنظیمات در پنل ادمین
     """
 
-    def __init__(self, bot, db_manager):
+    def __init__(self, bot, db_manager, router):
         """
         مقداردهی اولیه کلاس مدیریت تنظیمات
 
         Args:
             bot (telebot.TeleBot): نمونه ربات تلگرام
             db_manager: مدیریت‌کننده پایگاه داده
+            router (UpdateRouter): مسیریاب مرکزی آپدیت‌ها
         """
-        super().__init__(bot, db_manager)
+        super().__init__(bot, db_manager, router)
         self.logger = logging.getLogger('chatogram.admin.SettingsAdmin')
 
         # ذخیره‌سازی داده‌های موقت برای ویرایش تنظیمات
@@ -31,7 +32,7 @@ class SettingsAdmin(AdminHandler):
         """
 
         # منوی تنظیمات
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings")
+        @self.router.callback_query_handler(data="admin_settings")
         def handle_admin_settings(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -47,9 +48,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_settings_menu(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin settings handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات چت
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_chat")
+        @self.router.callback_query_handler(data="admin_settings_chat")
         def handle_admin_settings_chat(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -62,9 +64,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'chat')
             except Exception as e:
                 self.logger.error(f"Error in admin settings chat handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات جستجو
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_search")
+        @self.router.callback_query_handler(data="admin_settings_search")
         def handle_admin_settings_search(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -77,9 +80,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'search')
             except Exception as e:
                 self.logger.error(f"Error in admin settings search handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات پروفایل
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_profile")
+        @self.router.callback_query_handler(data="admin_settings_profile")
         def handle_admin_settings_profile(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -92,9 +96,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'profile')
             except Exception as e:
                 self.logger.error(f"Error in admin settings profile handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات سکه
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_coins")
+        @self.router.callback_query_handler(data="admin_settings_coins")
         def handle_admin_settings_coins(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -107,9 +112,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'economy')
             except Exception as e:
                 self.logger.error(f"Error in admin settings coins handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات سیستم
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_system")
+        @self.router.callback_query_handler(data="admin_settings_system")
         def handle_admin_settings_system(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -122,9 +128,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'system')
             except Exception as e:
                 self.logger.error(f"Error in admin settings system handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تنظیمات عمومی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_settings_general")
+        @self.router.callback_query_handler(data="admin_settings_general")
         def handle_admin_settings_general(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -137,9 +144,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'general')
             except Exception as e:
                 self.logger.error(f"Error in admin settings general handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # ویرایش تنظیم
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("admin_edit_setting_"))
+        @self.router.callback_query_handler(prefix="admin_edit_setting_")
         def handle_admin_edit_setting(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -155,9 +163,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_edit_setting_form(call.message.chat.id, call.message.message_id, setting_key)
             except Exception as e:
                 self.logger.error(f"Error in admin edit setting handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # بازگشت به منوی تنظیمات
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_back_to_settings")
+        @self.router.callback_query_handler(data="admin_back_to_settings")
         def handle_admin_back_to_settings(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -170,9 +179,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_settings_menu(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin back to settings handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # بازگشت به دسته تنظیمات
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("admin_back_to_category_"))
+        @self.router.callback_query_handler(prefix="admin_back_to_category_")
         def handle_admin_back_to_category(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -188,9 +198,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, category)
             except Exception as e:
                 self.logger.error(f"Error in admin back to category handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # فعال/غیرفعال کردن حالت تعمیر و نگهداری
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_toggle_maintenance")
+        @self.router.callback_query_handler(data="admin_toggle_maintenance")
         def handle_admin_toggle_maintenance(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -206,9 +217,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'system')
             except Exception as e:
                 self.logger.error(f"Error in admin toggle maintenance handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # ویرایش پیام خوش‌آمدگویی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_edit_welcome_message")
+        @self.router.callback_query_handler(data="admin_edit_welcome_message")
         def handle_admin_edit_welcome_message(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -227,9 +239,10 @@ class SettingsAdmin(AdminHandler):
                 self.bot.register_next_step_handler(msg, self.process_welcome_message)
             except Exception as e:
                 self.logger.error(f"Error in admin edit welcome message handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # فعال/غیرفعال کردن تأیید خودکار عکس پروفایل
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_toggle_auto_approve_pics")
+        @self.router.callback_query_handler(data="admin_toggle_auto_approve_pics")
         def handle_admin_toggle_auto_approve_pics(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -245,9 +258,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'profile')
             except Exception as e:
                 self.logger.error(f"Error in admin toggle auto approve pics handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # فعال/غیرفعال کردن فیلتر موقعیت مکانی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_toggle_location_filter")
+        @self.router.callback_query_handler(data="admin_toggle_location_filter")
         def handle_admin_toggle_location_filter(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -263,9 +277,10 @@ class SettingsAdmin(AdminHandler):
                 self.show_category_settings(call.message.chat.id, call.message.message_id, 'search')
             except Exception as e:
                 self.logger.error(f"Error in admin toggle location filter handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # ریست تنظیمات به حالت پیش‌فرض
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_reset_settings")
+        @self.router.callback_query_handler(data="admin_reset_settings")
         def handle_admin_reset_settings(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -291,9 +306,10 @@ class SettingsAdmin(AdminHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in admin reset settings handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تأیید ریست تنظیمات
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_confirm_reset_settings")
+        @self.router.callback_query_handler(data="admin_confirm_reset_settings")
         def handle_admin_confirm_reset_settings(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -329,6 +345,7 @@ class SettingsAdmin(AdminHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in admin confirm reset settings handler: {str(e)}")
+                self.db_manager.mark_failed()
 
     def show_settings_menu(self, chat_id, message_id=None):
         """
@@ -621,6 +638,7 @@ class SettingsAdmin(AdminHandler):
                 )
         except Exception as e:
             self.logger.error(f"Error in process edit setting: {str(e)}")
+            self.db_manager.mark_failed()
             self.bot.send_message(
                 message.chat.id,
                 "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -679,6 +697,7 @@ class SettingsAdmin(AdminHandler):
                 )
         except Exception as e:
             self.logger.error(f"Error in process welcome message: {str(e)}")
+            self.db_manager.mark_failed()
             self.bot.send_message(
                 message.chat.id,
                 "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -712,6 +731,7 @@ class SettingsAdmin(AdminHandler):
             return self.update_setting(admin_id, 'maintenance_mode', new_value)
         except Exception as e:
             self.logger.error(f"Error in toggle maintenance mode: {str(e)}")
+            self.db_manager.mark_failed()
             return False
 
     def toggle_setting(self, admin_id, setting_key):
@@ -740,6 +760,7 @@ class SettingsAdmin(AdminHandler):
             return self.update_setting(admin_id, setting_key, new_value)
         except Exception as e:
             self.logger.error(f"Error in toggle setting: {str(e)}")
+            self.db_manager.mark_failed()
             return False
 
     def get_setting(self, key):
@@ -861,7 +882,7 @@ class SettingsAdmin(AdminHandler):
                 )
             )
 
-            conn.commit()
+            self.db_manager.commit(conn)
 
             # ثبت لاگ
             self._log_admin_action(
@@ -873,6 +894,7 @@ class SettingsAdmin(AdminHandler):
             return True
         except Exception as e:
             self.logger.error(f"Error in update setting: {str(e)}")
+            self.db_manager.mark_failed()
             return False
 
     def reset_settings(self, admin_id):
@@ -927,7 +949,7 @@ class SettingsAdmin(AdminHandler):
                     )
                 )
 
-            conn.commit()
+            self.db_manager.commit(conn)
 
             # ثبت لاگ
             self._log_admin_action(
@@ -939,6 +961,7 @@ class SettingsAdmin(AdminHandler):
             return True
         except Exception as e:
             self.logger.error(f"Error in reset settings: {str(e)}")
+            self.db_manager.mark_failed()
             return False
 
     def _format_setting_value(self, key, value):
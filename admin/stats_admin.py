@@ -19,15 +19,16 @@ class StatsAdmin(AdminHandler):
     کلاس مدیریت آمار و گزارشات در پنل ادمین
     """
 
-    def __init__(self, bot, db_manager):
+    def __init__(self, bot, db_manager, router):
         """
         مقداردهی اولیه کلاس مدیریت آمار
 
         Args:
             bot (telebot.TeleBot): نمونه ربات تلگرام
             db_manager: مدیریت‌کننده پایگاه داده
+            router (UpdateRouter): مسیریاب مرکزی آپدیت‌ها
         """
-        super().__init__(bot, db_manager)
+        super().__init__(bot, db_manager, router)
         self.logger = logging.getLogger('chatogram.admin.StatsAdmin')
 
         # ذخیره‌سازی داده‌های موقت
@@ -39,7 +40,7 @@ class StatsAdmin(AdminHandler):
         """
 
         # منوی آمار و گزارشات
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats")
+        @self.router.callback_query_handler(data="admin_stats")
         def handle_admin_stats(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -55,9 +56,10 @@ class StatsAdmin(AdminHandler):
                 self.show_stats_menu(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # نمودار کاربران
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_users")
+        @self.router.callback_query_handler(data="admin_stats_users")
         def handle_admin_stats_users(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -70,9 +72,10 @@ class StatsAdmin(AdminHandler):
                 self.show_users_stats(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats users handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # نمودار چت‌ها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_chats")
+        @self.router.callback_query_handler(data="admin_stats_chats")
         def handle_admin_stats_chats(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -85,9 +88,10 @@ class StatsAdmin(AdminHandler):
                 self.show_chats_stats(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats chats handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # نمودار سکه‌ها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_coins")
+        @self.router.callback_query_handler(data="admin_stats_coins")
         def handle_admin_stats_coins(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -100,9 +104,10 @@ class StatsAdmin(AdminHandler):
                 self.show_coins_stats(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats coins handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # آمار جامع
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_overview")
+        @self.router.callback_query_handler(data="admin_stats_overview")
         def handle_admin_stats_overview(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -115,9 +120,10 @@ class StatsAdmin(AdminHandler):
                 self.show_overview_stats(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats overview handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # گزارش روزانه
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_daily")
+        @self.router.callback_query_handler(data="admin_stats_daily")
         def handle_admin_stats_daily(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -130,9 +136,10 @@ class StatsAdmin(AdminHandler):
                 self.show_daily_report(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats daily handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # گزارش هفتگی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_weekly")
+        @self.router.callback_query_handler(data="admin_stats_weekly")
         def handle_admin_stats_weekly(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -145,9 +152,10 @@ class StatsAdmin(AdminHandler):
                 self.show_weekly_report(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats weekly handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # گزارش ماهانه
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_monthly")
+        @self.router.callback_query_handler(data="admin_stats_monthly")
         def handle_admin_stats_monthly(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -160,9 +168,10 @@ class StatsAdmin(AdminHandler):
                 self.show_monthly_report(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats monthly handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # خروجی اکسل
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_stats_export")
+        @self.router.callback_query_handler(data="admin_stats_export")
         def handle_admin_stats_export(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -175,9 +184,10 @@ class StatsAdmin(AdminHandler):
                 self.show_export_menu(call.message.chat.id, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in admin stats export handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # خروجی اکسل کاربران
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_export_users")
+        @self.router.callback_query_handler(data="admin_export_users")
         def handle_admin_export_users(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -190,9 +200,10 @@ class StatsAdmin(AdminHandler):
                 self.export_users_excel(call.message.chat.id)
             except Exception as e:
                 self.logger.error(f"Error in admin export users handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # خروجی اکسل تراکنش‌ها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_export_transactions")
+        @self.router.callback_query_handler(data="admin_export_transactions")
         def handle_admin_export_transactions(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -205,9 +216,10 @@ class StatsAdmin(AdminHandler):
                 self.export_transactions_excel(call.message.chat.id)
             except Exception as e:
                 self.logger.error(f"Error in admin export transactions handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # خروجی اکسل چت‌ها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_export_chats")
+        @self.router.callback_query_handler(data="admin_export_chats")
         def handle_admin_export_chats(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -220,6 +232,7 @@ class StatsAdmin(AdminHandler):
                 self.export_chats_excel(call.message.chat.id)
             except Exception as e:
                 self.logger.error(f"Error in admin export chats handler: {str(e)}")
+                self.db_manager.mark_failed()
 
     def show_stats_menu(self, chat_id, message_id=None):
         """
@@ -905,7 +918,7 @@ class StatsAdmin(AdminHandler):
             )
 
             # دریافت لیست کاربران
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -999,7 +1012,7 @@ class StatsAdmin(AdminHandler):
             )
 
             # دریافت لیست تراکنش‌ها
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1102,7 +1115,7 @@ class StatsAdmin(AdminHandler):
             )
 
             # دریافت لیست چت‌ها
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1369,7 +1382,7 @@ class StatsAdmin(AdminHandler):
             list: آمار کاربران
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1397,7 +1410,7 @@ class StatsAdmin(AdminHandler):
             list: آمار چت‌ها
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1425,7 +1438,7 @@ class StatsAdmin(AdminHandler):
             list: آمار سکه‌ها
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1455,7 +1468,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل چت‌ها
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("SELECT COUNT(*) as count FROM chats")
@@ -1474,11 +1487,11 @@ class StatsAdmin(AdminHandler):
             int: تعداد چت‌های امروز
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
-                "SELECT COUNT(*) as count FROM chats WHERE DATE(started_at) = DATE('now')"
+                "SELECT COUNT(*) as count FROM chats WHERE started_at >= DATE('now')"
             )
             result = cursor.fetchone()
 
@@ -1495,7 +1508,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد چت‌های هفته اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1516,7 +1529,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد چت‌های ماه اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1537,7 +1550,7 @@ class StatsAdmin(AdminHandler):
             float: میانگین مدت چت (دقیقه)
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1562,7 +1575,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل پیام‌ها
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("SELECT COUNT(*) as count FROM messages")
@@ -1581,11 +1594,11 @@ class StatsAdmin(AdminHandler):
             int: تعداد پیام‌های امروز
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
-                "SELECT COUNT(*) as count FROM messages WHERE DATE(sent_at) = DATE('now')"
+                "SELECT COUNT(*) as count FROM messages WHERE sent_at >= DATE('now')"
             )
             result = cursor.fetchone()
 
@@ -1602,7 +1615,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد پیام‌های هفته اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1623,7 +1636,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد پیام‌های ماه اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1644,7 +1657,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل تراکنش‌ها
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("SELECT COUNT(*) as count FROM transactions")
@@ -1663,7 +1676,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل سکه‌های موجود
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("SELECT SUM(coins) as total FROM users")
@@ -1682,7 +1695,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل سکه‌های خریداری شده
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1705,7 +1718,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کل سکه‌های مصرف شده
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1728,14 +1741,14 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های خریداری شده امروز
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
                 SELECT SUM(amount) as total 
                 FROM transactions 
                 WHERE amount > 0 AND transaction_type = 'purchase'
-                AND DATE(created_at) = DATE('now')
+                AND created_at >= DATE('now')
             """)
             result = cursor.fetchone()
 
@@ -1752,14 +1765,14 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های مصرف شده امروز
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
                 SELECT SUM(ABS(amount)) as total 
                 FROM transactions 
                 WHERE amount < 0
-                AND DATE(created_at) = DATE('now')
+                AND created_at >= DATE('now')
             """)
             result = cursor.fetchone()
 
@@ -1776,7 +1789,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های خریداری شده هفته اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1800,7 +1813,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های مصرف شده هفته اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1824,7 +1837,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های خریداری شده ماه اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1848,7 +1861,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد سکه‌های مصرف شده ماه اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1872,7 +1885,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کاربران فعال هفته اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1893,7 +1906,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کاربران فعال ماه اخیر
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -1917,7 +1930,7 @@ class StatsAdmin(AdminHandler):
             int: تعداد کاربران جدید
         """
         try:
-            conn = self.db_manager.get_connection()
+            conn = self.db_manager.get_read_connection()
             cursor = conn.cursor()
 
             cursor.execute(
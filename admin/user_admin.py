@@ -10,11 +10,11 @@ class UserAdminHandler(BaseHandler):
     کلاس مدیریت کاربران در پنل ادمین
     """
 
-    def __init__(self, bot, db_manager):
+    def __init__(self, bot, db_manager, router, outbox):
         """
         مقداردهی اولیه هندلر ادمین کاربران
         """
-        super().__init__(bot, db_manager)
+        super().__init__(bot, db_manager, router, outbox)
         self.logger = logging.getLogger('chatogram.admin.user_admin')
         self.search_cache = {}  # کش برای نگهداری نتایج جستجو
 
@@ -24,7 +24,7 @@ class UserAdminHandler(BaseHandler):
         """
 
         # جستجوی کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_search")
+        @self.router.callback_query_handler(data="admin_user_search")
         def handle_user_search(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -52,9 +52,10 @@ class UserAdminHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in user search handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # جستجو با شناسه تلگرام
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_search_id")
+        @self.router.callback_query_handler(data="admin_user_search_id")
         def handle_user_search_id(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -73,6 +74,7 @@ class UserAdminHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_user_search_id)
             except Exception as e:
                 self.logger.error(f"Error in user search id handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_user_search_id(message):
             try:
@@ -109,6 +111,7 @@ class UserAdminHandler(BaseHandler):
                 self.show_user_info(message.chat.id, user_data['id'])
             except Exception as e:
                 self.logger.error(f"Error in process user search id: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -118,7 +121,7 @@ class UserAdminHandler(BaseHandler):
                 )
 
         # جستجو با یوزرنیم
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_search_username")
+        @self.router.callback_query_handler(data="admin_user_search_username")
         def handle_user_search_username(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -137,6 +140,7 @@ class UserAdminHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_user_search_username)
             except Exception as e:
                 self.logger.error(f"Error in user search username handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_user_search_username(message):
             try:
@@ -173,6 +177,7 @@ class UserAdminHandler(BaseHandler):
                 self.show_user_info(message.chat.id, user_data['id'])
             except Exception as e:
                 self.logger.error(f"Error in process user search username: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -182,7 +187,7 @@ class UserAdminHandler(BaseHandler):
                 )
 
         # جستجو با نام
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_search_name")
+        @self.router.callback_query_handler(data="admin_user_search_name")
         def handle_user_search_name(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -201,6 +206,7 @@ class UserAdminHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_user_search_name)
             except Exception as e:
                 self.logger.error(f"Error in user search name handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_user_search_name(message):
             try:
@@ -240,6 +246,7 @@ class UserAdminHandler(BaseHandler):
                 self.show_search_results(message.chat.id, users, 0)
             except Exception as e:
                 self.logger.error(f"Error in process user search name: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -249,7 +256,7 @@ class UserAdminHandler(BaseHandler):
                 )
 
         # مشاهده کاربر بعدی در نتایج جستجو
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("admin_user_next_"))
+        @self.router.callback_query_handler(prefix="admin_user_next_")
         def handle_user_next(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -279,9 +286,10 @@ class UserAdminHandler(BaseHandler):
                 self.show_search_results(call.message.chat.id, users, index, call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in user next handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مسدودسازی کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_ban")
+        @self.router.callback_query_handler(data="admin_user_ban")
         def handle_user_ban(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -300,6 +308,7 @@ class UserAdminHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_user_ban_id)
             except Exception as e:
                 self.logger.error(f"Error in user ban handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_user_ban_id(message):
             try:
@@ -360,6 +369,7 @@ class UserAdminHandler(BaseHandler):
                     self.bot.register_next_step_handler(message, process_user_ban_reason)
             except Exception as e:
                 self.logger.error(f"Error in process user ban id: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -406,6 +416,9 @@ class UserAdminHandler(BaseHandler):
                     # پایان دادن به تمام چت‌های فعال کاربر
                     self.db_manager.end_all_active_chats(user_id)
 
+                    # خروج کاربر از صف انتظار چت تصادفی
+                    self.db_manager.leave_waiting_pool(user_id)
+
                     # ارسال پیام به کاربر
                     try:
                         self.bot.send_message(
@@ -436,6 +449,7 @@ class UserAdminHandler(BaseHandler):
                 del self.admin_ban_users[message.from_user.id]
             except Exception as e:
                 self.logger.error(f"Error in process user ban reason: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -445,7 +459,7 @@ class UserAdminHandler(BaseHandler):
                 )
 
         # آنبن کردن کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("admin_user_unban_"))
+        @self.router.callback_query_handler(prefix="admin_user_unban_")
         def handle_user_unban(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -497,9 +511,10 @@ class UserAdminHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in user unban handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # تأیید عکس پروفایل
-        @self.bot.callback_query_handler(func=lambda call: call.data == "admin_user_verify")
+        @self.router.callback_query_handler(data="admin_user_verify")
         def handle_user_verify(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -532,9 +547,10 @@ class UserAdminHandler(BaseHandler):
                 self.show_pending_profile(call.message.chat.id, pending_profiles[0], call.message.message_id)
             except Exception as e:
                 self.logger.error(f"Error in user verify handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مشاهده اقدامات کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("admin_user_actions_"))
+        @self.router.callback_query_handler(prefix="admin_user_actions_")
         def handle_user_actions(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -588,6 +604,7 @@ class UserAdminHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in user actions handler: {str(e)}")
+                self.db_manager.mark_failed()
 
     def show_user_info(self, chat_id, user_id, message_id=None):
         """
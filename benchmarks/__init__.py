@@ -0,0 +1,3 @@
+"""
+بنچمارک‌های عملکرد اجزای ربات (خارج از بسته‌های زمان اجرا)
+"""
@@ -0,0 +1,29 @@
+import sys
+from benchmarks import connection_pool, crypto, timer_wheel, user_record, waiting_pool
+
+
+# بنچمارک‌ها به نام؛ اجرا: python -m benchmarks [نام ...]
+BENCHMARKS = {
+    'connection_pool': connection_pool.main,
+    'crypto': crypto.main,
+    'timer_wheel': timer_wheel.main,
+    'user_record': user_record.main,
+    'waiting_pool': waiting_pool.main,
+}
+
+
+def main(names):
+    """
+    اجرای بنچمارک‌های انتخاب‌شده (یا همه)
+    """
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+
+        print(f"== {name}")
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+import os
+import time
+import random
+import sqlite3
+import tempfile
+import threading
+from database.connection_pool import ConnectionPool, connect
+
+
+def main():
+    """
+    مقایسه توان عملیاتی اتصال مشترک قفل‌دار با مخزن اتصال‌ها در حالت WAL
+    """
+    users = 5000
+    db_dir = tempfile.mkdtemp(prefix='chatogram-pool-')
+
+    def build(db_name, conn):
+        conn.execute("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id INTEGER UNIQUE, coins INTEGER DEFAULT 20)
+        """)
+        conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, chat_id INTEGER, content TEXT)")
+        conn.executemany("INSERT INTO users (telegram_id) VALUES (?)", [(i,) for i in range(users)])
+        conn.executemany("INSERT INTO messages (chat_id, content) VALUES (?, ?)",
+                         [(i % 500, 'x' * 64) for i in range(100000)])
+        conn.commit()
+        conn.close()
+
+    # اتصال مشترک قبلی (حالت journal پیش‌فرض) در برابر مخزن اتصال‌ها در حالت WAL
+    shared_db = os.path.join(db_dir, 'shared.db')
+    pooled_db = os.path.join(db_dir, 'pooled.db')
+    build(shared_db, sqlite3.connect(shared_db))
+    build(pooled_db, connect(pooled_db))
+
+    def worker(get_conn, lock, operations, seed):
+        # بار نخ‌های telebot: خواندن پروفایل و ثبت پیام چت
+        rng = random.Random(seed)
+        for _ in range(operations):
+            with lock:
+                conn = get_conn()
+                if rng.random() < 0.2:
+                    conn.execute("INSERT INTO messages (chat_id, content) VALUES (?, ?)", (rng.randrange(500), 'y'))
+                    conn.commit()
+                else:
+                    conn.execute("SELECT * FROM users WHERE telegram_id = ?", (rng.randrange(users),)).fetchone()
+
+    def admin(get_conn, lock, stop_event):
+        # گزارش آمار ادمین که کل جدول پیام‌ها را می‌خواند
+        while not stop_event.is_set():
+            with lock:
+                get_conn().execute("SELECT chat_id, COUNT(*) FROM messages GROUP BY chat_id").fetchall()
+
+    def run(get_conn, get_read_conn, make_lock, threads, operations=1000):
+        lock = make_lock()
+        stop_event = threading.Event()
+        stats = threading.Thread(target=admin, args=(get_read_conn, lock, stop_event))
+        workers = [
+            threading.Thread(target=worker, args=(get_conn, lock, operations, seed))
+            for seed in range(threads)
+        ]
+
+        stats.start()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stop_event.set()
+        stats.join()
+        return threads * operations / elapsed
+
+    class NoLock:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+    shared = sqlite3.connect(shared_db, check_same_thread=False)
+    pool = ConnectionPool(pooled_db)
+
+    print("ops/s of handler threads while an admin stats query runs in the background")
+    print(f"{'threads':>7} {'shared+lock':>12} {'pool (WAL)':>12}")
+    for threads in (1, 2, 4, 8, 16):
+        shared_rate = run(lambda: shared, lambda: shared, threading.Lock, threads)
+        pool_rate = run(pool.get, lambda: pool.get(read_only=True), NoLock, threads)
+        print(f"{threads:>7} {shared_rate:>12.0f} {pool_rate:>12.0f}")
+
+    shared.close()
+    pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+import time
+from utils.crypto import ENGINES, get_engine
+
+
+def benchmark(message_sizes=(32, 256, 4096), count=2000):
+    """
+    مقایسه سرعت و حجم ذخیره‌سازی موتورهای رمزنگاری
+    """
+    results = []
+
+    for name in ENGINES:
+        bench_engine = get_engine(name)
+
+        for size in message_sizes:
+            payload = os.urandom(size // 2).hex().encode('utf-8')
+            header = bytes([bench_engine.version])
+
+            started = time.perf_counter()
+            tokens = [header + bench_engine.encrypt(payload) for _ in range(count)]
+            encrypt_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for token in tokens:
+                bench_engine.decrypt(token[1:])
+            decrypt_time = time.perf_counter() - started
+
+            results.append({
+                'engine': name,
+                'size': size,
+                'encrypt_per_sec': count / encrypt_time,
+                'decrypt_per_sec': count / decrypt_time,
+                'stored_bytes': len(tokens[0])
+            })
+
+    return results
+
+
+def main():
+    """
+    چاپ جدول مقایسه موتورهای رمزنگاری
+    """
+    print(f"{'engine':<8} {'size':>6} {'enc/s':>10} {'dec/s':>10} {'stored':>8}")
+    for row in benchmark():
+        print(
+            f"{row['engine']:<8} {row['size']:>6} {row['encrypt_per_sec']:>10.0f} "
+            f"{row['decrypt_per_sec']:>10.0f} {row['stored_bytes']:>8}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import time
+import random
+from utils.timer_wheel import TimerWheel
+
+
+def main():
+    """
+    زمان زمان‌بندی، تمدید و پیشروی تعداد زیادی مهلت در چرخ زمان‌سنج
+    """
+    rng = random.Random(1)
+    start = 1_000_000.0
+    wheel = TimerWheel(tick=1.0, now=start)
+
+    count = 500_000
+    began = time.perf_counter()
+    for key in range(count):
+        wheel.schedule(key, start + rng.randint(1, 3600))
+    scheduled = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for key in range(0, count, 2):
+        wheel.schedule(key, start + 3600 + rng.randint(1, 3600))
+    extended = time.perf_counter() - began
+
+    began = time.perf_counter()
+    fired = 0
+    for second in range(1, 7201):
+        fired += len(wheel.advance(start + second))
+    advanced = time.perf_counter() - began
+
+    print(f"schedule {count}: {scheduled:.3f}s, extend {count // 2}: {extended:.3f}s, "
+          f"advance 7200 ticks: {advanced:.3f}s, fired {fired}, left {len(wheel)}")
+
+
+if __name__ == '__main__':
+    main()
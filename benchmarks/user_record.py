@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import tempfile
+import tracemalloc
+from database.user_record import USER_SELECT, UserRecord
+
+
+def main(users=20000):
+    """
+    مقایسه حافظه هر کاربر کش‌شده: dict کامل در برابر UserRecord
+    """
+    db_dir = tempfile.mkdtemp(prefix='chatogram-records-')
+    conn = sqlite3.connect(os.path.join(db_dir, 'records.db'))
+    conn.row_factory = sqlite3.Row
+
+    conn.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY, telegram_id INTEGER UNIQUE, username TEXT,
+            display_name TEXT, age INTEGER, gender TEXT, bio TEXT, city TEXT,
+            profile_pic TEXT, profile_pic_status TEXT DEFAULT 'pending',
+            coins INTEGER DEFAULT 20, is_online BOOLEAN DEFAULT 1, is_banned BOOLEAN DEFAULT 0,
+            active_chat_id INTEGER, partner_id INTEGER, profile_version INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        """
+        INSERT INTO users (telegram_id, username, display_name, age, gender, bio, city, profile_pic)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (100000000 + i, f"user{i}", f"کاربر {i}", 18 + i % 40, ('male', 'female')[i % 2],
+             'سلام! من عاشق کتاب، موسیقی و سفر هستم.' * 3, 'تهران',
+             f"AgACAgQAAxkBAAI{i:08d}" + 'x' * 48)
+            for i in range(users)
+        ]
+    )
+    conn.commit()
+
+    def measure(load):
+        # بایت به ازای هر کاربر نگهداری‌شده در کش (کلید شناسه تلگرام)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        cache = load()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return (after - before) / len(cache)
+
+    def load_dicts():
+        rows = conn.execute("SELECT * FROM users").fetchall()
+        return {row['telegram_id']: dict(row) for row in rows}
+
+    def load_records():
+        rows = conn.execute(f"SELECT {USER_SELECT} FROM users").fetchall()
+        loader = lambda user_id: None
+        return {row[1]: UserRecord.from_row(row, loader) for row in rows}
+
+    dict_bytes = measure(load_dicts)
+    record_bytes = measure(load_records)
+
+    print(f"cached users: {users}")
+    print(f"dict rows (SELECT *):          {dict_bytes:8.0f} bytes/user")
+    print(f"UserRecord (lazy bio/pic):     {record_bytes:8.0f} bytes/user")
+    print(f"reduction:                     {1 - record_bytes / dict_bytes:8.1%}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import time
+import random
+from database.waiting_pool import WaitingEntry, WaitingPool
+
+
+def main():
+    """
+    زمان هر جفت‌سازی در صف انتظار با اندازه‌های مختلف
+    """
+    rng = random.Random(1)
+    genders = ['male', 'female', 'other', None]
+    cities = [None, 'تهران', 'مشهد', 'اصفهان', 'شیراز', 'تبریز']
+
+    for size in (1000, 10000, 50000):
+        pool = WaitingPool()
+        now = time.time()
+        for user_id in range(1, size + 1):
+            pool._add_locked(WaitingEntry(
+                user_id, user_id, rng.choice(genders), rng.choice(cities), rng.randint(0, 60),
+                rng.choice([0, 0, 0, 1, 3]), rng.choice(genders), None, now - rng.random() * 300
+            ))
+
+        requester = WaitingEntry(0, 0, 'male', 'تهران', 25, 0, 'female', None, now)
+        recent = set(rng.sample(range(1, size + 1), 20))
+        blocked = set(rng.sample(range(1, size + 1), 50))
+
+        rounds = 200
+        started = time.perf_counter()
+        for _ in range(rounds):
+            candidate = pool.match(requester, blocked, recent)
+            if candidate:
+                pool.requeue(candidate)
+            pool.remove(0)
+        elapsed = (time.perf_counter() - started) / rounds
+
+        print(f"{size:>6} waiting: {elapsed * 1000:.3f} ms per match")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@ MAIN_MENU = [
 # منوی چت
 CHAT_MENU = [
     "⛔ پایان چت",
+    "⏭ هم‌صحبت بعدی",
     "🔓 فعال‌سازی چت خصوصی",
     "👤 مشاهده پروفایل مقابل"
 ]
@@ -27,7 +28,13 @@ MESSAGES = {
     'coin_info': "💰 *سکه‌های شما*: {}\n\nبا سکه می‌توانید:\n- درخواست چت به کاربران خاص ارسال کنید (۵ سکه)\n- از فیلترهای جستجوی پیشرفته استفاده کنید (۱۰ سکه)\n\nبرای افزایش سکه، یکی از گزینه‌های زیر را انتخاب کنید:",
     'random_chat_start': "🔄 در حال جستجو برای یک چت ناشناس...\nلطفاً صبر کنید.",
     'random_chat_connected': "✅ به یک کاربر ناشناس متصل شدید!\nهر وقت خواستید می‌توانید با گزینه «پایان چت» گفتگو را خاتمه دهید.",
+    'random_chat_waiting': "⏳ در حال حاضر کسی در صف نیست؛ شما در صف انتظار قرار گرفتید.\nبه محض پیدا شدن هم‌صحبت به شما اطلاع می‌دهیم.\nبرای لغو جستجو از گزینه «پایان چت» استفاده کنید.",
+    'random_chat_already_waiting': "⏳ شما در صف انتظار هستید. به محض پیدا شدن هم‌صحبت به شما اطلاع می‌دهیم.",
+    'random_chat_cancelled': "❌ جستجو لغو شد و از صف انتظار خارج شدید.",
+    'random_chat_idle_removed': "⌛ به دلیل عدم فعالیت از صف انتظار خارج شدید.\nبرای جستجوی دوباره هم‌صحبت، گزینه «به یک ناشناس وصلم کن!» را بزنید.",
     'chat_ended': "⛔ چت پایان یافت.",
+    'chat_skipped': "⏭ چت قبلی پایان یافت.",
+    'chat_idle_ended': "⌛ چت به دلیل عدم فعالیت پایان یافت.",
     'no_user_found': "😕 متأسفانه کاربری با این مشخصات پیدا نشد. لطفاً مجدداً تلاش کنید.",
     'help': "📄 *راهنمای استفاده از چتوگرام*\n\nچتوگرام یک ربات چت ناشناس است که به شما امکان می‌دهد با افراد جدید آشنا شوید.\n\n*نحوه استفاده:*\n- با انتخاب گزینه «به یک ناشناس وصلم کن» به یک کاربر تصادفی متصل می‌شوید.\n- با استفاده از «جستجوی کاربران» می‌توانید افراد را بر اساس ویژگی‌های مختلف پیدا کنید.\n- در بخش «پروفایل من» می‌توانید اطلاعات خود را تکمیل کنید.\n- برای ارسال درخواست چت به کاربران خاص به سکه نیاز دارید.",
     'invite': "🎁 *دعوت دوستان*\n\nبا دعوت دوستان خود به چتوگرام، برای هر دوست ۱۰ سکه رایگان دریافت کنید!\n\nلینک دعوت شما:\nhttps://t.me/ChatogramBot?start={}"
@@ -18,6 +18,12 @@ LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
 # تنظیمات رمزنگاری
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', 'your-secure-key-here')
+CIPHER_ENGINE = os.getenv('CIPHER_ENGINE', 'fernet')  # موتور رمزنگاری پیام‌ها: fernet (هم‌خوان با پیام‌های موجود) یا aesgcm
+# حلقه کلیدها به صورت «شناسه:کلید» جدا شده با کاما؛ ENCRYPTION_KEY همیشه کلید شماره ۰ است
+ENCRYPTION_KEYS = os.getenv('ENCRYPTION_KEYS', '')
+ENCRYPTION_KEY_ID = int(os.getenv('ENCRYPTION_KEY_ID', '0'))  # شناسه کلید فعال برای رمزگذاری
+REENCRYPT_BATCH_SIZE = int(os.getenv('REENCRYPT_BATCH_SIZE', '500'))  # تعداد پیام در هر تراکنش بازرمزگذاری
+REENCRYPT_ON_STARTUP = os.getenv('REENCRYPT_ON_STARTUP', '0') == '1'  # بازرمزگذاری خودکار پیام‌ها هنگام راه‌اندازی (یا python -m database.key_rotation)
 
 # تنظیمات ادمین
 ADMIN_IDS = list(map(int, os.getenv('ADMIN_IDS', '').split(',')))
@@ -25,4 +31,55 @@ ADMIN_IDS = list(map(int, os.getenv('ADMIN_IDS', '').split(',')))
 # تنظیمات سکه
 INITIAL_COINS = 20  # سکه‌های اولیه هنگام ثبت‌نام
 CHAT_REQUEST_COINS = 5  # هزینه ارسال درخواست چت
-ADVANCED_SEARCH_COINS = 10  # هزینه استفاده از فیلترهای پیشرفته
\ No newline at end of file
+ADVANCED_SEARCH_COINS = 10  # هزینه استفاده از فیلترهای پیشرفته
+
+# تنظیمات ثبت پیام‌ها (نوشتن دسته‌ای در پس‌زمینه)
+MESSAGE_BATCH_SIZE = int(os.getenv('MESSAGE_BATCH_SIZE', '100'))  # حداکثر پیام در هر commit
+MESSAGE_FLUSH_INTERVAL_MS = int(os.getenv('MESSAGE_FLUSH_INTERVAL_MS', '200'))  # حداکثر تأخیر نوشتن
+MESSAGE_WRITE_RETRIES = int(os.getenv('MESSAGE_WRITE_RETRIES', '5'))  # تعداد تلاش مجدد دسته ناموفق پیش از کنار گذاشتن
+MESSAGE_RETRY_BACKOFF_MS = int(os.getenv('MESSAGE_RETRY_BACKOFF_MS', '100'))  # تأخیر اولیه تلاش مجدد (هر بار دو برابر)
+
+# تنظیمات وضعیت آنلاین کاربران
+PRESENCE_FLUSH_INTERVAL = int(os.getenv('PRESENCE_FLUSH_INTERVAL', '5'))  # فاصله ذخیره وضعیت‌ها (ثانیه)
+PRESENCE_IDLE_TIMEOUT = int(os.getenv('PRESENCE_IDLE_TIMEOUT', '300'))  # زمان بی‌فعالیتی تا آفلاین شدن (ثانیه)
+
+# تنظیمات صف ارسال پیام‌ها
+OUTBOUND_WORKERS = int(os.getenv('OUTBOUND_WORKERS', '8'))  # تعداد نخ‌های ارسال
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))  # حداکثر پیام در ثانیه برای کل ربات
+OUTBOUND_PER_CHAT_RATE = float(os.getenv('OUTBOUND_PER_CHAT_RATE', '1'))  # حداکثر پیام در ثانیه برای هر چت
+
+# مدت انتظار برای جمع‌آوری پیام‌های یک آلبوم پیش از ارسال (ثانیه)
+MEDIA_GROUP_DELAY = float(os.getenv('MEDIA_GROUP_DELAY', '0.7'))
+
+# وزن‌های امتیازدهی جفت‌سازی تصادفی
+MATCH_WEIGHT_WAIT = float(os.getenv('MATCH_WEIGHT_WAIT', '1.0'))  # اولویت کاربرانی که مدت بیشتری منتظرند
+MATCH_WEIGHT_AGE = float(os.getenv('MATCH_WEIGHT_AGE', '1.0'))  # نزدیکی سن دو طرف
+MATCH_WEIGHT_CITY = float(os.getenv('MATCH_WEIGHT_CITY', '0.5'))  # هم‌شهری بودن
+MATCH_WEIGHT_RECENT = float(os.getenv('MATCH_WEIGHT_RECENT', '2.0'))  # جریمه هم‌صحبت‌های اخیر
+MATCH_WEIGHT_REPORTS = float(os.getenv('MATCH_WEIGHT_REPORTS', '0.5'))  # جریمه کاربران گزارش‌شده
+MATCH_AGE_RANGE = int(os.getenv('MATCH_AGE_RANGE', '5'))  # اختلاف سنی بدون جریمه (سال)
+MATCH_WAIT_CAP = int(os.getenv('MATCH_WAIT_CAP', '120'))  # سقف زمان انتظار در امتیازدهی (ثانیه)
+
+# حافظه هم‌صحبت‌های اخیر (جلوگیری از جفت شدن دوباره با هم‌صحبت قبلی)
+RECENT_PARTNERS_SIZE = int(os.getenv('RECENT_PARTNERS_SIZE', '5'))  # تعداد هم‌صحبت‌های اخیر هر کاربر
+RECENT_PARTNERS_MAX_USERS = int(os.getenv('RECENT_PARTNERS_MAX_USERS', '100000'))  # حداکثر کاربران در حافظه
+
+# پایان خودکار چت‌های بی‌فعالیت
+CHAT_IDLE_TIMEOUT = int(os.getenv('CHAT_IDLE_TIMEOUT', '1800'))  # زمان بی‌فعالیتی تا پایان چت (ثانیه)
+CHAT_REAPER_INTERVAL = float(os.getenv('CHAT_REAPER_INTERVAL', '1'))  # فاصله بررسی چت‌های منقضی (ثانیه)
+CHAT_REAPER_RETRY_DELAY = float(os.getenv('CHAT_REAPER_RETRY_DELAY', '5'))  # تأخیر تلاش مجدد پس از خطای پایان چت‌ها (ثانیه)
+
+# تنظیمات اتصال‌های SQLite (یک اتصال برای هر نخ در حالت WAL)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))  # مهلت انتظار برای آزاد شدن قفل نوشتن
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '8192'))  # حافظه کش صفحات هر اتصال
+SQLITE_MMAP_SIZE_MB = int(os.getenv('SQLITE_MMAP_SIZE_MB', '64'))  # اندازه نگاشت حافظه فایل پایگاه داده
+
+# مهاجرت‌های پایگاه داده
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', '1000'))  # تعداد ردیف در هر دسته به‌روزرسانی
+
+# کش کاربران (خواندن ردیف کاربر بدون کوئری در بیشتر آپدیت‌ها)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))  # حداکثر تعداد کاربران در کش
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))  # مهلت اعتبار هر ردیف (ثانیه)
+
+# کش کارت‌های پروفایل (متن و کیبورد آماده نمایش پروفایل)
+PROFILE_CARD_CACHE_SIZE = int(os.getenv('PROFILE_CARD_CACHE_SIZE', '5000'))  # حداکثر تعداد کارت‌ها در کش
@@ -0,0 +1,132 @@
+import threading
+import logging
+
+
+class BlockCache:
+    """
+    کش درون حافظه‌ای روابط بلاک کاربران
+
+    برای هر کاربر دو مجموعه نگهداری می‌شود: کاربرانی که او بلاک کرده و کاربرانی که
+    او را بلاک کرده‌اند. مجموعه‌ها در اولین استفاده از جدول blocks خوانده شده و
+    پس از آن توسط DBManager.toggle_block به‌روز نگه داشته می‌شوند.
+    """
+
+    def __init__(self, db_manager):
+        """
+        مقداردهی اولیه کش بلاک‌ها
+        """
+        self.db_manager = db_manager
+        self.logger = logging.getLogger('chatogram.database.block_cache')
+
+        self._lock = threading.Lock()
+        self._blocked = {}
+        self._blocked_by = {}
+
+        # شماره تغییرات؛ بارگذاری‌ای که همزمان با یک تغییر خوانده شده دوباره انجام می‌شود
+        self._version = 0
+
+        # آمار عملکرد
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, user_id):
+        """
+        خواندن روابط بلاک یک کاربر از پایگاه داده
+        """
+        conn = self.db_manager.get_connection()
+
+        while True:
+            with self._lock:
+                version = self._version
+
+            cursor = conn.cursor()
+            cursor.execute("SELECT blocked_id FROM blocks WHERE blocker_id = ?", (user_id,))
+            blocked = {row[0] for row in cursor.fetchall()}
+            cursor.execute("SELECT blocker_id FROM blocks WHERE blocked_id = ?", (user_id,))
+            blocked_by = {row[0] for row in cursor.fetchall()}
+
+            with self._lock:
+                # ممکن است نخ دیگری همزمان کاربر را بارگذاری کرده باشد
+                if user_id in self._blocked:
+                    self.misses += 1
+                    return self._blocked[user_id], self._blocked_by[user_id]
+
+                # اگر در حین خواندن بلاکی ثبت شده، ممکن است داده خوانده‌شده قدیمی باشد
+                if self._version == version:
+                    self.misses += 1
+                    self._blocked[user_id] = blocked
+                    self._blocked_by[user_id] = blocked_by
+                    return blocked, blocked_by
+
+    def _get(self, user_id):
+        """
+        دریافت مجموعه‌های بلاک کاربر (با بارگذاری در صورت نبودن در کش)
+        """
+        with self._lock:
+            blocked = self._blocked.get(user_id)
+            if blocked is not None:
+                self.hits += 1
+                return blocked, self._blocked_by[user_id]
+
+        return self._load(user_id)
+
+    def has_blocked(self, blocker_id, blocked_id):
+        """
+        بررسی بلاک کردن یک کاربر توسط کاربر دیگر
+        """
+        blocked, _ = self._get(blocker_id)
+        return blocked_id in blocked
+
+    def get_excluded_ids(self, user_id):
+        """
+        شناسه کاربرانی که نباید به کاربر پیشنهاد شوند (بلاک در هر دو جهت)
+        """
+        blocked, blocked_by = self._get(user_id)
+        with self._lock:
+            return blocked | blocked_by
+
+    def set_blocked(self, blocker_id, blocked_id, is_blocked):
+        """
+        به‌روزرسانی کش پس از بلاک یا آنبلاک (فقط برای کاربران بارگذاری‌شده)
+        """
+        with self._lock:
+            self._version += 1
+
+            blocked = self._blocked.get(blocker_id)
+            if blocked is not None:
+                if is_blocked:
+                    blocked.add(blocked_id)
+                else:
+                    blocked.discard(blocked_id)
+
+            blocked_by = self._blocked_by.get(blocked_id)
+            if blocked_by is not None:
+                if is_blocked:
+                    blocked_by.add(blocker_id)
+                else:
+                    blocked_by.discard(blocker_id)
+
+    def invalidate(self, user_id=None):
+        """
+        حذف روابط یک کاربر (یا کل کش) برای بارگذاری مجدد
+        """
+        with self._lock:
+            self._version += 1
+            if user_id is None:
+                self._blocked.clear()
+                self._blocked_by.clear()
+            else:
+                self._blocked.pop(user_id, None)
+                self._blocked_by.pop(user_id, None)
+
+    def get_stats(self):
+        """
+        دریافت آمار کش
+        """
+        total = self.hits + self.misses
+        return {
+            'users': len(self._blocked),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
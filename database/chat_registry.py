@@ -0,0 +1,134 @@
+import threading
+import logging
+from collections import namedtuple
+
+
+# اطلاعات جفت شدن یک کاربر در چت فعال (از دید همان کاربر)
+ChatPairing = namedtuple('ChatPairing', ['chat_id', 'user_id', 'partner_id', 'partner_telegram_id'])
+
+
+class ChatRegistry:
+    """
+    جدول درون حافظه‌ای جفت‌های چت فعال
+
+    نگاشت شناسه تلگرام هر کاربر به شناسه چت و طرف مقابل، تا رله پیام‌ها
+    بدون هیچ کوئری SELECT انجام شود.
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه جدول جفت‌ها
+        """
+        self.logger = logging.getLogger('chatogram.database.chat_registry')
+        self._lock = threading.Lock()
+        self._by_telegram_id = {}
+        self._by_chat_id = {}
+        self._claimed = set()
+
+    def claim(self, telegram_id1, telegram_id2):
+        """
+        رزرو اتمیک دو کاربر برای شروع چت
+
+        اگر هر کدام از دو کاربر چت فعال داشته باشد یا توسط نخ دیگری رزرو شده باشد،
+        هیچ‌کدام رزرو نمی‌شوند و False برگردانده می‌شود.
+        """
+        if telegram_id1 == telegram_id2:
+            return False
+
+        with self._lock:
+            for telegram_id in (telegram_id1, telegram_id2):
+                if telegram_id in self._claimed or telegram_id in self._by_telegram_id:
+                    return False
+
+            self._claimed.add(telegram_id1)
+            self._claimed.add(telegram_id2)
+            return True
+
+    def release(self, telegram_id1, telegram_id2):
+        """
+        آزاد کردن رزرو دو کاربر (در صورت شکست ایجاد چت)
+        """
+        with self._lock:
+            self._claimed.discard(telegram_id1)
+            self._claimed.discard(telegram_id2)
+
+    def register(self, chat_id, user1_id, telegram_id1, user2_id, telegram_id2):
+        """
+        ثبت یک چت فعال برای هر دو طرف (و آزاد کردن رزرو آن‌ها)
+        """
+        with self._lock:
+            self._claimed.discard(telegram_id1)
+            self._claimed.discard(telegram_id2)
+            self._by_telegram_id[telegram_id1] = ChatPairing(chat_id, user1_id, user2_id, telegram_id2)
+            self._by_telegram_id[telegram_id2] = ChatPairing(chat_id, user2_id, user1_id, telegram_id1)
+            self._by_chat_id[chat_id] = (telegram_id1, telegram_id2)
+
+    def unregister(self, chat_id):
+        """
+        حذف چت از جدول و برگرداندن شناسه‌های تلگرام دو طرف
+        """
+        with self._lock:
+            telegram_ids = self._by_chat_id.pop(chat_id, None)
+            if not telegram_ids:
+                return None
+
+            for telegram_id in telegram_ids:
+                pairing = self._by_telegram_id.get(telegram_id)
+                if pairing and pairing.chat_id == chat_id:
+                    del self._by_telegram_id[telegram_id]
+
+            return telegram_ids
+
+    def get_chat_ids(self):
+        """
+        دریافت شناسه همه چت‌های فعال
+        """
+        with self._lock:
+            return list(self._by_chat_id)
+
+    def get_telegram_ids(self, chat_id):
+        """
+        دریافت شناسه تلگرام دو طرف یک چت فعال
+        """
+        return self._by_chat_id.get(chat_id)
+
+    def get_members(self, chat_id):
+        """
+        دریافت شناسه کاربری دو طرف یک چت فعال
+        """
+        telegram_ids = self._by_chat_id.get(chat_id)
+        if not telegram_ids:
+            return None
+
+        pairing = self._by_telegram_id.get(telegram_ids[0])
+        if not pairing or pairing.chat_id != chat_id:
+            return None
+        return pairing.user_id, pairing.partner_id
+
+    def get(self, telegram_id):
+        """
+        دریافت اطلاعات جفت کاربر با شناسه تلگرام
+        """
+        return self._by_telegram_id.get(telegram_id)
+
+    def load(self, rows):
+        """
+        بازسازی جدول از ردیف‌های چت‌های فعال
+        """
+        with self._lock:
+            self._by_telegram_id.clear()
+            self._by_chat_id.clear()
+
+        for row in rows:
+            self.register(
+                row['id'],
+                row['user1_id'],
+                row['telegram_id1'],
+                row['user2_id'],
+                row['telegram_id2']
+            )
+
+        self.logger.info(f"Loaded {len(self._by_chat_id)} active chats into registry")
+
+    def __len__(self):
+        return len(self._by_chat_id)
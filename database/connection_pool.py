@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from config.settings import SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE_MB
+
+
+def connect(db_name, read_only=False, row_factory=None):
+    """
+    برقراری یک اتصال با تنظیمات WAL و مهلت انتظار قفل
+
+    اتصال‌های فقط‌خواندنی با mode=ro باز می‌شوند؛ در حالت WAL خواننده‌ها نویسنده‌ها را
+    متوقف نمی‌کنند و آمار ادمین بدون تأثیر روی نوشتن پیام‌ها اجرا می‌شود.
+    """
+    timeout = SQLITE_BUSY_TIMEOUT_MS / 1000
+
+    if read_only:
+        uri = f"{Path(db_name).absolute().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_name, timeout=timeout, check_same_thread=False)
+        # حالت WAL در فایل پایگاه داده ذخیره می‌شود و برای اتصال‌های بعدی تغییری ایجاد نمی‌کند
+        conn.execute("PRAGMA journal_mode = WAL")
+        # در حالت WAL همگام‌سازی NORMAL پایداری پس از هر تراکنش را حفظ می‌کند
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    if row_factory is not None:
+        conn.row_factory = row_factory
+
+    return conn
+
+
+class ConnectionPool:
+    """
+    مخزن اتصال‌های پایگاه داده با یک اتصال برای هر نخ
+
+    هر نخ telebot اتصال نوشتنی و فقط‌خواندنی خود را دارد، بنابراین cursorها و
+    تراکنش‌های نخ‌های مختلف با هم تداخل نمی‌کنند و همزمانی بین آن‌ها به قفل‌های
+    خود SQLite (WAL و busy_timeout) سپرده می‌شود. اتصال نخ‌های پایان‌یافته هنگام
+    ساخت اتصال جدید بسته می‌شوند.
+    """
+
+    def __init__(self, db_name, row_factory=sqlite3.Row):
+        """
+        مقداردهی اولیه مخزن اتصال‌ها
+        """
+        self.db_name = db_name
+        self.row_factory = row_factory
+        self.logger = logging.getLogger('chatogram.database.connection_pool')
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get(self, read_only=False):
+        """
+        دریافت اتصال نخ جاری (در اولین استفاده ساخته می‌شود)
+        """
+        attr = 'read_conn' if read_only else 'conn'
+        conn = getattr(self._local, attr, None)
+
+        if conn is None:
+            conn = connect(self.db_name, read_only=read_only, row_factory=self.row_factory)
+            setattr(self._local, attr, conn)
+
+            with self._lock:
+                self._close_dead_locked()
+                self._connections.append((threading.current_thread(), conn))
+
+        return conn
+
+    def _close_dead_locked(self):
+        """
+        بستن اتصال نخ‌هایی که دیگر اجرا نمی‌شوند
+        """
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                conn.close()
+        self._connections = alive
+
+    def close_all(self):
+        """
+        بستن همه اتصال‌ها
+        """
+        with self._lock:
+            for _, conn in self._connections:
+                try:
+                    conn.close()
+                except Exception as e:
+                    self.logger.error(f"Error closing connection: {str(e)}")
+            self._connections = []
+
+        # اتصال‌های بسته‌شده در نخ‌های دیگر در اولین استفاده دوباره ساخته می‌شوند
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._connections)
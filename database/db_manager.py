@@ -1,8 +1,20 @@
-import sqlite3
-import json
+import threading
+import time
 import logging
-from config.settings import DB_NAME
-from utils.crypto import encrypt, decrypt
+from contextlib import contextmanager
+from config.settings import DB_NAME, CHAT_IDLE_TIMEOUT, REENCRYPT_ON_STARTUP
+from database.chat_registry import ChatRegistry
+from database.message_journal import MessageJournal
+from database.presence_tracker import PresenceTracker
+from database.key_rotation import MessageReencryptor
+from database.waiting_pool import WaitingPool
+from database.block_cache import BlockCache
+from database.recent_partners import RecentPartners
+from database.user_cache import UserCache
+from database.user_record import UserRecord, USER_SELECT
+from utils.timer_wheel import TimerWheel
+from database.migrations import apply_schema_migrations
+from database.connection_pool import ConnectionPool
 
 
 class DBManager:
@@ -10,212 +22,419 @@ class DBManager:
     کلاس مدیریت پایگاه داده
     """
 
-    def __init__(self):
+    def __init__(self, db_name=DB_NAME):
         """
         مقداردهی اولیه مدیریت پایگاه داده
         """
-        self.db_name = DB_NAME
+        self.db_name = db_name
         self.logger = logging.getLogger('chatogram.database')
-        self.conn = None
+        self.pool = ConnectionPool(self.db_name)
+
+        # وضعیت واحد کار نخ جاری (unit_of_work)
+        self._unit = threading.local()
+        self.chat_registry = ChatRegistry()
+        self.message_journal = MessageJournal(self.db_name)
+        self.presence = PresenceTracker(self.db_name)
+        self.reencryptor = MessageReencryptor(self.db_name)
+        self.waiting_pool = WaitingPool()
+        self.block_cache = BlockCache(self)
+        self.recent_partners = RecentPartners()
+        self.user_cache = UserCache()
+
+        # بارگذاری ستون‌های سنگین رکوردهای کاربر (یک شیء مشترک برای همه رکوردها)
+        self._user_text_loader = self.load_user_text
+
+        # مهلت بی‌فعالیتی چت‌های فعال (پایان آن‌ها توسط ChatReaper انجام می‌شود)
+        self.chat_timers = TimerWheel()
+        self.chat_idle_timeout = CHAT_IDLE_TIMEOUT
 
     def get_connection(self):
         """
-        برقراری اتصال به پایگاه داده
+        دریافت اتصال نخ جاری به پایگاه داده
         """
-        if self.conn is None:
-            self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
-        return self.conn
+        return self.pool.get()
+
+    def get_read_connection(self):
+        """
+        دریافت اتصال فقط‌خواندنی نخ جاری (برای گزارش‌ها و آمار طولانی)
+        """
+        return self.pool.get(read_only=True)
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        واحد کار یک آپدیت
+
+        درون این بلوک commit مدل‌ها و DBManager به تعویق می‌افتد و همه نوشتن‌های نخ
+        جاری در پایان بلوک با یک commit ثبت می‌شوند. اگر خطایی از بلوک خارج شود یا
+        هندلر واحد را با mark_failed ناموفق اعلام کند، کل تراکنش برگردانده می‌شود.
+        فراخوانی‌های API تلگرام که هنگام باز بودن تراکنش انجام شوند (defer) پس از پایان
+        تراکنش اجرا می‌شوند تا قفل نوشتن در طول درخواست‌های شبکه نگه داشته نشود.
+        بلوک‌های تو در تو به بلوک بیرونی می‌پیوندند.
+        """
+        depth = getattr(self._unit, 'depth', 0)
+        self._unit.depth = depth + 1
+
+        if depth:
+            try:
+                yield
+            finally:
+                self._unit.depth = depth
+            return
+
+        conn = self.get_connection()
+        self._unit.failed = False
+        self._unit.deferred = []
+
+        try:
+            yield
+        except Exception:
+            self._unit.failed = True
+            # پیام‌های نوشتن‌های برگردانده‌شده ارسال نمی‌شوند
+            self._unit.deferred = []
+            raise
+        finally:
+            self._unit.depth = 0
+            deferred = self._unit.deferred
+            self._unit.deferred = []
+
+            try:
+                if self._unit.failed:
+                    self._rollback_transaction(conn)
+                elif conn.in_transaction:
+                    conn.commit()
+                    self._unit.undo = []
+            except Exception as e:
+                self.logger.error(f"Error committing unit of work: {str(e)}")
+                self._rollback_transaction(conn)
+                # پیام‌های مربوط به نوشتن‌های ثبت‌نشده ارسال نمی‌شوند
+                deferred = []
+            finally:
+                self._flush_invalidations()
+
+            self._run_deferred(deferred)
+
+    def in_unit_of_work(self):
+        """
+        بررسی اجرای نخ جاری درون واحد کار
+        """
+        return getattr(self._unit, 'depth', 0) > 0
+
+    def has_pending_writes(self):
+        """
+        بررسی وجود نوشتن ثبت‌نشده در واحد کار نخ جاری (تراکنش نوشتن باز)
+        """
+        return self.in_unit_of_work() and self.get_connection().in_transaction
+
+    def defer(self, callback):
+        """
+        اجرای یک فراخوانی پس از پایان واحد کار نخ جاری
+
+        بیرون از واحد کار فراخوانی بلافاصله اجرا می‌شود.
+        """
+        if not self.in_unit_of_work():
+            callback()
+            return
+        self._unit.deferred.append(callback)
+
+    def _run_deferred(self, deferred):
+        """
+        اجرای فراخوانی‌های به تعویق افتاده (بیرون از تراکنش)
+        """
+        for callback in deferred:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"Error in deferred call: {str(e)}")
+
+    def on_rollback(self, callback):
+        """
+        ثبت عملیات جبرانی وضعیت درون حافظه‌ای برای برگرداندن تراکنش جاری نخ
+
+        عملیات پس از ثبت تراکنش حذف و در صورت برگرداندن آن به ترتیب معکوس اجرا می‌شوند.
+        """
+        undo = getattr(self._unit, 'undo', None)
+        if undo is None:
+            undo = self._unit.undo = []
+        undo.append(callback)
+
+    def mark_failed(self):
+        """
+        اعلام شکست آپدیت جاری (از مسیر except هندلرها)
+
+        تراکنش بلافاصله برگردانده می‌شود و فراخوانی‌های API به تعویق افتاده تا این
+        لحظه حذف می‌شوند؛ نوشتن‌های بعدی همان واحد کار نیز در پایان آن برگردانده می‌شوند.
+        """
+        self._rollback_transaction(self.get_connection())
+
+        if self.in_unit_of_work():
+            self._unit.failed = True
+            self._unit.deferred = []
+
+    def _rollback_transaction(self, conn):
+        """
+        برگرداندن تراکنش و اجرای عملیات جبرانی وضعیت درون حافظه‌ای
+        """
+        try:
+            conn.rollback()
+        finally:
+            undo = getattr(self._unit, 'undo', None) or []
+            self._unit.undo = []
+
+            for callback in reversed(undo):
+                try:
+                    callback()
+                except Exception as e:
+                    self.logger.error(f"Error undoing in-memory state: {str(e)}")
+
+            self._flush_invalidations()
+
+    def commit(self, conn=None):
+        """
+        ثبت تراکنش
+
+        درون واحد کار ثبت تا پایان آن به تعویق می‌افتد.
+        """
+        if self.in_unit_of_work():
+            return
+        (conn or self.get_connection()).commit()
+        self._unit.undo = []
+        self._flush_invalidations()
+
+    def rollback(self, conn=None):
+        """
+        برگرداندن تراکنش جاری
+
+        درون واحد کار کل آپدیت ناموفق اعلام می‌شود (mark_failed) تا نوشتن‌های قبلی
+        همان آپدیت بی‌صدا حذف نشوند و بقیه آن نیز ثبت نشود.
+        """
+        if self.in_unit_of_work():
+            self.mark_failed()
+            return
+        self._rollback_transaction(conn or self.get_connection())
+
+    def _pending_users(self):
+        """
+        کاربران تغییرکرده‌ای که تراکنش آن‌ها در نخ جاری هنوز ثبت نشده است
+        """
+        pending = getattr(self._unit, 'pending_users', None)
+        if pending is None:
+            pending = self._unit.pending_users = set()
+        return pending
+
+    def invalidate_users(self, *user_ids):
+        """
+        حذف ردیف کاربران تغییرکرده از کش کاربران
+
+        حذف پس از ثبت یا برگرداندن تراکنش تکرار می‌شود تا ردیف قدیمی‌ای که نخ
+        دیگری پیش از commit خوانده در کش باقی نماند.
+        """
+        self.user_cache.invalidate_ids(user_ids)
+        self._pending_users().update(user_ids)
+
+    def _flush_invalidations(self):
+        """
+        حذف دوباره کاربران تغییرکرده پس از پایان تراکنش
+        """
+        pending = self._pending_users()
+        if pending:
+            self.user_cache.invalidate_ids(pending)
+            pending.clear()
+
+    def _cache_user(self, row, generation):
+        """
+        افزودن ردیف خوانده‌شده به کش (به جز ردیف‌های تغییرکرده و ثبت‌نشده نخ جاری)
+        """
+        if row['id'] not in self._pending_users():
+            self.user_cache.put(row, generation)
 
     def setup(self):
         """
         ایجاد جداول پایگاه داده
         """
         conn = self.get_connection()
+
+        # ایجاد جداول، ایندکس‌ها و سایر تغییرات نسخه‌دار طرح (در صورت به‌روز بودن فقط یک خواندن)
+        version = apply_schema_migrations(conn)
+        self.logger.info(f"Database schema version: {version}")
+
+        self.load_active_chats()
+        self.message_journal.start()
+        self.presence.start()
+
+        # بازرمزگذاری پیام‌های قدیمی با کلید فعال در پس‌زمینه (از آخرین نقطه بازیابی)؛
+        # فقط در صورت فعال بودن REENCRYPT_ON_STARTUP
+        if REENCRYPT_ON_STARTUP:
+            self.reencryptor.start()
+
+    def load_active_chats(self):
+        """
+        بازسازی جدول جفت‌های چت فعال از جدول chats
+        """
+        conn = self.get_connection()
         cursor = conn.cursor()
 
-        # جدول کاربران
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            telegram_id INTEGER UNIQUE,
-            username TEXT,
-            display_name TEXT DEFAULT 'کاربر ناشناس',
-            age INTEGER DEFAULT 0,
-            gender TEXT,
-            bio TEXT DEFAULT 'هنوز اطلاعاتی وارد نشده!',
-            city TEXT,
-            profile_pic TEXT,
-            coins INTEGER DEFAULT 20,
-            is_online BOOLEAN DEFAULT 0,
-            is_banned BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # جدول چت‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chats (
-            id INTEGER PRIMARY KEY,
-            user1_id INTEGER,
-            user2_id INTEGER,
-            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ended_at TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1,
-            FOREIGN KEY (user1_id) REFERENCES users (id),
-            FOREIGN KEY (user2_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول پیام‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY,
-            chat_id INTEGER,
-            sender_id INTEGER,
-            message_type TEXT,
-            content TEXT,
-            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (chat_id) REFERENCES chats (id),
-            FOREIGN KEY (sender_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول تراکنش‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            amount INTEGER,
-            transaction_type TEXT,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول دنبال‌کنندگان
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS followers (
-            id INTEGER PRIMARY KEY,
-            follower_id INTEGER,
-            followed_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (follower_id) REFERENCES users (id),
-            FOREIGN KEY (followed_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول لایک‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS likes (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            liked_user_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (liked_user_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول بلاک‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS blocks (
-            id INTEGER PRIMARY KEY,
-            blocker_id INTEGER,
-            blocked_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (blocker_id) REFERENCES users (id),
-            FOREIGN KEY (blocked_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول گزارش‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reports (
-            id INTEGER PRIMARY KEY,
-            reporter_id INTEGER,
-            reported_id INTEGER,
-            reason TEXT,
-            status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (reporter_id) REFERENCES users (id),
-            FOREIGN KEY (reported_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول دعوت‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS invites (
-            id INTEGER PRIMARY KEY,
-            inviter_id INTEGER,
-            invited_id INTEGER,
-            is_registered BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (inviter_id) REFERENCES users (id),
-            FOREIGN KEY (invited_id) REFERENCES users (id)
-        )
-        ''')
-
-        # جدول تنظیمات
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        # جدول فعالیت ادمین‌ها
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS admin_logs (
-            id INTEGER PRIMARY KEY,
-            admin_id INTEGER,
-            action TEXT,
-            details TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (admin_id) REFERENCES users (id)
-        )
-        ''')
+        cursor.execute("""
+            SELECT c.id, c.user1_id, c.user2_id,
+                   u1.telegram_id AS telegram_id1, u2.telegram_id AS telegram_id2
+            FROM chats c
+            JOIN users u1 ON u1.id = c.user1_id
+            JOIN users u2 ON u2.id = c.user2_id
+            WHERE c.is_active = 1
+        """)
 
-        conn.commit()
-        self.logger.info("Database tables created successfully")
+        self.chat_registry.load(cursor.fetchall())
+
+        # چت‌های فعال قبلی از زمان راه‌اندازی مهلت کامل دارند
+        for chat_id in self.chat_registry.get_chat_ids():
+            self.touch_chat(chat_id)
+
+    def touch_chat(self, chat_id):
+        """
+        تمدید مهلت بی‌فعالیتی یک چت
+        """
+        self.chat_timers.schedule(chat_id, time.time() + self.chat_idle_timeout)
 
     def add_user(self, telegram_id, username=None):
         """
         افزودن کاربر جدید
+
+        در صورت وجود کاربر (مثلاً دو /start همزمان) شناسه کاربر موجود برگردانده می‌شود.
+        """
+        user = self.get_or_create_user(telegram_id, username)
+        return user['id'] if user else None
+
+    def get_or_create_user(self, telegram_id, username=None):
+        """
+        دریافت یا ثبت‌نام کاربر با شناسه تلگرام
+
+        کاربر موجود از کش یا با یک SELECT خوانده می‌شود؛ کاربر جدید با یک INSERT ...
+        ON CONFLICT DO NOTHING RETURNING ثبت و همزمان خوانده می‌شود. اگر نخ دیگری
+        همان کاربر را زودتر ثبت کرده باشد، ردیف آن خوانده می‌شود.
         """
+        user = self.get_user_by_telegram_id(telegram_id)
+        if user:
+            return user
+
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
             cursor.execute(
-                "INSERT INTO users (telegram_id, username) VALUES (?, ?)",
+                f"""
+                INSERT INTO users (telegram_id, username) VALUES (?, ?)
+                ON CONFLICT (telegram_id) DO NOTHING
+                RETURNING {USER_SELECT}
+                """,
                 (telegram_id, username)
             )
-            conn.commit()
-            return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            self.logger.warning(f"User with telegram_id {telegram_id} already exists")
-            cursor.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
             result = cursor.fetchone()
-            return result['id'] if result else None
+
+            if result:
+                user = UserRecord.from_row(result, self._user_text_loader)
+                # ردیف تا ثبت تراکنش در کش قرار نمی‌گیرد
+                self.invalidate_users(user['id'])
+                self.commit(conn)
+                return user
+        except Exception as e:
+            self.logger.error(f"Error creating user {telegram_id}: {str(e)}")
+            self.rollback(conn)
+            return None
+
+        return self.get_user_by_telegram_id(telegram_id)
+
+    def get_or_create_users(self, telegram_ids):
+        """
+        دریافت یا ثبت‌نام دسته‌ای کاربران (مثلاً ورود لیست شناسه‌های تلگرام)
+
+        همه کاربران جدید در یک تراکنش ثبت می‌شوند و ردیف‌ها با کوئری‌های IN خوانده
+        می‌شوند. خروجی دیکشنری شناسه تلگرام به رکورد کاربر است.
+        """
+        telegram_ids = list(dict.fromkeys(telegram_ids))
+        if not telegram_ids:
+            return {}
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany(
+                "INSERT INTO users (telegram_id) VALUES (?) ON CONFLICT (telegram_id) DO NOTHING",
+                [(telegram_id,) for telegram_id in telegram_ids]
+            )
+
+            users = {}
+            # تعداد پارامترهای هر کوئری زیر محدودیت SQLite نگه داشته می‌شود
+            for start in range(0, len(telegram_ids), 500):
+                chunk = telegram_ids[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(
+                    f"SELECT {USER_SELECT} FROM users WHERE telegram_id IN ({placeholders})",
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    users[row['telegram_id']] = UserRecord.from_row(row, self._user_text_loader)
+
+            self.invalidate_users(*(user['id'] for user in users.values()))
+            self.commit(conn)
+            return users
+        except Exception as e:
+            self.logger.error(f"Error creating users: {str(e)}")
+            self.rollback(conn)
+            return {}
 
     def get_user_by_telegram_id(self, telegram_id):
         """
         دریافت اطلاعات کاربر با شناسه تلگرام
         """
+        cached = self.user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+
+        generation = self.user_cache.generation()
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM users WHERE telegram_id = ?", (telegram_id,))
+        cursor.execute(f"SELECT {USER_SELECT} FROM users WHERE telegram_id = ?", (telegram_id,))
         result = cursor.fetchone()
 
         if result:
-            return dict(result)
+            user = UserRecord.from_row(result, self._user_text_loader)
+            self._cache_user(user, generation)
+            return user
+        return None
+
+    def get_user_by_id(self, user_id):
+        """
+        دریافت اطلاعات کاربر با شناسه
+        """
+        cached = self.user_cache.get_by_id(user_id)
+        if cached is not None:
+            return cached
+
+        generation = self.user_cache.generation()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f"SELECT {USER_SELECT} FROM users WHERE id = ?", (user_id,))
+        result = cursor.fetchone()
+
+        if result:
+            user = UserRecord.from_row(result, self._user_text_loader)
+            self._cache_user(user, generation)
+            return user
         return None
 
+    def load_user_text(self, user_id):
+        """
+        دریافت ستون‌های متنی سنگین کاربر (bio و profile_pic) برای بارگذاری تنبل رکورد
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT bio, profile_pic FROM users WHERE id = ?", (user_id,))
+        return cursor.fetchone()
+
     def update_user(self, user_id, **kwargs):
         """
         به‌روزرسانی اطلاعات کاربر
@@ -238,26 +457,122 @@ class DBManager:
         update_values.append(user_id)
 
         cursor.execute(query, update_values)
-        conn.commit()
+        self.invalidate_users(user_id)
+        self.commit(conn)
 
         return cursor.rowcount > 0
 
+    def update_profile(self, user_id, field, value):
+        """
+        به‌روزرسانی یک فیلد پروفایل و افزایش نسخه پروفایل
+
+        نسخه در همان دستور UPDATE افزایش می‌یابد تا همیشه با محتوای ردیف هماهنگ
+        باشد (کلید کش کارت‌های پروفایل). خروجی نسخه جدید یا None است.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            f"""
+            UPDATE users SET {field} = ?, profile_version = COALESCE(profile_version, 0) + 1
+            WHERE id = ?
+            RETURNING profile_version
+            """,
+            (value, user_id)
+        )
+        result = cursor.fetchone()
+
+        self.invalidate_users(user_id)
+        self.commit(conn)
+
+        return result['profile_version'] if result else None
+
     def start_chat(self, user1_id, user2_id):
         """
         شروع یک چت جدید
+
+        هر دو کاربر ابتدا به صورت اتمیک در جدول جفت‌های فعال رزرو می‌شوند و فقط در
+        صورت موفقیت ردیف چت درج می‌شود؛ بنابراین هیچ کاربری همزمان در دو چت فعال
+        قرار نمی‌گیرد. در صورت مشغول بودن یکی از دو طرف None برگردانده می‌شود.
         """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
-            "INSERT INTO chats (user1_id, user2_id) VALUES (?, ?)",
+            "SELECT id, telegram_id FROM users WHERE id IN (?, ?)",
             (user1_id, user2_id)
         )
-        conn.commit()
+        telegram_ids = {row['id']: row['telegram_id'] for row in cursor.fetchall()}
 
-        return cursor.lastrowid
+        if user1_id not in telegram_ids or user2_id not in telegram_ids:
+            return None
+
+        telegram_id1 = telegram_ids[user1_id]
+        telegram_id2 = telegram_ids[user2_id]
 
-    def end_chat(self, chat_id):
+        if not self.chat_registry.claim(telegram_id1, telegram_id2):
+            self.logger.warning(f"Cannot start chat between {user1_id} and {user2_id}: user already in a chat")
+            return None
+
+        try:
+            cursor.execute(
+                "INSERT INTO chats (user1_id, user2_id) VALUES (?, ?)",
+                (user1_id, user2_id)
+            )
+            chat_id = cursor.lastrowid
+
+            # چت فعال و هم‌صحبت هر دو طرف در همان تراکنش در ردیف کاربران ثبت می‌شود
+            cursor.execute(
+                """
+                UPDATE users SET active_chat_id = ?, partner_id = CASE id WHEN ? THEN ? ELSE ? END
+                WHERE id IN (?, ?)
+                """,
+                (chat_id, user1_id, user2_id, user1_id, user1_id, user2_id)
+            )
+
+            self.invalidate_users(user1_id, user2_id)
+        except Exception:
+            self.chat_registry.release(telegram_id1, telegram_id2)
+            raise
+
+        # کاربرانی که وارد چت شده‌اند دیگر در صف انتظار نیستند
+        self.waiting_pool.remove(user1_id)
+        self.waiting_pool.remove(user2_id)
+
+        # ثبت چت در جدول جفت‌های فعال
+        self.chat_registry.register(chat_id, user1_id, telegram_id1, user2_id, telegram_id2)
+        self.touch_chat(chat_id)
+
+        # با برگرداندن تراکنش (مثلاً شکست آپدیت) چت از حافظه نیز حذف می‌شود
+        self.on_rollback(lambda: self._forget_chat(chat_id))
+
+        try:
+            self.commit(conn)
+        except Exception:
+            self.rollback(conn)
+            raise
+
+        return chat_id
+
+    def _forget_chat(self, chat_id):
+        """
+        حذف چت ثبت‌نشده از جدول جفت‌ها و تایمرهای بی‌فعالیتی
+        """
+        self.chat_registry.unregister(chat_id)
+        self.chat_timers.cancel(chat_id)
+
+    def _restore_chat(self, chat_id, members, telegram_ids):
+        """
+        ثبت دوباره چتی که پایان آن برگردانده شده است
+        """
+        if not self.chat_registry.claim(*telegram_ids):
+            self.logger.warning(f"Cannot restore chat {chat_id}: a member started another chat")
+            return
+
+        self.chat_registry.register(chat_id, members[0], telegram_ids[0], members[1], telegram_ids[1])
+        self.touch_chat(chat_id)
+
+    def end_chat(self, chat_id, commit=True):
         """
         پایان دادن به یک چت
         """
@@ -268,39 +583,62 @@ class DBManager:
             "UPDATE chats SET is_active = 0, ended_at = CURRENT_TIMESTAMP WHERE id = ?",
             (chat_id,)
         )
-        conn.commit()
+        ended = cursor.rowcount > 0
 
-        return cursor.rowcount > 0
+        cursor.execute(
+            """
+            UPDATE users SET active_chat_id = NULL, partner_id = NULL
+            WHERE id IN (SELECT user1_id FROM chats WHERE id = ? UNION ALL SELECT user2_id FROM chats WHERE id = ?)
+            AND active_chat_id = ?
+            """,
+            (chat_id, chat_id, chat_id)
+        )
+
+        members = self.chat_registry.get_members(chat_id)
+        if members:
+            self.invalidate_users(*members)
+        else:
+            cursor.execute("SELECT user1_id, user2_id FROM chats WHERE id = ?", (chat_id,))
+            result = cursor.fetchone()
+            if result:
+                self.invalidate_users(result['user1_id'], result['user2_id'])
+
+        # ثبت طرفین در حافظه هم‌صحبت‌های اخیر تا بلافاصله دوباره جفت نشوند
+        if ended and members:
+            self.recent_partners.record(*members)
+
+        telegram_ids = self.chat_registry.unregister(chat_id)
+        self.chat_timers.cancel(chat_id)
+
+        # با برگرداندن تراکنش، چت دوباره در جدول جفت‌ها ثبت می‌شود
+        if telegram_ids and members:
+            self.on_rollback(lambda: self._restore_chat(chat_id, members, telegram_ids))
+
+        if commit:
+            self.commit(conn)
+
+        return ended
 
     def add_message(self, chat_id, sender_id, message_type, content):
         """
         افزودن پیام به چت
-        """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # رمزگذاری محتوای پیام
-        encrypted_content = encrypt(content)
-
-        cursor.execute(
-            "INSERT INTO messages (chat_id, sender_id, message_type, content) VALUES (?, ?, ?, ?)",
-            (chat_id, sender_id, message_type, encrypted_content)
-        )
-        conn.commit()
 
-        return cursor.lastrowid
+        پیام در صف ثبت پیام‌ها قرار می‌گیرد و رمزگذاری و درج آن در پس‌زمینه انجام می‌شود.
+        """
+        return self.message_journal.append(chat_id, sender_id, message_type, content)
 
     def get_active_chat(self, user_id):
         """
-        دریافت چت فعال کاربر
+        دریافت چت فعال کاربر (از طریق active_chat_id ردیف کاربر)
         """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT * FROM chats 
-            WHERE (user1_id = ? OR user2_id = ?) AND is_active = 1
-        """, (user_id, user_id))
+            SELECT c.* FROM users u
+            JOIN chats c ON c.id = u.active_chat_id
+            WHERE u.id = ?
+        """, (user_id,))
 
         result = cursor.fetchone()
 
@@ -316,66 +654,142 @@ class DBManager:
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT * FROM chats WHERE id = ?
-        """, (chat_id,))
+            SELECT p.* FROM users u
+            JOIN users p ON p.id = u.partner_id
+            WHERE u.id = ? AND u.active_chat_id = ?
+        """, (user_id, chat_id))
 
-        chat = cursor.fetchone()
+        result = cursor.fetchone()
 
-        if not chat:
-            return None
+        if result:
+            return UserRecord(result, self._user_text_loader)
+        return None
 
-        partner_id = chat['user1_id'] if chat['user2_id'] == user_id else chat['user2_id']
+    def end_all_active_chats(self, user_id, commit=True):
+        """
+        پایان دادن به چت فعال کاربر (مثلاً هنگام مسدودسازی)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
 
-        cursor.execute("SELECT * FROM users WHERE id = ?", (partner_id,))
+        cursor.execute("SELECT active_chat_id FROM users WHERE id = ?", (user_id,))
         result = cursor.fetchone()
 
-        if result:
-            return dict(result)
-        return None
+        if not result or not result['active_chat_id']:
+            return False
 
-    def find_random_partner(self, user_id, gender=None, city=None):
+        return self.end_chat(result['active_chat_id'], commit=commit)
+
+    def get_report_count(self, user_id):
         """
-        یافتن یک کاربر تصادفی برای چت
+        تعداد گزارش‌های ثبت‌شده علیه کاربر
         """
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        query = """
-            SELECT * FROM users 
-            WHERE id != ? 
-            AND is_online = 1 
-            AND is_banned = 0
-            AND id NOT IN (
-                SELECT user1_id FROM chats WHERE is_active = 1
-                UNION
-                SELECT user2_id FROM chats WHERE is_active = 1
-            )
-            AND id NOT IN (
-                SELECT blocked_id FROM blocks WHERE blocker_id = ?
-                UNION
-                SELECT blocker_id FROM blocks WHERE blocked_id = ?
-            )
+        cursor.execute("SELECT COUNT(*) FROM reports WHERE reported_id = ?", (user_id,))
+        return cursor.fetchone()[0]
+
+    def leave_waiting_pool(self, user_id):
         """
+        خروج کاربر از صف انتظار (مثلاً هنگام مسدودسازی)
 
-        params = [user_id, user_id, user_id]
+        در صورت rollback واحد کار، کاربر با همان زمان انتظار به صف برمی‌گردد.
+        """
+        entry = self.waiting_pool.remove(user_id)
+        if entry:
+            self.on_rollback(lambda: self.waiting_pool.requeue(entry))
+        return entry
 
-        if gender:
-            query += " AND gender = ?"
-            params.append(gender)
+    def _match_waiting(self, user, gender=None, city=None):
+        """
+        یافتن بهترین هم‌صحبت سازگار در صف انتظار (یا افزودن کاربر به صف)
+        """
+        if user.get('is_banned') or self.chat_registry.get(user['telegram_id']):
+            return None
 
-        if city:
-            query += " AND city = ?"
-            params.append(city)
+        # درخواست هم‌صحبت فعالیت کاربر است؛ کاربر منتظر پس از مهلت بی‌فعالیتی از صف خارج می‌شود
+        self.presence.touch(user['telegram_id'])
 
-        query += " ORDER BY RANDOM() LIMIT 1"
+        def is_compatible(candidate):
+            if self.chat_registry.get(candidate.telegram_id) is not None:
+                return False
 
-        cursor.execute(query, params)
-        result = cursor.fetchone()
+            # کاربری که پس از ورود به صف مسدود شده است انتخاب نمی‌شود
+            candidate_user = self.get_user_by_id(candidate.user_id)
+            return candidate_user is not None and not candidate_user.get('is_banned')
+
+        entry = self.waiting_pool.make_entry(
+            user,
+            wanted_gender=gender,
+            wanted_city=city,
+            reports=self.get_report_count(user['id'])
+        )
+
+        return self.waiting_pool.match(
+            entry,
+            excluded_ids=self.block_cache.get_excluded_ids(user['id']),
+            recent_ids=self.recent_partners.get(user['id']),
+            is_compatible=is_compatible
+        )
+
+    def find_random_partner(self, user, gender=None, city=None):
+        """
+        یافتن یک کاربر تصادفی برای چت
+
+        بهترین هم‌صحبت صف انتظار بر اساس امتیاز انتخاب می‌شود؛ اگر کاربر سازگاری در صف
+        نباشد، کاربر به صف اضافه شده و None برگردانده می‌شود تا با رسیدن نفر بعدی
+        به هر دو اطلاع داده شود.
+        """
+        partner = self._match_waiting(user, gender, city)
+
+        if partner:
+            return {'id': partner.user_id, 'telegram_id': partner.telegram_id}
+        return None
+
+    def pair_random_partner(self, user, gender=None, city=None, attempts=3):
+        """
+        یافتن هم‌صحبت و ایجاد چت به صورت یک عملیات اتمیک
+
+        خروجی اطلاعات هم‌صحبت به همراه شناسه چت است؛ اگر کاربر در صف انتظار قرار
+        گیرد None برگردانده می‌شود.
+        """
+        for _ in range(attempts):
+            partner = self._match_waiting(user, gender, city)
+            if not partner:
+                return None
+
+            chat_id = self.start_chat(user['id'], partner.user_id)
+            if chat_id:
+                # با برگرداندن تراکنش، هم‌صحبت با همان زمان انتظار به صف برمی‌گردد
+                self.on_rollback(lambda: self.waiting_pool.requeue(partner))
+                return {'id': partner.user_id, 'telegram_id': partner.telegram_id, 'chat_id': chat_id}
+
+            # اگر خود کاربر در این فاصله وارد چت دیگری شده، هم‌صحبت به صف برمی‌گردد
+            if self.chat_registry.get(user['telegram_id']):
+                if not self.chat_registry.get(partner.telegram_id):
+                    self.waiting_pool.requeue(partner)
+                return None
 
-        if result:
-            return dict(result)
         return None
 
+    def skip_chat(self, chat_id, user, gender=None, city=None):
+        """
+        پایان چت فعلی و جفت شدن فوری با هم‌صحبت بعدی
+
+        پایان چت قبلی و ایجاد چت جدید در یک تراکنش ثبت می‌شوند؛ هم‌صحبت قبلی به
+        دلیل ثبت در حافظه هم‌صحبت‌های اخیر دوباره انتخاب نمی‌شود. خروجی مانند
+        pair_random_partner است.
+        """
+        conn = self.get_connection()
+        self.end_chat(chat_id, commit=False)
+
+        partner = self.pair_random_partner(user, gender=gender, city=city)
+
+        # در صورت پیدا نشدن هم‌صحبت، پایان چت به تنهایی ثبت می‌شود
+        self.commit(conn)
+        return partner
+
     def search_users(self, search_params, exclude_user_id):
         """
         جستجوی کاربران بر اساس پارامترها
@@ -383,9 +797,9 @@ class DBManager:
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        query = """
-            SELECT * FROM users 
-            WHERE id != ? 
+        query = f"""
+            SELECT {USER_SELECT} FROM users
+            WHERE id != ?
             AND is_banned = 0
         """
 
@@ -407,12 +821,19 @@ class DBManager:
             query += " AND age <= ?"
             params.append(search_params['max_age'])
 
-        query += " LIMIT 20"
+        # کاربران بلاک‌شده در حافظه حذف می‌شوند؛ به همان تعداد ردیف اضافه خوانده می‌شود
+        excluded_ids = self.block_cache.get_excluded_ids(exclude_user_id)
+
+        query += " LIMIT ?"
+        params.append(20 + len(excluded_ids))
 
         cursor.execute(query, params)
         results = cursor.fetchall()
 
-        return [dict(row) for row in results]
+        return [
+            UserRecord.from_row(row, self._user_text_loader)
+            for row in results if row['id'] not in excluded_ids
+        ][:20]
 
     def add_coins(self, user_id, amount, transaction_type, description):
         """
@@ -430,15 +851,19 @@ class DBManager:
 
             # ثبت تراکنش
             cursor.execute(
-                "INSERT INTO transactions (user_id, amount, transaction_type, description) VALUES (?, ?, ?, ?)",
+                """
+                INSERT INTO transactions (user_id, amount, transaction_type, description, status)
+                VALUES (?, ?, ?, ?, 'completed')
+                """,
                 (user_id, amount, transaction_type, description)
             )
 
-            conn.commit()
+            self.invalidate_users(user_id)
+            self.commit(conn)
             return True
         except Exception as e:
             self.logger.error(f"Error adding coins: {str(e)}")
-            conn.rollback()
+            self.rollback(conn)
             return False
 
     def use_coins(self, user_id, amount, transaction_type, description):
@@ -464,15 +889,19 @@ class DBManager:
 
             # ثبت تراکنش
             cursor.execute(
-                "INSERT INTO transactions (user_id, amount, transaction_type, description) VALUES (?, ?, ?, ?)",
+                """
+                INSERT INTO transactions (user_id, amount, transaction_type, description, status)
+                VALUES (?, ?, ?, ?, 'completed')
+                """,
                 (user_id, -amount, transaction_type, description)
             )
 
-            conn.commit()
+            self.invalidate_users(user_id)
+            self.commit(conn)
             return True
         except Exception as e:
             self.logger.error(f"Error using coins: {str(e)}")
-            conn.rollback()
+            self.rollback(conn)
             return False
 
     def toggle_follow(self, follower_id, followed_id):
@@ -496,7 +925,7 @@ class DBManager:
                 "DELETE FROM followers WHERE id = ?",
                 (existing['id'],)
             )
-            conn.commit()
+            self.commit(conn)
             return False  # الان دنبال نمی‌کند
         else:
             # افزودن دنبال کننده
@@ -504,7 +933,7 @@ class DBManager:
                 "INSERT INTO followers (follower_id, followed_id) VALUES (?, ?)",
                 (follower_id, followed_id)
             )
-            conn.commit()
+            self.commit(conn)
             return True  # الان دنبال می‌کند
 
     def toggle_like(self, user_id, liked_user_id):
@@ -528,7 +957,7 @@ class DBManager:
                 "DELETE FROM likes WHERE id = ?",
                 (existing['id'],)
             )
-            conn.commit()
+            self.commit(conn)
             return False  # الان لایک نکرده
         else:
             # افزودن لایک
@@ -536,7 +965,7 @@ class DBManager:
                 "INSERT INTO likes (user_id, liked_user_id) VALUES (?, ?)",
                 (user_id, liked_user_id)
             )
-            conn.commit()
+            self.commit(conn)
             return True  # الان لایک کرده
 
     def toggle_block(self, blocker_id, blocked_id):
@@ -560,16 +989,108 @@ class DBManager:
                 "DELETE FROM blocks WHERE id = ?",
                 (existing['id'],)
             )
-            conn.commit()
-            return False  # الان بلاک نکرده
         else:
             # افزودن بلاک
             cursor.execute(
                 "INSERT INTO blocks (blocker_id, blocked_id) VALUES (?, ?)",
                 (blocker_id, blocked_id)
             )
-            conn.commit()
-            return True  # الان بلاک کرده
+
+        # کش بلاک‌ها بلافاصله به‌روز و در صورت برگرداندن تراکنش به وضعیت قبلی برگردانده می‌شود
+        is_blocked = not existing
+        self.block_cache.set_blocked(blocker_id, blocked_id, is_blocked)
+        self.on_rollback(lambda: self.block_cache.set_blocked(blocker_id, blocked_id, not is_blocked))
+
+        self.commit(conn)
+        return is_blocked
+
+    def _relationship_flags(self, viewer_id, target_id, following, followed_by, liked, liked_by):
+        """
+        ساخت دیکشنری وضعیت رابطه (بلاک‌ها از کش بلاک خوانده می‌شوند)
+        """
+        return {
+            'following': following,
+            'followed_by': followed_by,
+            'mutual_follow': following and followed_by,
+            'liked': liked,
+            'liked_by': liked_by,
+            'mutual_like': liked and liked_by,
+            'blocked': self.block_cache.has_blocked(viewer_id, target_id),
+            'blocked_by': self.block_cache.has_blocked(target_id, viewer_id),
+        }
+
+    def get_relationship_flags(self, viewer_id, target_id):
+        """
+        دریافت همه وضعیت‌های رابطه بیننده با کاربر هدف با یک کوئری
+
+        دنبال کردن و لایک در هر دو جهت با EXISTS روی ایندکس‌های جفت جداول خوانده
+        می‌شوند؛ بلاک‌ها از کش بلاک.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT
+                EXISTS (SELECT 1 FROM followers WHERE follower_id = ? AND followed_id = ?) AS following,
+                EXISTS (SELECT 1 FROM followers WHERE follower_id = ? AND followed_id = ?) AS followed_by,
+                EXISTS (SELECT 1 FROM likes WHERE user_id = ? AND liked_user_id = ?) AS liked,
+                EXISTS (SELECT 1 FROM likes WHERE user_id = ? AND liked_user_id = ?) AS liked_by
+        """, (viewer_id, target_id, target_id, viewer_id) * 2)
+
+        result = cursor.fetchone()
+
+        return self._relationship_flags(
+            viewer_id, target_id,
+            bool(result['following']), bool(result['followed_by']),
+            bool(result['liked']), bool(result['liked_by'])
+        )
+
+    def get_relationship_flags_many(self, viewer_id, target_ids):
+        """
+        دریافت وضعیت‌های رابطه بیننده با چند کاربر هدف (مثلاً یک صفحه نتایج جستجو)
+
+        برای هر دسته از کاربران یک کوئری UNION ALL اجرا می‌شود. خروجی دیکشنری شناسه
+        کاربر هدف به وضعیت‌های رابطه است.
+        """
+        target_ids = list(dict.fromkeys(target_ids))
+        if not target_ids:
+            return {}
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        found = {kind: set() for kind in ('following', 'followed_by', 'liked', 'liked_by')}
+
+        # هر دسته چهار بار در کوئری تکرار می‌شود؛ تعداد پارامترها زیر محدودیت SQLite می‌ماند
+        for start in range(0, len(target_ids), 200):
+            chunk = target_ids[start:start + 200]
+            placeholders = ', '.join('?' * len(chunk))
+
+            cursor.execute(f"""
+                SELECT 'following' AS kind, followed_id AS target_id FROM followers
+                WHERE follower_id = ? AND followed_id IN ({placeholders})
+                UNION ALL
+                SELECT 'followed_by', follower_id FROM followers
+                WHERE followed_id = ? AND follower_id IN ({placeholders})
+                UNION ALL
+                SELECT 'liked', liked_user_id FROM likes
+                WHERE user_id = ? AND liked_user_id IN ({placeholders})
+                UNION ALL
+                SELECT 'liked_by', user_id FROM likes
+                WHERE liked_user_id = ? AND user_id IN ({placeholders})
+            """, [viewer_id, *chunk] * 4)
+
+            for row in cursor.fetchall():
+                found[row['kind']].add(row['target_id'])
+
+        return {
+            target_id: self._relationship_flags(
+                viewer_id, target_id,
+                target_id in found['following'], target_id in found['followed_by'],
+                target_id in found['liked'], target_id in found['liked_by']
+            )
+            for target_id in target_ids
+        }
 
     def report_user(self, reporter_id, reported_id, reason):
         """
@@ -582,7 +1103,7 @@ class DBManager:
             "INSERT INTO reports (reporter_id, reported_id, reason) VALUES (?, ?, ?)",
             (reporter_id, reported_id, reason)
         )
-        conn.commit()
+        self.commit(conn)
 
         return cursor.lastrowid
 
@@ -597,7 +1118,7 @@ class DBManager:
             "INSERT INTO invites (inviter_id, invited_id) VALUES (?, ?)",
             (inviter_id, 0)  # از 0 به عنوان مقدار موقت استفاده می‌کنیم
         )
-        conn.commit()
+        self.commit(conn)
 
         # از شناسه رکورد به عنوان کد دعوت استفاده می‌کنیم
         invite_id = cursor.lastrowid
@@ -616,7 +1137,7 @@ class DBManager:
                 "UPDATE invites SET invited_id = ?, is_registered = 1 WHERE id = ? AND is_registered = 0",
                 (invited_user_id, invite_code)
             )
-            conn.commit()
+            self.commit(conn)
 
             if cursor.rowcount > 0:
                 # دریافت شناسه دعوت‌کننده
@@ -635,6 +1156,9 @@ class DBManager:
         """
         بستن اتصال به پایگاه داده
         """
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        # نوشتن پیام‌های باقی‌مانده در صف
+        self.message_journal.stop()
+        self.presence.stop()
+        self.reencryptor.stop()
+
+        self.pool.close_all()
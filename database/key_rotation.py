@@ -0,0 +1,163 @@
+import threading
+import time
+import logging
+from config.settings import DB_NAME, REENCRYPT_BATCH_SIZE
+from database.connection_pool import connect
+from utils import crypto
+
+
+class MessageReencryptor:
+    """
+    بازرمزگذاری آنلاین پیام‌ها با کلید فعال
+
+    جدول messages به ترتیب شناسه (keyset) و در دسته‌های کوچک پیموده می‌شود؛ هر
+    دسته در یک تراکنش کوتاه به‌روزرسانی شده و نقطه بازیابی در جدول settings ذخیره
+    می‌شود تا کار پس از راه‌اندازی مجدد از همان نقطه ادامه یابد.
+    """
+
+    def __init__(self, db_name=DB_NAME, key_ring=None, batch_size=REENCRYPT_BATCH_SIZE, pause=0.05):
+        """
+        مقداردهی اولیه کار بازرمزگذاری
+        """
+        self.db_name = db_name
+        self.key_ring = key_ring or crypto.key_ring
+        self.batch_size = batch_size
+        self.pause = pause
+        self.logger = logging.getLogger('chatogram.database.key_rotation')
+
+        # نقطه بازیابی برای هر ترکیب موتور و کلید فعال جداگانه است
+        self.checkpoint_key = f'reencrypt_checkpoint_{self.key_ring.engine_name}_{self.key_ring.active_key_id}'
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # وضعیت پیشرفت
+        self.progress = {
+            'last_id': 0,
+            'max_id': 0,
+            'scanned': 0,
+            'reencrypted': 0,
+            'failed': 0,
+            'rows_per_sec': 0.0,
+            'done': False
+        }
+
+    def start(self):
+        """
+        شروع کار در یک نخ پس‌زمینه
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='message-reencryptor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        توقف کار (نقطه بازیابی حفظ می‌شود)
+        """
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+
+    def get_progress(self):
+        """
+        دریافت وضعیت پیشرفت
+        """
+        progress = dict(self.progress)
+        span = progress['max_id'] or 1
+        progress['percent'] = min(100.0, progress['last_id'] * 100.0 / span)
+        return progress
+
+    def _load_checkpoint(self, conn):
+        """
+        خواندن نقطه بازیابی
+        """
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (self.checkpoint_key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _save_checkpoint(self, conn, last_id):
+        """
+        ذخیره نقطه بازیابی (در همان تراکنش دسته)
+        """
+        conn.execute(
+            """
+            INSERT INTO settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """,
+            (self.checkpoint_key, str(last_id))
+        )
+
+    def run(self, conn=None):
+        """
+        اجرای کار تا پایان جدول یا درخواست توقف
+
+        اتصال اختیاری (مثلاً برای ثبت کوئری‌ها در tests/test_query_plans.py) بسته نمی‌شود.
+        """
+        owns_connection = conn is None
+        if owns_connection:
+            conn = connect(self.db_name)
+
+        try:
+            last_id = self._load_checkpoint(conn)
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM messages").fetchone()[0]
+            self.progress.update(last_id=last_id, max_id=max_id, done=False)
+
+            started = time.monotonic()
+
+            while not self._stop_event.is_set():
+                rows = conn.execute(
+                    "SELECT id, content FROM messages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (last_id, max_id, self.batch_size)
+                ).fetchall()
+
+                if not rows:
+                    self.progress['done'] = True
+                    break
+
+                updates = []
+                for message_id, content in rows:
+                    if content is None:
+                        continue
+                    try:
+                        # ردیف خراب (مثلاً توکن ناقص) فقط همان ردیف را ناموفق می‌کند
+                        if self.key_ring.is_current(content):
+                            continue
+                        updates.append((self.key_ring.encrypt(self.key_ring.decrypt(content)), message_id))
+                    except Exception as e:
+                        self.progress['failed'] += 1
+                        self.logger.error(f"Error re-encrypting message {message_id}: {str(e)}")
+
+                last_id = rows[-1][0]
+
+                # تراکنش کوتاه برای هر دسته
+                conn.executemany("UPDATE messages SET content = ? WHERE id = ?", updates)
+                self._save_checkpoint(conn, last_id)
+                conn.commit()
+
+                elapsed = time.monotonic() - started
+                self.progress['last_id'] = last_id
+                self.progress['scanned'] += len(rows)
+                self.progress['reencrypted'] += len(updates)
+                self.progress['rows_per_sec'] = self.progress['scanned'] / elapsed if elapsed else 0.0
+
+                self.logger.debug(f"Re-encryption progress: {self.get_progress()}")
+
+                # فرصت دادن به نویسنده‌های زنده
+                time.sleep(self.pause)
+
+            self.logger.info(f"Re-encryption finished: {self.get_progress()}")
+        except Exception as e:
+            self.logger.error(f"Error in message re-encryption: {str(e)}")
+        finally:
+            if owns_connection:
+                conn.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    reencryptor = MessageReencryptor(pause=0)
+    reencryptor.run()
+    print(reencryptor.get_progress())
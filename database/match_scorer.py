@@ -0,0 +1,74 @@
+import numpy as np
+from config.settings import (
+    MATCH_WEIGHT_WAIT, MATCH_WEIGHT_AGE, MATCH_WEIGHT_CITY, MATCH_WEIGHT_RECENT,
+    MATCH_WEIGHT_REPORTS, MATCH_AGE_RANGE, MATCH_WAIT_CAP
+)
+
+
+class MatchScorer:
+    """
+    امتیازدهی برداری هم‌صحبت‌های کاندید
+
+    امتیاز هر کاندید ترکیبی از زمان انتظار، نزدیکی سن، هم‌شهری بودن، جریمه
+    هم‌صحبت‌های اخیر و جریمه سابقه گزارش است و برای همه کاندیدها با عملیات
+    آرایه‌ای NumPy محاسبه می‌شود.
+    """
+
+    def __init__(self, wait=MATCH_WEIGHT_WAIT, age=MATCH_WEIGHT_AGE, city=MATCH_WEIGHT_CITY,
+                 recent=MATCH_WEIGHT_RECENT, reports=MATCH_WEIGHT_REPORTS,
+                 age_range=MATCH_AGE_RANGE, wait_cap=MATCH_WAIT_CAP, seed=None):
+        """
+        مقداردهی اولیه وزن‌های امتیازدهی
+        """
+        self.wait = wait
+        self.age = age
+        self.city = city
+        self.recent = recent
+        self.reports = reports
+        self.age_range = max(1, age_range)
+        self.wait_cap = max(1, wait_cap)
+        self._rng = np.random.default_rng(seed)
+
+    def score(self, columns, idx, age, city_code, recent_ids, now):
+        """
+        محاسبه امتیاز کاندیدهای idx برای کاربری با سن و کد شهر مشخص
+
+        columns دیکشنری ستون‌های صف انتظار (آرایه‌های NumPy) است.
+        """
+        # زمان انتظار کاندید (نرمال‌شده بین ۰ و ۱)
+        waited = np.minimum(now - columns['enqueued_at'][idx], self.wait_cap) / self.wait_cap
+
+        # سازگاری سنی: بدون جریمه تا age_range سال، سپس کاهش خطی؛ سن نامعلوم امتیاز خنثی دارد
+        candidate_age = columns['age'][idx].astype(np.float64)
+        if age:
+            gap = np.maximum(np.abs(candidate_age - age) - self.age_range, 0.0)
+            age_score = np.clip(1.0 - gap / self.age_range, 0.0, 1.0)
+            age_score[candidate_age <= 0] = 0.5
+        else:
+            age_score = np.full(len(idx), 0.5)
+
+        # هم‌شهری بودن
+        if city_code:
+            same_city = (columns['city'][idx] == city_code).astype(np.float64)
+        else:
+            same_city = np.zeros(len(idx))
+
+        # هم‌صحبت‌های اخیر
+        if recent_ids:
+            recent = np.isin(columns['user_id'][idx], np.fromiter(recent_ids, dtype=np.int64)).astype(np.float64)
+        else:
+            recent = np.zeros(len(idx))
+
+        # سابقه گزارش (لگاریتمی تا چند گزارش کاربر را کاملاً حذف نکند)
+        reports = np.log1p(columns['reports'][idx])
+
+        scores = (
+            self.wait * waited
+            + self.age * age_score
+            + self.city * same_city
+            - self.recent * recent
+            - self.reports * reports
+        )
+
+        # نویز کوچک برای انتخاب تصادفی بین کاندیدهای هم‌امتیاز
+        return scores + self._rng.random(len(idx)) * 1e-3
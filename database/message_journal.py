@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+import logging
+from config.settings import (
+    MESSAGE_BATCH_SIZE, MESSAGE_FLUSH_INTERVAL_MS, MESSAGE_WRITE_RETRIES, MESSAGE_RETRY_BACKOFF_MS
+)
+from database.connection_pool import connect
+from utils.crypto import encrypt_many
+
+
+class MessageJournal:
+    """
+    ثبت پیام‌های چت به صورت ناهمگام (write-behind)
+
+    هندلرها پیام را در صف قرار می‌دهند و یک نخ پس‌زمینه پیام‌ها را رمزگذاری
+    کرده و به صورت دسته‌ای (هر N پیام یا هر T میلی‌ثانیه) در یک commit ذخیره می‌کند.
+    دسته ناموفق پیش از برداشتن پیام‌های بعدی با تأخیر افزایشی دوباره نوشته می‌شود و
+    فقط پس از پایان تلاش‌های مجاز کنار گذاشته (و در آمار شمرده) می‌شود.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_name, batch_size=MESSAGE_BATCH_SIZE, flush_interval_ms=MESSAGE_FLUSH_INTERVAL_MS,
+                 max_retries=MESSAGE_WRITE_RETRIES, retry_backoff_ms=MESSAGE_RETRY_BACKOFF_MS):
+        """
+        مقداردهی اولیه صف ثبت پیام‌ها
+        """
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000.0
+        self.logger = logging.getLogger('chatogram.database.message_journal')
+
+        self._queue = queue.Queue()
+        self._thread = None
+
+        # آمار عملکرد
+        self.rows_written = 0
+        self.commits = 0
+        self.retries = 0
+        self.rows_dropped = 0
+
+    def start(self):
+        """
+        شروع نخ نویسنده پس‌زمینه
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(target=self._run, name='message-journal', daemon=True)
+        self._thread.start()
+        self.logger.info("Message journal writer started")
+
+    def append(self, chat_id, sender_id, message_type, content):
+        """
+        افزودن پیام به صف نوشتن
+        """
+        self._queue.put((chat_id, sender_id, message_type, content))
+        return True
+
+    @property
+    def queue_depth(self):
+        """
+        تعداد پیام‌های در انتظار نوشتن
+        """
+        return self._queue.qsize()
+
+    def stop(self):
+        """
+        نوشتن پیام‌های باقی‌مانده و توقف نخ نویسنده
+        """
+        if self._thread and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+        else:
+            # نخ اجرا نشده است؛ صف را مستقیماً تخلیه می‌کنیم
+            conn = connect(self.db_name)
+            try:
+                batch = self._drain()
+                while batch:
+                    self._write_batch(conn, batch)
+                    batch = self._drain()
+            finally:
+                conn.close()
+
+        self.logger.info(
+            f"Message journal stopped ({self.rows_written} rows in {self.commits} commits, "
+            f"{self.retries} retries, {self.rows_dropped} rows dropped)"
+        )
+
+    def get_stats(self):
+        """
+        دریافت آمار نوشتن پیام‌ها
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'rows_written': self.rows_written,
+            'commits': self.commits,
+            'retries': self.retries,
+            'rows_dropped': self.rows_dropped
+        }
+
+    def _drain(self):
+        """
+        برداشتن حداکثر یک دسته از صف بدون انتظار
+        """
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                batch.append(item)
+        return batch
+
+    def _run(self):
+        """
+        حلقه اصلی نخ نویسنده
+        """
+        conn = connect(self.db_name)
+        stopping = False
+
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+
+                # جمع‌آوری دسته تا رسیدن به اندازه یا پایان مهلت
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._write_batch(conn, batch)
+
+            # نوشتن پیام‌هایی که پس از درخواست توقف باقی مانده‌اند
+            batch = self._drain()
+            while batch:
+                self._write_batch(conn, batch)
+                batch = self._drain()
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        """
+        رمزگذاری و درج یک دسته پیام در یک تراکنش
+
+        در صورت خطا دسته (که همچنان در ابتدای صف است، چون نخ نویسنده تا پایان آن
+        پیام دیگری برنمی‌دارد) با تأخیر افزایشی دوباره نوشته می‌شود و فقط پس از
+        max_retries تلاش ناموفق کنار گذاشته می‌شود.
+        """
+        rows = None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if rows is None:
+                    encrypted = encrypt_many([content for _, _, _, content in batch])
+                    rows = [
+                        (chat_id, sender_id, message_type, encrypted_content)
+                        for (chat_id, sender_id, message_type, _), encrypted_content in zip(batch, encrypted)
+                    ]
+
+                conn.executemany(
+                    "INSERT INTO messages (chat_id, sender_id, message_type, content) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+                self.rows_written += len(rows)
+                self.commits += 1
+                return True
+            except Exception as e:
+                self.logger.error(
+                    f"Error writing message batch (attempt {attempt + 1}/{self.max_retries + 1}): {str(e)}"
+                )
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+
+            if attempt < self.max_retries:
+                self.retries += 1
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+        self.rows_dropped += len(batch)
+        self.logger.error(f"Dropped message batch of {len(batch)} rows after {self.max_retries} retries")
+        return False
@@ -1,20 +1,13 @@
 import sqlite3
 import logging
-from config.settings import DB_NAME
+from config.settings import DB_NAME, MIGRATION_BATCH_SIZE
+from database.connection_pool import connect
 
 
-def create_tables():
-    """
-    ایجاد جداول پایگاه داده
-    """
-    logger = logging.getLogger('chatogram.database.migrations')
-
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    try:
-        # جدول کاربران
-        cursor.execute('''
+# تعریف جداول پایگاه داده (تنها منبع طرح جداول)
+TABLES = {
+    # جدول کاربران
+    'users': '''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY,
             telegram_id INTEGER UNIQUE,
@@ -29,13 +22,16 @@ def create_tables():
             coins INTEGER DEFAULT 20,
             is_online BOOLEAN DEFAULT 0,
             is_banned BOOLEAN DEFAULT 0,
+            active_chat_id INTEGER,
+            partner_id INTEGER,
+            profile_version INTEGER DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-        ''')
+    ''',
 
-        # جدول چت‌ها
-        cursor.execute('''
+    # جدول چت‌ها
+    'chats': '''
         CREATE TABLE IF NOT EXISTS chats (
             id INTEGER PRIMARY KEY,
             user1_id INTEGER,
@@ -46,10 +42,10 @@ def create_tables():
             FOREIGN KEY (user1_id) REFERENCES users (id),
             FOREIGN KEY (user2_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول پیام‌ها
-        cursor.execute('''
+    # جدول پیام‌ها
+    'messages': '''
         CREATE TABLE IF NOT EXISTS messages (
             id INTEGER PRIMARY KEY,
             chat_id INTEGER,
@@ -60,10 +56,10 @@ def create_tables():
             FOREIGN KEY (chat_id) REFERENCES chats (id),
             FOREIGN KEY (sender_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول تراکنش‌ها
-        cursor.execute('''
+    # جدول تراکنش‌ها
+    'transactions': '''
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY,
             user_id INTEGER,
@@ -76,10 +72,10 @@ def create_tables():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول دنبال‌کنندگان
-        cursor.execute('''
+    # جدول دنبال‌کنندگان
+    'followers': '''
         CREATE TABLE IF NOT EXISTS followers (
             id INTEGER PRIMARY KEY,
             follower_id INTEGER,
@@ -88,10 +84,10 @@ def create_tables():
             FOREIGN KEY (follower_id) REFERENCES users (id),
             FOREIGN KEY (followed_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول لایک‌ها
-        cursor.execute('''
+    # جدول لایک‌ها
+    'likes': '''
         CREATE TABLE IF NOT EXISTS likes (
             id INTEGER PRIMARY KEY,
             user_id INTEGER,
@@ -100,10 +96,10 @@ def create_tables():
             FOREIGN KEY (user_id) REFERENCES users (id),
             FOREIGN KEY (liked_user_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول بلاک‌ها
-        cursor.execute('''
+    # جدول بلاک‌ها
+    'blocks': '''
         CREATE TABLE IF NOT EXISTS blocks (
             id INTEGER PRIMARY KEY,
             blocker_id INTEGER,
@@ -112,10 +108,10 @@ def create_tables():
             FOREIGN KEY (blocker_id) REFERENCES users (id),
             FOREIGN KEY (blocked_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول گزارش‌ها
-        cursor.execute('''
+    # جدول گزارش‌ها
+    'reports': '''
         CREATE TABLE IF NOT EXISTS reports (
             id INTEGER PRIMARY KEY,
             reporter_id INTEGER,
@@ -129,10 +125,10 @@ def create_tables():
             FOREIGN KEY (reporter_id) REFERENCES users (id),
             FOREIGN KEY (reported_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول دعوت‌ها
-        cursor.execute('''
+    # جدول دعوت‌ها
+    'invites': '''
         CREATE TABLE IF NOT EXISTS invites (
             id INTEGER PRIMARY KEY,
             inviter_id INTEGER,
@@ -143,10 +139,10 @@ def create_tables():
             FOREIGN KEY (inviter_id) REFERENCES users (id),
             FOREIGN KEY (invited_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول درخواست‌های چت
-        cursor.execute('''
+    # جدول درخواست‌های چت
+    'chat_requests': '''
         CREATE TABLE IF NOT EXISTS chat_requests (
             id INTEGER PRIMARY KEY,
             requester_id INTEGER,
@@ -158,10 +154,10 @@ def create_tables():
             FOREIGN KEY (requester_id) REFERENCES users (id),
             FOREIGN KEY (requested_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول تنظیمات
-        cursor.execute('''
+    # جدول تنظیمات
+    'settings': '''
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
             value TEXT,
@@ -170,10 +166,10 @@ def create_tables():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_by INTEGER
         )
-        ''')
+    ''',
 
-        # جدول فعالیت ادمین‌ها
-        cursor.execute('''
+    # جدول فعالیت ادمین‌ها
+    'admin_logs': '''
         CREATE TABLE IF NOT EXISTS admin_logs (
             id INTEGER PRIMARY KEY,
             admin_id INTEGER,
@@ -182,10 +178,10 @@ def create_tables():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (admin_id) REFERENCES users (id)
         )
-        ''')
+    ''',
 
-        # جدول بسته‌های سکه
-        cursor.execute('''
+    # جدول بسته‌های سکه
+    'coin_packages': '''
         CREATE TABLE IF NOT EXISTS coin_packages (
             id INTEGER PRIMARY KEY,
             name TEXT,
@@ -195,99 +191,280 @@ def create_tables():
             is_active BOOLEAN DEFAULT 1,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-        ''')
-
-        conn.commit()
-        logger.info("Database tables created successfully")
-
-        # درج تنظیمات پیش‌فرض
-        default_settings = [
-            ('min_age', '18', 'حداقل سن مجاز برای استفاده از ربات', 'profile'),
-            ('enable_location_filter', 'true', 'فعال بودن فیلتر موقعیت مکانی', 'search'),
-            ('max_daily_chat_requests', '10', 'حداکثر تعداد درخواست چت روزانه', 'chat'),
-            ('auto_approve_profile_pics', 'false', 'تأیید خودکار عکس پروفایل', 'profile'),
-            ('welcome_message', 'به ربات چتوگرام خوش آمدید!', 'پیام خوش‌آمدگویی به کاربران جدید', 'general'),
-            ('maintenance_mode', 'false', 'حالت تعمیر و نگهداری ربات', 'system'),
-            ('initial_coins', '20', 'تعداد سکه‌های اولیه برای کاربران جدید', 'economy'),
-            ('chat_request_coins', '5', 'هزینه ارسال درخواست چت', 'economy'),
-            ('advanced_search_coins', '10', 'هزینه استفاده از جستجوی پیشرفته', 'economy'),
-            ('invite_reward_coins', '10', 'پاداش دعوت دوستان', 'economy')
-        ]
-
-        for key, value, description, category in default_settings:
-            cursor.execute(
-                """
-                INSERT OR IGNORE INTO settings (key, value, description, category) 
-                VALUES (?, ?, ?, ?)
-                """,
-                (key, value, description, category)
-            )
+    '''
+}
+
+# تنظیمات پیش‌فرض (کلید، مقدار، توضیح، دسته)
+DEFAULT_SETTINGS = [
+    ('min_age', '18', 'حداقل سن مجاز برای استفاده از ربات', 'profile'),
+    ('enable_location_filter', 'true', 'فعال بودن فیلتر موقعیت مکانی', 'search'),
+    ('max_daily_chat_requests', '10', 'حداکثر تعداد درخواست چت روزانه', 'chat'),
+    ('auto_approve_profile_pics', 'false', 'تأیید خودکار عکس پروفایل', 'profile'),
+    ('welcome_message', 'به ربات چتوگرام خوش آمدید!', 'پیام خوش‌آمدگویی به کاربران جدید', 'general'),
+    ('maintenance_mode', 'false', 'حالت تعمیر و نگهداری ربات', 'system'),
+    ('initial_coins', '20', 'تعداد سکه‌های اولیه برای کاربران جدید', 'economy'),
+    ('chat_request_coins', '5', 'هزینه ارسال درخواست چت', 'economy'),
+    ('advanced_search_coins', '10', 'هزینه استفاده از جستجوی پیشرفته', 'economy'),
+    ('invite_reward_coins', '10', 'پاداش دعوت دوستان', 'economy')
+]
+
+# بسته‌های سکه پیش‌فرض (نام، تعداد سکه، قیمت، درصد تخفیف)
+DEFAULT_COIN_PACKAGES = [
+    ('بسته برنزی', 100, 5000, 0),
+    ('بسته نقره‌ای', 300, 12000, 10),
+    ('بسته طلایی', 500, 18000, 15),
+    ('بسته الماسی', 1000, 30000, 20)
+]
+
+
+def add_column(table, column, definition):
+    """
+    مرحله افزودن ستون در صورت نبودن آن (قابل اجرای چندباره)
+    """
+    def step(conn):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    return step
+
 
-        # درج بسته‌های سکه پیش‌فرض
-        default_packages = [
-            ('بسته برنزی', 100, 5000, 0),
-            ('بسته نقره‌ای', 300, 12000, 10),
-            ('بسته طلایی', 500, 18000, 15),
-            ('بسته الماسی', 1000, 30000, 20)
-        ]
-
-        for name, amount, price, discount in default_packages:
-            cursor.execute(
-                """
-                INSERT OR IGNORE INTO coin_packages (name, amount, price, discount_percent) 
-                VALUES (?, ?, ?, ?)
-                """,
-                (name, amount, price, discount)
+class Backfill:
+    """
+    مرحله به‌روزرسانی دسته‌ای ردیف‌های موجود یک جدول
+
+    ردیف‌ها به ترتیب شناسه و در دسته‌های جداگانه به‌روز می‌شوند و پس از هر دسته
+    آخرین شناسه در جدول schema_progress ثبت می‌شود؛ اگر برنامه وسط مهاجرت متوقف
+    شود، اجرای بعدی از همان نقطه ادامه می‌دهد. شرط where باید ردیف‌های قبلاً
+    به‌روزشده را کنار بگذارد تا تکرار یک دسته بی‌اثر باشد.
+    """
+
+    def __init__(self, table, assignments, where=None, batch_size=None):
+        """
+        مقداردهی اولیه مرحله به‌روزرسانی دسته‌ای
+        """
+        self.table = table
+        self.assignments = assignments
+        self.where = where
+        self.batch_size = batch_size or MIGRATION_BATCH_SIZE
+
+    def run(self, conn, version, step):
+        """
+        اجرای به‌روزرسانی از آخرین نقطه ثبت‌شده
+        """
+        row = conn.execute(
+            "SELECT last_id, max_id FROM schema_progress WHERE version = ? AND step = ?",
+            (version, step)
+        ).fetchone()
+
+        if row is None:
+            # ردیف‌هایی که پس از شروع مهاجرت درج می‌شوند با مقادیر جدید نوشته می‌شوند
+            last_id = 0
+            max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}").fetchone()[0]
+            conn.execute(
+                "INSERT INTO schema_progress (version, step, last_id, max_id) VALUES (?, ?, ?, ?)",
+                (version, step, last_id, max_id)
             )
+            conn.commit()
+        else:
+            last_id, max_id = row
 
-        conn.commit()
-        logger.info("Default settings and packages inserted successfully")
+        condition = f" AND ({self.where})" if self.where else ""
 
-    except Exception as e:
-        logger.error(f"Error creating tables: {str(e)}")
-    finally:
-        conn.close()
+        while last_id < max_id:
+            upper = min(last_id + self.batch_size, max_id)
+            conn.execute(
+                f"UPDATE {self.table} SET {self.assignments} WHERE id > ? AND id <= ?{condition}",
+                (last_id, upper)
+            )
+            conn.execute(
+                "UPDATE schema_progress SET last_id = ? WHERE version = ? AND step = ?",
+                (upper, version, step)
+            )
+            conn.commit()
+            last_id = upper
 
 
-def apply_migrations():
+def insert_defaults(conn):
     """
-    اعمال به‌روزرسانی‌های پایگاه داده
+    درج تنظیمات و بسته‌های سکه پیش‌فرض
     """
-    logger = logging.getLogger('chatogram.database.migrations')
-
-    try:
-        # ابتدا جداول اصلی را ایجاد می‌کنیم
-        create_tables()
+    # توضیح و دسته تنظیماتی که پیش از این بدون آن‌ها ثبت شده‌اند تکمیل می‌شود
+    conn.executemany(
+        """
+        INSERT INTO settings (key, value, description, category) VALUES (?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET description = excluded.description, category = excluded.category
+        WHERE settings.description IS NULL
+        """,
+        DEFAULT_SETTINGS
+    )
+
+    if conn.execute("SELECT 1 FROM coin_packages LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO coin_packages (name, amount, price, discount_percent) VALUES (?, ?, ?, ?)",
+            DEFAULT_COIN_PACKAGES
+        )
 
-        # اینجا می‌توانیم به‌روزرسانی‌های آتی را اضافه کنیم
-        # مثال: add_new_column_to_users()
 
-        logger.info("All migrations applied successfully")
-    except Exception as e:
-        logger.error(f"Error applying migrations: {str(e)}")
+def sync_active_chats(conn):
+    """
+    هم‌سان‌سازی چت فعال و هم‌صحبت ذخیره‌شده در ردیف کاربران با جدول chats
+    """
+    conn.execute("UPDATE users SET active_chat_id = NULL, partner_id = NULL WHERE active_chat_id IS NOT NULL")
+
+    rows = conn.execute("SELECT id, user1_id, user2_id FROM chats WHERE is_active = 1 ORDER BY id").fetchall()
+    conn.executemany(
+        "UPDATE users SET active_chat_id = ?, partner_id = ? WHERE id = ?",
+        [(chat_id, user2_id, user1_id) for chat_id, user1_id, user2_id in rows] +
+        [(chat_id, user1_id, user2_id) for chat_id, user1_id, user2_id in rows]
+    )
+
+
+# مهاجرت‌های نسخه‌دار طرح پایگاه داده (به ترتیب اجرا)
+#
+# هر مرحله یک دستور SQL، یک تابع روی اتصال یا یک Backfill است و همه مراحل قابل
+# اجرای چندباره‌اند؛ بنابراین پایگاه داده‌ای که در هر نقطه‌ای از مهاجرت متوقف شده
+# (یا با طرح قدیمی DBManager.setup ساخته شده) به همان طرح نهایی می‌رسد.
+SCHEMA_MIGRATIONS = [
+    (1, 'base tables', list(TABLES.values())),
+    (2, 'secondary indexes for hot queries', [
+        # چت فعال هر کاربر (get_active_chat و بازسازی جدول جفت‌ها)
+        "CREATE INDEX IF NOT EXISTS idx_chats_user1_active ON chats (user1_id) WHERE is_active = 1",
+        "CREATE INDEX IF NOT EXISTS idx_chats_user2_active ON chats (user2_id) WHERE is_active = 1",
+        "CREATE INDEX IF NOT EXISTS idx_chats_started_at ON chats (started_at)",
+        # پیام‌های هر چت به ترتیب شناسه و آمار زمانی پیام‌ها
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (chat_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_sent_at ON messages (sent_at)",
+        # روابط کاربران (toggle_follow/like/block و بررسی وضعیت در پروفایل)
+        "CREATE INDEX IF NOT EXISTS idx_followers_pair ON followers (follower_id, followed_id)",
+        "CREATE INDEX IF NOT EXISTS idx_followers_followed ON followers (followed_id)",
+        "CREATE INDEX IF NOT EXISTS idx_likes_pair ON likes (user_id, liked_user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_likes_liked ON likes (liked_user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_blocker ON blocks (blocker_id, blocked_id)",
+        "CREATE INDEX IF NOT EXISTS idx_blocks_blocked ON blocks (blocked_id)",
+        # گزارش‌ها و دعوت‌ها
+        "CREATE INDEX IF NOT EXISTS idx_reports_reported ON reports (reported_id)",
+        "CREATE INDEX IF NOT EXISTS idx_reports_status ON reports (status)",
+        "CREATE INDEX IF NOT EXISTS idx_invites_inviter ON invites (inviter_id, invited_id)",
+        # تراکنش‌ها و آمار ادمین
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_created ON transactions (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_created ON transactions (transaction_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_last_active ON users (last_active)",
+        "CREATE INDEX IF NOT EXISTS idx_users_gender_city ON users (gender, city)",
+    ]),
+    (3, 'tables and columns missing from databases created by DBManager.setup', [
+        TABLES['chat_requests'],
+        TABLES['coin_packages'],
+        add_column('users', 'profile_pic_status', "TEXT DEFAULT 'pending'"),
+        add_column('reports', 'details', "TEXT"),
+        add_column('reports', 'admin_notes', "TEXT"),
+        add_column('reports', 'updated_at', "TIMESTAMP"),
+        add_column('invites', 'registered_at', "TIMESTAMP"),
+        add_column('settings', 'description', "TEXT"),
+        add_column('settings', 'category', "TEXT"),
+        add_column('settings', 'updated_by', "INTEGER"),
+        add_column('transactions', 'payment_info', "TEXT"),
+        # ستون‌های افزوده‌شده با ALTER TABLE نمی‌توانند پیش‌فرض CURRENT_TIMESTAMP داشته باشند
+        add_column('transactions', 'status', "TEXT DEFAULT 'pending'"),
+        add_column('transactions', 'updated_at', "TIMESTAMP"),
+        # تراکنش‌های قدیمی (بدون updated_at) همگی بلافاصله اعمال شده‌اند؛ ردیف‌های
+        # جدولی که از ابتدا این ستون‌ها را داشته دست نمی‌خورند
+        Backfill(
+            'transactions',
+            "status = 'completed', updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)",
+            where="updated_at IS NULL"
+        ),
+    ]),
+    (4, 'default settings and coin packages', [insert_defaults]),
+    (5, 'active chat and partner on users', [
+        add_column('users', 'active_chat_id', "INTEGER"),
+        add_column('users', 'partner_id', "INTEGER"),
+        sync_active_chats,
+    ]),
+    (6, 'profile version for the rendered profile card cache', [
+        add_column('users', 'profile_version', "INTEGER DEFAULT 0"),
+    ]),
+]
+
+# آخرین نسخه طرح
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """
+    دریافت نسخه فعلی طرح پایگاه داده (۰ برای پایگاه داده خالی)
+    """
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
 
 
-# این تابع می‌تواند در نسخه‌های آینده برای اضافه کردن ستون جدید به جدول کاربران استفاده شود
-def add_new_column_to_users():
+def apply_schema_migrations(conn):
     """
-    اضافه کردن ستون جدید به جدول کاربران
+    اعمال مهاجرت‌های نسخه‌دار اجرا نشده
+
+    اگر طرح به‌روز باشد فقط یک کوئری خواندن اجرا می‌شود. مراحل هر نسخه به ترتیب
+    اجرا شده و نسخه پس از پایان همه مراحل ثبت می‌شود.
     """
     logger = logging.getLogger('chatogram.database.migrations')
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current
+
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_progress (
+            version INTEGER NOT NULL,
+            step INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            max_id INTEGER NOT NULL,
+            PRIMARY KEY (version, step)
+        )
+    """)
+    conn.commit()
+
+    for version, description, steps in SCHEMA_MIGRATIONS:
+        if version <= current:
+            continue
+
+        try:
+            for index, step in enumerate(steps):
+                if isinstance(step, Backfill):
+                    conn.commit()
+                    step.run(conn, version, index)
+                elif callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+
+            conn.execute("DELETE FROM schema_progress WHERE version = ?", (version,))
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+            logger.info(f"Applied schema migration {version}: {description}")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error applying schema migration {version}: {str(e)}")
+            raise
 
-    try:
-        # بررسی وجود ستون
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [column[1] for column in cursor.fetchall()]
+    return get_schema_version(conn)
 
-        # اضافه کردن ستون جدید اگر وجود ندارد
-        if 'new_column' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN new_column TEXT")
-            conn.commit()
-            logger.info("Added new_column to users table")
-    except Exception as e:
-        logger.error(f"Error adding new column: {str(e)}")
+
+def apply_migrations(db_name=DB_NAME):
+    """
+    اعمال مهاجرت‌ها روی فایل پایگاه داده (بدون راه‌اندازی DBManager)
+    """
+    conn = connect(db_name)
+    try:
+        return apply_schema_migrations(conn)
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print(f"Schema version: {apply_migrations()}")
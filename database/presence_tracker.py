@@ -0,0 +1,185 @@
+import threading
+import time
+import logging
+from config.settings import PRESENCE_FLUSH_INTERVAL, PRESENCE_IDLE_TIMEOUT
+from database.connection_pool import connect
+from utils.timer_wheel import TimerWheel
+
+
+class PresenceTracker:
+    """
+    ردیابی درون حافظه‌ای وضعیت آنلاین کاربران
+
+    زمان آخرین فعالیت هر کاربر در حافظه ثبت می‌شود و تغییرات به صورت دوره‌ای
+    با یک executemany در جدول users ذخیره می‌شوند. کاربرانی که بیش از
+    زمان مشخص‌شده فعالیتی نداشته باشند با چرخ زمان‌سنج (بدون پیمایش همه
+    کاربران) آفلاین می‌شوند.
+    """
+
+    def __init__(self, db_name, flush_interval=PRESENCE_FLUSH_INTERVAL, idle_timeout=PRESENCE_IDLE_TIMEOUT):
+        """
+        مقداردهی اولیه ردیاب وضعیت
+        """
+        self.db_name = db_name
+        self.flush_interval = flush_interval
+        self.idle_timeout = idle_timeout
+        self.logger = logging.getLogger('chatogram.database.presence')
+
+        self._lock = threading.Lock()
+        self._last_seen = {}
+        self._dirty = set()
+        self._offline = set()
+        self._expiry = TimerWheel()
+
+        # فراخوانی با شناسه کاربرانی که به دلیل بی‌فعالیتی آفلاین شده‌اند (مثلاً خروج از صف انتظار)
+        self.on_idle = None
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        پاک کردن وضعیت‌های آنلاین قدیمی و شروع نخ ذخیره‌سازی
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        # پس از راه‌اندازی مجدد هیچ کاربری آنلاین نیست
+        conn = connect(self.db_name)
+        try:
+            conn.execute("UPDATE users SET is_online = 0 WHERE is_online = 1")
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='presence-tracker', daemon=True)
+        self._thread.start()
+
+    def touch(self, telegram_id):
+        """
+        ثبت فعالیت کاربر
+        """
+        now = time.time()
+
+        with self._lock:
+            self._last_seen[telegram_id] = now
+            self._dirty.add(telegram_id)
+            self._offline.discard(telegram_id)
+
+        self._expiry.schedule(telegram_id, now + self.idle_timeout)
+
+    def mark_offline(self, telegram_id):
+        """
+        آفلاین کردن کاربر
+        """
+        with self._lock:
+            self._last_seen.pop(telegram_id, None)
+            self._dirty.discard(telegram_id)
+            self._offline.add(telegram_id)
+
+        self._expiry.cancel(telegram_id)
+
+    def is_online(self, telegram_id):
+        """
+        بررسی آنلاین بودن کاربر
+        """
+        last_seen = self._last_seen.get(telegram_id)
+        return last_seen is not None and time.time() - last_seen <= self.idle_timeout
+
+    def online_count(self):
+        """
+        تعداد کاربران آنلاین
+        """
+        return len(self._last_seen)
+
+    def stop(self):
+        """
+        توقف نخ و ذخیره آخرین تغییرات
+        """
+        if self._thread and self._thread.is_alive():
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+        conn = connect(self.db_name)
+        try:
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def _run(self):
+        """
+        حلقه ذخیره‌سازی دوره‌ای
+        """
+        conn = connect(self.db_name)
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self.flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self, conn):
+        """
+        ذخیره کاربران تغییر یافته و آفلاین کردن کاربران بی‌فعالیت
+        """
+        # کاربرانی که مهلت بی‌فعالیتی آن‌ها در چرخ زمان‌سنج به پایان رسیده است
+        expired = self._expiry.advance(time.time())
+        idle = []
+
+        with self._lock:
+            for telegram_id in expired:
+                if self._last_seen.pop(telegram_id, None) is not None:
+                    self._dirty.discard(telegram_id)
+                    self._offline.add(telegram_id)
+                    idle.append(telegram_id)
+
+            online_rows = [
+                (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._last_seen[telegram_id])), telegram_id)
+                for telegram_id in self._dirty
+            ]
+            offline_rows = [(telegram_id,) for telegram_id in self._offline]
+
+            self._dirty.clear()
+            self._offline.clear()
+
+        if idle and self.on_idle:
+            try:
+                self.on_idle(idle)
+            except Exception as e:
+                self.logger.error(f"Error handling idle users: {str(e)}")
+
+        if not online_rows and not offline_rows:
+            return
+
+        try:
+            if online_rows:
+                conn.executemany(
+                    "UPDATE users SET is_online = 1, last_active = ? WHERE telegram_id = ?",
+                    online_rows
+                )
+            if offline_rows:
+                conn.executemany(
+                    "UPDATE users SET is_online = 0 WHERE telegram_id = ?",
+                    offline_rows
+                )
+            conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error flushing presence: {str(e)}")
+            conn.rollback()
+            self._requeue(online_rows, offline_rows)
+
+    def _requeue(self, online_rows, offline_rows):
+        """
+        بازگرداندن تغییرات ذخیره‌نشده برای تلاش در دور بعدی ذخیره‌سازی
+
+        تغییری که در این فاصله با وضعیت جدیدتر کاربر جایگزین شده است بازگردانده نمی‌شود.
+        """
+        with self._lock:
+            for _, telegram_id in online_rows:
+                if telegram_id in self._last_seen:
+                    self._dirty.add(telegram_id)
+
+            for telegram_id, in offline_rows:
+                if telegram_id not in self._last_seen:
+                    self._offline.add(telegram_id)
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from config.settings import RECENT_PARTNERS_SIZE, RECENT_PARTNERS_MAX_USERS
+
+
+class RecentPartners:
+    """
+    حافظه محدود هم‌صحبت‌های اخیر هر کاربر
+
+    برای هر کاربر آخرین K هم‌صحبت در یک LRU نگهداری می‌شود و تعداد کاربران نیز
+    محدود است (کاربرانی که مدت‌ها چتی نداشته‌اند حذف می‌شوند).
+    """
+
+    def __init__(self, size=RECENT_PARTNERS_SIZE, max_users=RECENT_PARTNERS_MAX_USERS):
+        """
+        مقداردهی اولیه حافظه هم‌صحبت‌های اخیر
+        """
+        self.size = size
+        self.max_users = max_users
+
+        self._lock = threading.Lock()
+        self._partners = OrderedDict()
+
+    def _add_locked(self, user_id, partner_id):
+        """
+        افزودن هم‌صحبت به LRU کاربر
+        """
+        partners = self._partners.get(user_id)
+        if partners is None:
+            partners = self._partners[user_id] = OrderedDict()
+        else:
+            self._partners.move_to_end(user_id)
+
+        partners[partner_id] = True
+        partners.move_to_end(partner_id)
+        if len(partners) > self.size:
+            partners.popitem(last=False)
+
+    def record(self, user1_id, user2_id):
+        """
+        ثبت پایان چت بین دو کاربر برای هر دو طرف
+        """
+        with self._lock:
+            self._add_locked(user1_id, user2_id)
+            self._add_locked(user2_id, user1_id)
+
+            while len(self._partners) > self.max_users:
+                self._partners.popitem(last=False)
+
+    def get(self, user_id):
+        """
+        دریافت شناسه هم‌صحبت‌های اخیر کاربر
+        """
+        with self._lock:
+            partners = self._partners.get(user_id)
+            return tuple(partners) if partners else ()
+
+    def contains(self, user_id, partner_id):
+        """
+        بررسی هم‌صحبت اخیر بودن یک کاربر
+        """
+        partners = self._partners.get(user_id)
+        return partners is not None and partner_id in partners
+
+    def __len__(self):
+        return len(self._partners)
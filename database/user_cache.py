@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from config.settings import USER_CACHE_SIZE, USER_CACHE_TTL
+
+
+class UserCache:
+    """
+    کش محدود ردیف‌های کاربران با مهلت انقضا
+
+    رکوردهای UserRecord (بدون ستون‌های سنگین) با شناسه تلگرام در یک LRU نگهداری
+    می‌شوند و نگاشت شناسه داخلی به شناسه تلگرام جستجو با هر دو کلید را ممکن می‌کند.
+    DBManager پس از هر تغییر ردیف کاربر آن را حذف می‌کند؛ مهلت انقضا تغییرات
+    ستون‌هایی را که خارج از DBManager نوشته می‌شوند (مانند وضعیت آنلاین) محدود می‌کند.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        """
+        مقداردهی اولیه کش کاربران
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._rows = OrderedDict()
+        self._telegram_ids = {}
+
+        # شماره حذف‌ها؛ ردیفی که پیش از یک حذف خوانده شده در کش قرار نمی‌گیرد
+        self._generation = 0
+
+        # آمار عملکرد
+        self.hits = 0
+        self.misses = 0
+
+    def _get_locked(self, telegram_id):
+        """
+        دریافت ردیف معتبر از کش (ردیف منقضی حذف می‌شود)
+        """
+        item = self._rows.get(telegram_id)
+        if item is None:
+            self.misses += 1
+            return None
+
+        row, expires_at = item
+        if expires_at < time.monotonic():
+            self._remove_locked(telegram_id)
+            self.misses += 1
+            return None
+
+        self._rows.move_to_end(telegram_id)
+        self.hits += 1
+        # کپی رکورد تا تغییرات مدل User روی کش اثر نگذارد
+        return row.copy()
+
+    def get(self, telegram_id):
+        """
+        دریافت ردیف کاربر با شناسه تلگرام
+        """
+        with self._lock:
+            return self._get_locked(telegram_id)
+
+    def get_by_id(self, user_id):
+        """
+        دریافت ردیف کاربر با شناسه داخلی
+        """
+        with self._lock:
+            telegram_id = self._telegram_ids.get(user_id)
+            if telegram_id is None:
+                self.misses += 1
+                return None
+            return self._get_locked(telegram_id)
+
+    def generation(self):
+        """
+        شماره فعلی حذف‌ها (پیش از خواندن ردیف از پایگاه داده گرفته می‌شود)
+        """
+        return self._generation
+
+    def put(self, row, generation=None):
+        """
+        افزودن ردیف کاربر به کش
+
+        اگر generation داده شود و از زمان خواندن ردیف حذفی انجام شده باشد، ردیف
+        ممکن است قدیمی باشد و در کش قرار نمی‌گیرد.
+        """
+        if not row:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            telegram_id = row['telegram_id']
+            self._rows[telegram_id] = (row.copy(), time.monotonic() + self.ttl)
+            self._rows.move_to_end(telegram_id)
+            self._telegram_ids[row['id']] = telegram_id
+
+            while len(self._rows) > self.max_size:
+                _, (evicted, _) = self._rows.popitem(last=False)
+                self._telegram_ids.pop(evicted['id'], None)
+
+    def _remove_locked(self, telegram_id):
+        """
+        حذف ردیف از کش
+        """
+        item = self._rows.pop(telegram_id, None)
+        if item is not None:
+            self._telegram_ids.pop(item[0]['id'], None)
+
+    def invalidate(self, telegram_id):
+        """
+        حذف کاربر با شناسه تلگرام
+        """
+        with self._lock:
+            self._generation += 1
+            self._remove_locked(telegram_id)
+
+    def invalidate_ids(self, user_ids):
+        """
+        حذف کاربران با شناسه داخلی
+        """
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                telegram_id = self._telegram_ids.get(user_id)
+                if telegram_id is not None:
+                    self._remove_locked(telegram_id)
+
+    def clear(self):
+        """
+        حذف همه ردیف‌ها
+        """
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+            self._telegram_ids.clear()
+
+    def get_stats(self):
+        """
+        دریافت آمار کش
+        """
+        total = self.hits + self.misses
+        return {
+            'users': len(self._rows),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._rows)
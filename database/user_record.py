@@ -0,0 +1,129 @@
+from collections.abc import MutableMapping
+
+
+# ستون‌های سبک جدول users که همراه ردیف خوانده می‌شوند (به ترتیب SELECT)
+USER_COLUMNS = (
+    'id', 'telegram_id', 'username', 'display_name', 'age', 'gender', 'city',
+    'profile_pic_status', 'coins', 'is_online', 'is_banned', 'active_chat_id',
+    'partner_id', 'profile_version', 'created_at', 'last_active'
+)
+
+# ستون‌های متنی سنگین که فقط هنگام نیاز (نمایش پروفایل) خوانده می‌شوند
+LAZY_COLUMNS = ('bio', 'profile_pic')
+
+# لیست ستون‌ها برای کوئری‌های SELECT
+USER_SELECT = ', '.join(USER_COLUMNS)
+
+# نشانگر ستونی که هنوز از پایگاه داده خوانده نشده است
+_UNLOADED = object()
+
+
+class UserRecord(MutableMapping):
+    """
+    ردیف فشرده کاربر با __slots__
+
+    به جای dict کامل هر ردیف، مقادیر در slotها نگهداری می‌شوند و رابط نگاشت
+    (record['coins']، record.get(...)) مانند dict قبلی باقی می‌ماند. ستون‌های bio و
+    profile_pic در اولین دسترسی با loader خوانده می‌شوند.
+    """
+
+    __slots__ = USER_COLUMNS + LAZY_COLUMNS + ('_loader',)
+
+    _FIELDS = USER_COLUMNS + LAZY_COLUMNS
+    _FIELD_SET = frozenset(_FIELDS)
+
+    def __init__(self, row=None, loader=None):
+        """
+        ساخت رکورد از ردیف پایگاه داده یا dict
+
+        ستون‌های سنگینی که در ردیف نیستند با loader (تابعی که با شناسه کاربر
+        دیکشنری bio و profile_pic را برمی‌گرداند) بارگذاری می‌شوند.
+        """
+        self._loader = loader
+        keys = set(row.keys()) if row is not None else ()
+
+        for name in USER_COLUMNS:
+            setattr(self, name, row[name] if name in keys else None)
+
+        for name in LAZY_COLUMNS:
+            if name in keys:
+                setattr(self, name, row[name])
+            else:
+                setattr(self, name, _UNLOADED if loader else None)
+
+    @classmethod
+    def from_row(cls, row, loader=None):
+        """
+        ساخت سریع رکورد از ردیفی که با USER_SELECT خوانده شده است
+        """
+        record = cls.__new__(cls)
+        record._loader = loader
+
+        for name, value in zip(USER_COLUMNS, row):
+            setattr(record, name, value)
+
+        lazy = _UNLOADED if loader else None
+        for name in LAZY_COLUMNS:
+            setattr(record, name, lazy)
+
+        return record
+
+    def _load_lazy(self):
+        """
+        خواندن ستون‌های سنگین از پایگاه داده
+        """
+        values = self._loader(self.id) if self._loader else None
+
+        for name in LAZY_COLUMNS:
+            if getattr(self, name) is _UNLOADED:
+                setattr(self, name, values[name] if values else None)
+
+    def __getitem__(self, key):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+
+        value = getattr(self, key)
+        if value is _UNLOADED:
+            self._load_lazy()
+            value = getattr(self, key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("user record columns cannot be deleted")
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET
+
+    def __iter__(self):
+        return iter(self._FIELDS)
+
+    def __len__(self):
+        return len(self._FIELDS)
+
+    def get(self, key, default=None):
+        if key not in self._FIELD_SET:
+            return default
+        return self[key]
+
+    def is_loaded(self, key):
+        """
+        بررسی اینکه آیا ستون سنگین خوانده شده است
+        """
+        return getattr(self, key) is not _UNLOADED
+
+    def copy(self):
+        """
+        کپی رکورد بدون بارگذاری ستون‌های سنگین
+        """
+        record = UserRecord.__new__(UserRecord)
+        for name in self.__slots__:
+            setattr(record, name, getattr(self, name))
+        return record
+
+    def __repr__(self):
+        return f"UserRecord(id={self.id}, telegram_id={self.telegram_id})"
@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from database.match_scorer import MatchScorer
+
+
+# اطلاعات کاربر در صف انتظار
+WaitingEntry = namedtuple(
+    'WaitingEntry',
+    ['user_id', 'telegram_id', 'gender', 'city', 'age', 'reports', 'wanted_gender', 'wanted_city', 'enqueued_at']
+)
+
+
+class WaitingPool:
+    """
+    صف انتظار درون حافظه‌ای برای یافتن هم‌صحبت
+
+    اطلاعات کاربران منتظر به صورت ستونی در آرایه‌های NumPy نگهداری می‌شود. برای هر
+    درخواست، فیلترهای قطعی (جنسیت، شهر، بلاک) به صورت ماسک برداری اعمال شده و
+    بهترین کاندید با امتیازدهی برداری MatchScorer انتخاب می‌شود.
+    """
+
+    GENDER_CODES = {None: 0, 'male': 1, 'female': 2, 'other': 3}
+
+    COLUMNS = {
+        'active': np.bool_,
+        'user_id': np.int64,
+        'gender': np.int8,
+        'wanted_gender': np.int8,
+        'city': np.int32,
+        'wanted_city': np.int32,
+        'age': np.int16,
+        'reports': np.int32,
+        'enqueued_at': np.float64
+    }
+
+    def __init__(self, scorer=None, capacity=1024):
+        """
+        مقداردهی اولیه صف انتظار
+        """
+        self.scorer = scorer or MatchScorer()
+
+        self._lock = threading.Lock()
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._slots = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._slot_by_user = {}
+        self._by_telegram_id = {}
+        self._city_codes = {None: 0}
+
+    @staticmethod
+    def make_entry(user, wanted_gender=None, wanted_city=None, reports=0):
+        """
+        ساخت رکورد صف از اطلاعات کاربر
+        """
+        return WaitingEntry(
+            user['id'],
+            user['telegram_id'],
+            user.get('gender') or None,
+            user.get('city') or None,
+            user.get('age') or 0,
+            reports,
+            wanted_gender,
+            wanted_city,
+            time.time()
+        )
+
+    def _city_code(self, city):
+        """
+        کد عددی شهر (شهرها یک بار کدگذاری می‌شوند)
+        """
+        code = self._city_codes.get(city)
+        if code is None:
+            code = self._city_codes[city] = len(self._city_codes)
+        return code
+
+    def _grow(self):
+        """
+        دو برابر کردن ظرفیت ستون‌ها
+        """
+        size = len(self._slots)
+        for name, column in self._columns.items():
+            grown = np.zeros(size * 2, dtype=column.dtype)
+            grown[:size] = column
+            self._columns[name] = grown
+        self._slots.extend([None] * size)
+        self._free.extend(range(size * 2 - 1, size - 1, -1))
+
+    def _candidate_mask(self, entry, excluded_ids):
+        """
+        ماسک کاندیدهای سازگار با فیلترهای قطعی
+        """
+        columns = self._columns
+        gender = self.GENDER_CODES.get(entry.gender, 0)
+
+        mask = columns['active'] & (columns['user_id'] != entry.user_id)
+
+        if entry.wanted_gender:
+            mask &= columns['gender'] == self.GENDER_CODES.get(entry.wanted_gender, 0)
+        # کاربر مقابل باید جنسیت کاربر یا «هر کسی» را خواسته باشد
+        mask &= (columns['wanted_gender'] == 0) | (columns['wanted_gender'] == gender)
+
+        if entry.wanted_city:
+            mask &= columns['city'] == self._city_code(entry.wanted_city)
+        mask &= (columns['wanted_city'] == 0) | (columns['wanted_city'] == self._city_code(entry.city))
+
+        if excluded_ids:
+            mask &= ~np.isin(columns['user_id'], np.fromiter(excluded_ids, dtype=np.int64))
+
+        return mask
+
+    @staticmethod
+    def _ranked(scores):
+        """
+        موقعیت کاندیدها به ترتیب امتیاز؛ مرتب‌سازی کامل فقط در صورت رد شدن بهترین کاندید
+        """
+        best = int(np.argmax(scores))
+        yield best
+
+        for position in np.argsort(-scores):
+            if position != best:
+                yield position
+
+    def match(self, entry, excluded_ids=(), recent_ids=(), is_compatible=None):
+        """
+        یافتن و برداشتن بهترین هم‌صحبت سازگار از صف به صورت اتمیک
+
+        اگر کسی پیدا نشود، کاربر به صف اضافه شده و None برگردانده می‌شود؛ کاربری که
+        با همان فیلترها دوباره درخواست دهد زمان انتظار خود را از دست نمی‌دهد.
+        """
+        with self._lock:
+            idx = np.flatnonzero(self._candidate_mask(entry, excluded_ids))
+
+            if len(idx):
+                scores = self.scorer.score(
+                    self._columns, idx, entry.age, self._city_codes.get(entry.city, 0), recent_ids, time.time()
+                )
+
+                # بررسی نهایی کاندیدها به ترتیب امتیاز (معمولاً اولین کاندید پذیرفته می‌شود)
+                for position in self._ranked(scores):
+                    candidate = self._slots[idx[position]]
+                    if is_compatible and not is_compatible(candidate):
+                        continue
+
+                    self._remove_locked(candidate.user_id)
+                    self._remove_locked(entry.user_id)
+                    return candidate
+
+            slot = self._slot_by_user.get(entry.user_id)
+            existing = self._slots[slot] if slot is not None else None
+            if existing is None or existing._replace(enqueued_at=entry.enqueued_at) != entry:
+                self._remove_locked(entry.user_id)
+                self._add_locked(entry)
+            return None
+
+    def _add_locked(self, entry):
+        """
+        افزودن کاربر به یک خانه خالی ستون‌ها
+        """
+        if not self._free:
+            self._grow()
+
+        slot = self._free.pop()
+        columns = self._columns
+        columns['active'][slot] = True
+        columns['user_id'][slot] = entry.user_id
+        columns['gender'][slot] = self.GENDER_CODES.get(entry.gender, 0)
+        columns['wanted_gender'][slot] = self.GENDER_CODES.get(entry.wanted_gender, 0)
+        columns['city'][slot] = self._city_code(entry.city)
+        columns['wanted_city'][slot] = self._city_code(entry.wanted_city)
+        columns['age'][slot] = entry.age
+        columns['reports'][slot] = entry.reports
+        columns['enqueued_at'][slot] = entry.enqueued_at
+
+        self._slots[slot] = entry
+        self._slot_by_user[entry.user_id] = slot
+        self._by_telegram_id[entry.telegram_id] = entry.user_id
+
+    def _remove_locked(self, user_id):
+        """
+        حذف کاربر از صف
+        """
+        slot = self._slot_by_user.pop(user_id, None)
+        if slot is None:
+            return None
+
+        entry = self._slots[slot]
+        self._slots[slot] = None
+        self._columns['active'][slot] = False
+        self._free.append(slot)
+        self._by_telegram_id.pop(entry.telegram_id, None)
+
+        return entry
+
+    def requeue(self, entry):
+        """
+        بازگرداندن کاربر به صف با همان زمان انتظار (وقتی جفت شدن او ناموفق بوده است)
+        """
+        with self._lock:
+            if entry.user_id not in self._slot_by_user:
+                self._add_locked(entry)
+
+    def remove(self, user_id):
+        """
+        خروج کاربر از صف انتظار
+        """
+        with self._lock:
+            return self._remove_locked(user_id)
+
+    def remove_by_telegram_id(self, telegram_id):
+        """
+        خروج کاربر از صف انتظار با شناسه تلگرام
+        """
+        with self._lock:
+            user_id = self._by_telegram_id.get(telegram_id)
+            if user_id is None:
+                return None
+            return self._remove_locked(user_id)
+
+    def is_waiting(self, user_id):
+        """
+        بررسی حضور کاربر در صف انتظار
+        """
+        return user_id in self._slot_by_user
+
+    def __len__(self):
+        return len(self._slot_by_user)
@@ -4,22 +4,34 @@ from handlers.chat_handler import ChatHandler
 from handlers.search_handler import SearchHandler
 from handlers.coin_handler import CoinHandler
 from handlers.social_handler import SocialHandler
+from handlers.router import UpdateRouter
+from handlers.deferred_bot import DeferredBot
 from admin.admin_base import AdminHandler
 
 
-def register_all_handlers(bot, db_manager):
+def register_all_handlers(bot, db_manager, outbox):
     """
     ثبت تمام هندلرها
     """
+    # هر آپدیت در یک واحد کار پایگاه داده اجرا شده و با یک commit ثبت می‌شود
+    router = UpdateRouter(bot, unit_of_work=db_manager.unit_of_work)
+
+    # فراخوانی‌های API هندلرها پس از ثبت تراکنش آپدیت انجام می‌شوند، نه درون آن
+    api = DeferredBot(bot, db_manager)
+
     handlers = [
-        StartHandler(bot, db_manager),
-        ProfileHandler(bot, db_manager),
-        ChatHandler(bot, db_manager),
-        SearchHandler(bot, db_manager),
-        CoinHandler(bot, db_manager),
-        SocialHandler(bot, db_manager),
-        AdminHandler(bot, db_manager)
+        StartHandler(api, db_manager, router, outbox),
+        ProfileHandler(api, db_manager, router, outbox),
+        ChatHandler(api, db_manager, router, outbox),
+        SearchHandler(api, db_manager, router, outbox),
+        CoinHandler(api, db_manager, router, outbox),
+        SocialHandler(api, db_manager, router, outbox),
+        AdminHandler(api, db_manager, router)
     ]
 
     for handler in handlers:
-        handler.register_handlers()
\ No newline at end of file
+        handler.register_handlers()
+
+    router.install()
+
+    return router
\ No newline at end of file
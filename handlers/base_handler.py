@@ -8,12 +8,14 @@ class BaseHandler:
     کلاس پایه برای همه هندلرها
     """
 
-    def __init__(self, bot: TeleBot, db_manager):
+    def __init__(self, bot: TeleBot, db_manager, router, outbox):
         """
         مقداردهی اولیه هندلر پایه
         """
         self.bot = bot
         self.db_manager = db_manager
+        self.router = router
+        self.outbox = outbox
         self.logger = logging.getLogger(f'chatogram.handlers.{self.__class__.__name__}')
 
     def register_handlers(self):
@@ -31,6 +33,10 @@ class BaseHandler:
     def update_user_status(self, message, is_online=True):
         """
         به‌روزرسانی وضعیت آنلاین بودن کاربر
+
+        وضعیت در حافظه ثبت شده و به صورت دوره‌ای در پایگاه داده ذخیره می‌شود.
         """
-        user = self.get_user(message.from_user.id)
-        user.update_status(is_online)
+        if is_online:
+            self.db_manager.presence.touch(message.from_user.id)
+        else:
+            self.db_manager.presence.mark_offline(message.from_user.id)
@@ -1,10 +1,23 @@
-import json
 from telebot import types
 from handlers.base_handler import BaseHandler
 from utils.keyboard_generator import KeyboardGenerator
+from utils.media_group import MediaGroupCollector, build_input_media, get_file_unique_id, split_media_group
 from config.constants import MESSAGES
 from models.chat import Chat
-from models.user import User
+
+
+# انواع محتوایی که در چت ناشناس برای طرف مقابل کپی می‌شوند
+RELAY_CONTENT_TYPES = [
+    'text', 'photo', 'video', 'video_note', 'animation', 'document',
+    'audio', 'voice', 'sticker', 'location', 'venue', 'contact', 'dice', 'poll'
+]
+
+# متن در حال جستجو در منوی شیشه‌ای بر اساس جنسیت خواسته‌شده
+SEARCHING_TEXTS = {
+    'male': "🔄 در حال جستجو برای یک پسر...\nلطفاً صبر کنید.",
+    'female': "🔄 در حال جستجو برای یک دختر...\nلطفاً صبر کنید.",
+    None: "🔄 در حال جستجو برای یک کاربر...\nلطفاً صبر کنید.",
+}
 
 
 class ChatHandler(BaseHandler):
@@ -12,278 +25,266 @@ class ChatHandler(BaseHandler):
     کلاس مدیریت چت ناشناس
     """
 
+    def __init__(self, bot, db_manager, router, outbox):
+        """
+        مقداردهی اولیه هندلر چت
+        """
+        super().__init__(bot, db_manager, router, outbox)
+        # جمع‌آوری پیام‌های آلبوم برای ارسال یکجا
+        self.media_groups = MediaGroupCollector(self.relay_media_group)
+
+    def get_message_record(self, message):
+        """
+        دریافت محتوای قابل ذخیره پیام: متن یا شناسه یکتای فایل
+        """
+        if message.content_type == 'text':
+            return message.text
+
+        return get_file_unique_id(message) or ''
+
+    def relay_media_group(self, messages, pairing):
+        """
+        ذخیره و ارسال یک آلبوم کامل با یک فراخوانی send_media_group
+
+        اعضایی که در آلبوم قابل ارسال نیستند جداگانه با copy_message فرستاده می‌شوند.
+        """
+        for message in messages:
+            self.db_manager.add_message(
+                pairing.chat_id,
+                pairing.user_id,
+                message.content_type,
+                self.get_message_record(message)
+            )
+
+        grouped, singles = split_media_group(messages)
+        if grouped:
+            self.outbox.send_media_group(pairing.partner_telegram_id, build_input_media(grouped))
+
+        for message in singles:
+            self.outbox.copy_message(
+                pairing.partner_telegram_id,
+                message.chat.id,
+                message.message_id
+            )
+
+    def _start_random_search(self, chat_id, user, gender, edit_message=None):
+        """
+        قرار دادن کاربر در صف چت تصادفی و اتصال به هم‌صحبت در صورت وجود
+
+        در جستجو از منوی شیشه‌ای (edit_message) پیام منو ویرایش می‌شود؛ در غیر این
+        صورت پیام‌ها جداگانه ارسال می‌شوند.
+        """
+        # بررسی اینکه آیا کاربر چت فعال دارد
+        if user.data.get('active_chat_id'):
+            self.outbox.send_message(
+                chat_id,
+                "⚠️ شما یک چت فعال دارید. ابتدا باید آن را پایان دهید.",
+                reply_markup=KeyboardGenerator.get_chat_menu()
+            )
+            return
+
+        # کاربر از قبل در صف انتظار است
+        if self.db_manager.waiting_pool.is_waiting(user.data['id']):
+            self.outbox.send_message(
+                chat_id,
+                MESSAGES['random_chat_already_waiting']
+            )
+            return
+
+        # ارسال پیام در حال جستجو
+        if edit_message:
+            self.outbox.edit_message_text(
+                SEARCHING_TEXTS[gender],
+                chat_id,
+                edit_message.message_id
+            )
+        else:
+            self.outbox.send_message(
+                chat_id,
+                MESSAGES['random_chat_start']
+            )
+
+        # جستجوی کاربر تصادفی با جنسیت خواسته‌شده
+        partner = self.db_manager.pair_random_partner(user.data, gender=gender)
+
+        if partner:
+            # ارسال پیام به هر دو کاربر
+            self.outbox.send_message(
+                chat_id,
+                MESSAGES['random_chat_connected'],
+                reply_markup=KeyboardGenerator.get_chat_menu()
+            )
+
+            self.outbox.send_message(
+                partner['telegram_id'],
+                MESSAGES['random_chat_connected'],
+                reply_markup=KeyboardGenerator.get_chat_menu()
+            )
+        elif edit_message:
+            self.outbox.edit_message_text(
+                MESSAGES['random_chat_waiting'],
+                chat_id,
+                edit_message.message_id
+            )
+        else:
+            self.outbox.send_message(
+                chat_id,
+                MESSAGES['random_chat_waiting'],
+                reply_markup=KeyboardGenerator.get_chat_menu()
+            )
+
     def register_handlers(self):
         """
         ثبت هندلرهای پیام
         """
 
         # شروع چت ناشناس
-        @self.bot.message_handler(func=lambda message: message.text == "🔗 به یک ناشناس وصلم کن!")
+        @self.router.message_handler(text="🔗 به یک ناشناس وصلم کن!")
         def handle_random_chat(message):
             try:
                 self.update_user_status(message)
 
                 user = self.get_user(message.from_user.id)
-
-                # بررسی اینکه آیا کاربر چت فعال دارد
-                active_chat = user.get_active_chat()
-                if active_chat:
-                    self.bot.send_message(
-                        message.chat.id,
-                        "⚠️ شما یک چت فعال دارید. ابتدا باید آن را پایان دهید.",
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                    return
-
-                # ارسال پیام در حال جستجو
-                self.bot.send_message(
-                    message.chat.id,
-                    MESSAGES['random_chat_start']
-                )
-
-                # جستجوی کاربر تصادفی
-                partner = self.db_manager.find_random_partner(user.data['id'])
-
-                if partner:
-                    # ایجاد چت جدید
-                    chat = Chat.create(self.db_manager, user.data['id'], partner['id'])
-
-                    # ارسال پیام به هر دو کاربر
-                    self.bot.send_message(
-                        message.chat.id,
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-
-                    self.bot.send_message(
-                        partner['telegram_id'],
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                else:
-                    self.bot.send_message(
-                        message.chat.id,
-                        "😕 متأسفانه در حال حاضر کاربری برای چت پیدا نشد. لطفاً بعداً دوباره تلاش کنید.",
-                        reply_markup=KeyboardGenerator.get_main_menu()
-                    )
+                self._start_random_search(message.chat.id, user, None)
             except Exception as e:
                 self.logger.error(f"Error in random chat handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # جستجوی کاربر خاص (مرد)
-        @self.bot.callback_query_handler(func=lambda call: call.data == "search_random_male")
+        @self.router.callback_query_handler(data="search_random_male")
         def handle_search_random_male(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
-
-                # بررسی اینکه آیا کاربر چت فعال دارد
-                active_chat = user.get_active_chat()
-                if active_chat:
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        "⚠️ شما یک چت فعال دارید. ابتدا باید آن را پایان دهید.",
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                    return
-
-                # ارسال پیام در حال جستجو
-                self.bot.edit_message_text(
-                    "🔄 در حال جستجو برای یک پسر...\nلطفاً صبر کنید.",
-                    call.message.chat.id,
-                    call.message.message_id
-                )
-
-                # جستجوی کاربر تصادفی مرد
-                partner = self.db_manager.find_random_partner(user.data['id'], gender="male")
-
-                if partner:
-                    # ایجاد چت جدید
-                    chat = Chat.create(self.db_manager, user.data['id'], partner['id'])
-
-                    # ارسال پیام به هر دو کاربر
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-
-                    self.bot.send_message(
-                        partner['telegram_id'],
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                else:
-                    self.bot.edit_message_text(
-                        "😕 متأسفانه در حال حاضر پسری برای چت پیدا نشد. لطفاً بعداً دوباره تلاش کنید.",
-                        call.message.chat.id,
-                        call.message.message_id,
-                        reply_markup=KeyboardGenerator.get_search_menu()
-                    )
+                self._start_random_search(call.message.chat.id, user, "male", edit_message=call.message)
             except Exception as e:
                 self.logger.error(f"Error in search random male handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # جستجوی کاربر خاص (زن)
-        @self.bot.callback_query_handler(func=lambda call: call.data == "search_random_female")
+        @self.router.callback_query_handler(data="search_random_female")
         def handle_search_random_female(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
-
-                # بررسی اینکه آیا کاربر چت فعال دارد
-                active_chat = user.get_active_chat()
-                if active_chat:
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        "⚠️ شما یک چت فعال دارید. ابتدا باید آن را پایان دهید.",
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                    return
-
-                # ارسال پیام در حال جستجو
-                self.bot.edit_message_text(
-                    "🔄 در حال جستجو برای یک دختر...\nلطفاً صبر کنید.",
-                    call.message.chat.id,
-                    call.message.message_id
-                )
-
-                # جستجوی کاربر تصادفی زن
-                partner = self.db_manager.find_random_partner(user.data['id'], gender="female")
-
-                if partner:
-                    # ایجاد چت جدید
-                    chat = Chat.create(self.db_manager, user.data['id'], partner['id'])
-
-                    # ارسال پیام به هر دو کاربر
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-
-                    self.bot.send_message(
-                        partner['telegram_id'],
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-                else:
-                    self.bot.edit_message_text(
-                        "😕 متأسفانه در حال حاضر دختری برای چت پیدا نشد. لطفاً بعداً دوباره تلاش کنید.",
-                        call.message.chat.id,
-                        call.message.message_id,
-                        reply_markup=KeyboardGenerator.get_search_menu()
-                    )
+                self._start_random_search(call.message.chat.id, user, "female", edit_message=call.message)
             except Exception as e:
                 self.logger.error(f"Error in search random female handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # جستجوی کاربر تصادفی (هر جنسیتی)
-        @self.bot.callback_query_handler(func=lambda call: call.data == "search_random_any")
+        @self.router.callback_query_handler(data="search_random_any")
         def handle_search_random_any(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
+                self._start_random_search(call.message.chat.id, user, None, edit_message=call.message)
+            except Exception as e:
+                self.logger.error(f"Error in search random any handler: {str(e)}")
+                self.db_manager.mark_failed()
 
-                # بررسی اینکه آیا کاربر چت فعال دارد
-                active_chat = user.get_active_chat()
-                if active_chat:
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        "⚠️ شما یک چت فعال دارید. ابتدا باید آن را پایان دهید.",
-                        reply_markup=KeyboardGenerator.get_chat_menu()
+        # پایان چت و اتصال فوری به هم‌صحبت بعدی
+        @self.router.message_handler(text="⏭ هم‌صحبت بعدی")
+        def handle_next_partner(message):
+            try:
+                self.update_user_status(message)
+
+                pairing = self.db_manager.chat_registry.get(message.from_user.id)
+                user = self.get_user(message.from_user.id)
+
+                if pairing:
+                    partner = self.db_manager.skip_chat(pairing.chat_id, user.data)
+
+                    self.outbox.send_message(
+                        pairing.partner_telegram_id,
+                        MESSAGES['chat_ended'],
+                        reply_markup=KeyboardGenerator.get_main_menu()
+                    )
+                elif self.db_manager.waiting_pool.is_waiting(user.data['id']):
+                    self.outbox.send_message(
+                        message.chat.id,
+                        MESSAGES['random_chat_already_waiting']
                     )
                     return
+                else:
+                    partner = self.db_manager.pair_random_partner(user.data)
 
-                # ارسال پیام در حال جستجو
-                self.bot.edit_message_text(
-                    "🔄 در حال جستجو برای یک کاربر...\nلطفاً صبر کنید.",
-                    call.message.chat.id,
-                    call.message.message_id
-                )
+                status = MESSAGES['random_chat_connected'] if partner else MESSAGES['random_chat_waiting']
+                text = f"{MESSAGES['chat_skipped']}\n\n{status}" if pairing else status
 
-                # جستجوی کاربر تصادفی با هر جنسیتی
-                partner = self.db_manager.find_random_partner(user.data['id'])
+                self.outbox.send_message(
+                    message.chat.id,
+                    text,
+                    reply_markup=KeyboardGenerator.get_chat_menu()
+                )
 
                 if partner:
-                    # ایجاد چت جدید
-                    chat = Chat.create(self.db_manager, user.data['id'], partner['id'])
-
-                    # ارسال پیام به هر دو کاربر
-                    self.bot.send_message(
-                        call.message.chat.id,
-                        MESSAGES['random_chat_connected'],
-                        reply_markup=KeyboardGenerator.get_chat_menu()
-                    )
-
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         partner['telegram_id'],
                         MESSAGES['random_chat_connected'],
                         reply_markup=KeyboardGenerator.get_chat_menu()
                     )
-                else:
-                    self.bot.edit_message_text(
-                        "😕 متأسفانه در حال حاضر کاربری برای چت پیدا نشد. لطفاً بعداً دوباره تلاش کنید.",
-                        call.message.chat.id,
-                        call.message.message_id,
-                        reply_markup=KeyboardGenerator.get_search_menu()
-                    )
             except Exception as e:
-                self.logger.error(f"Error in search random any handler: {str(e)}")
+                self.logger.error(f"Error in next partner handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # پایان دادن به چت
-        @self.bot.message_handler(func=lambda message: message.text == "⛔ پایان چت")
+        @self.router.message_handler(text="⛔ پایان چت")
         def handle_end_chat(message):
             try:
                 self.update_user_status(message)
 
-                user = self.get_user(message.from_user.id)
-                active_chat = user.get_active_chat()
+                pairing = self.db_manager.chat_registry.get(message.from_user.id)
 
-                if not active_chat:
-                    self.bot.send_message(
+                # لغو جستجو برای کاربری که در صف انتظار است
+                if not pairing and self.db_manager.waiting_pool.remove_by_telegram_id(message.from_user.id):
+                    self.outbox.send_message(
                         message.chat.id,
-                        "⚠️ شما هیچ چت فعالی ندارید.",
+                        MESSAGES['random_chat_cancelled'],
                         reply_markup=KeyboardGenerator.get_main_menu()
                     )
                     return
 
-                # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                if not pairing:
+                    self.outbox.send_message(
+                        message.chat.id,
+                        "⚠️ شما هیچ چت فعالی ندارید.",
+                        reply_markup=KeyboardGenerator.get_main_menu()
+                    )
+                    return
 
                 # پایان دادن به چت
-                chat = Chat(self.db_manager, chat_id=active_chat['id'])
+                chat = Chat(self.db_manager, chat_id=pairing.chat_id)
                 chat.end()
 
                 # ارسال پیام به هر دو کاربر
-                self.bot.send_message(
+                self.outbox.send_message(
                     message.chat.id,
                     MESSAGES['chat_ended'],
                     reply_markup=KeyboardGenerator.get_main_menu()
                 )
 
-                if partner and partner.data:
-                    self.bot.send_message(
-                        partner.data['telegram_id'],
-                        MESSAGES['chat_ended'],
-                        reply_markup=KeyboardGenerator.get_main_menu()
-                    )
+                self.outbox.send_message(
+                    pairing.partner_telegram_id,
+                    MESSAGES['chat_ended'],
+                    reply_markup=KeyboardGenerator.get_main_menu()
+                )
             except Exception as e:
                 self.logger.error(f"Error in end chat handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مشاهده پروفایل طرف مقابل در چت
-        @self.bot.message_handler(func=lambda message: message.text == "👤 مشاهده پروفایل مقابل")
+        @self.router.message_handler(text="👤 مشاهده پروفایل مقابل")
         def handle_view_partner_profile(message):
             try:
                 self.update_user_status(message)
 
                 user = self.get_user(message.from_user.id)
-                active_chat = user.get_active_chat()
-
-                if not active_chat:
-                    self.bot.send_message(
+                if not user.data.get('active_chat_id'):
+                    self.outbox.send_message(
                         message.chat.id,
                         "⚠️ شما هیچ چت فعالی ندارید.",
                         reply_markup=KeyboardGenerator.get_main_menu()
@@ -291,39 +292,36 @@ class ChatHandler(BaseHandler):
                     return
 
                 # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                partner = user.get_partner()
 
                 if partner and partner.data:
                     # نمایش پروفایل طرف مقابل
                     profile_text = partner.get_profile_text()
 
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         message.chat.id,
                         profile_text,
                         parse_mode='Markdown'
                     )
                 else:
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         message.chat.id,
                         "❌ خطا در دریافت اطلاعات کاربر مقابل.",
                         reply_markup=KeyboardGenerator.get_chat_menu()
                     )
             except Exception as e:
                 self.logger.error(f"Error in view partner profile handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # فعال‌سازی چت خصوصی
-        @self.bot.message_handler(func=lambda message: message.text == "🔓 فعال‌سازی چت خصوصی")
+        @self.router.message_handler(text="🔓 فعال‌سازی چت خصوصی")
         def handle_private_chat_request(message):
             try:
                 self.update_user_status(message)
 
                 user = self.get_user(message.from_user.id)
-                active_chat = user.get_active_chat()
-
-                if not active_chat:
-                    self.bot.send_message(
+                if not user.data.get('active_chat_id'):
+                    self.outbox.send_message(
                         message.chat.id,
                         "⚠️ شما هیچ چت فعالی ندارید.",
                         reply_markup=KeyboardGenerator.get_main_menu()
@@ -331,13 +329,11 @@ class ChatHandler(BaseHandler):
                     return
 
                 # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                partner = user.get_partner()
 
                 if partner and partner.data:
                     # ارسال درخواست به طرف مقابل
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         partner.data['telegram_id'],
                         f"🔓 کاربر مقابل می‌خواهد چت را از حالت ناشناس خارج کند. آیا موافق هستید؟",
                         reply_markup=types.InlineKeyboardMarkup().add(
@@ -346,30 +342,29 @@ class ChatHandler(BaseHandler):
                         )
                     )
 
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         message.chat.id,
                         "🔄 درخواست شما برای فعال‌سازی چت خصوصی ارسال شد. منتظر پاسخ کاربر مقابل باشید."
                     )
                 else:
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         message.chat.id,
                         "❌ خطا در دریافت اطلاعات کاربر مقابل.",
                         reply_markup=KeyboardGenerator.get_chat_menu()
                     )
             except Exception as e:
                 self.logger.error(f"Error in private chat request handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # پذیرش درخواست چت خصوصی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "accept_private_chat")
+        @self.router.callback_query_handler(data="accept_private_chat")
         def handle_accept_private_chat(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
-                active_chat = user.get_active_chat()
-
-                if not active_chat:
-                    self.bot.edit_message_text(
+                if not user.data.get('active_chat_id'):
+                    self.outbox.edit_message_text(
                         "⚠️ چت قبلاً پایان یافته است.",
                         call.message.chat.id,
                         call.message.message_id
@@ -377,13 +372,11 @@ class ChatHandler(BaseHandler):
                     return
 
                 # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                partner = user.get_partner()
 
                 if partner and partner.data:
                     # ارسال پیام به هر دو کاربر
-                    self.bot.edit_message_text(
+                    self.outbox.edit_message_text(
                         "✅ شما درخواست چت خصوصی را پذیرفتید.",
                         call.message.chat.id,
                         call.message.message_id
@@ -398,35 +391,34 @@ class ChatHandler(BaseHandler):
                     if user.data.get('username'):
                         partner_contact += f"یوزرنیم: @{user.data.get('username')}\n"
 
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         call.message.chat.id,
                         user_contact
                     )
 
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         partner.data['telegram_id'],
                         f"✅ کاربر مقابل درخواست چت خصوصی را پذیرفت.\n\n{partner_contact}"
                     )
                 else:
-                    self.bot.edit_message_text(
+                    self.outbox.edit_message_text(
                         "❌ خطا در دریافت اطلاعات کاربر مقابل.",
                         call.message.chat.id,
                         call.message.message_id
                     )
             except Exception as e:
                 self.logger.error(f"Error in accept private chat handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # رد درخواست چت خصوصی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "reject_private_chat")
+        @self.router.callback_query_handler(data="reject_private_chat")
         def handle_reject_private_chat(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
-                active_chat = user.get_active_chat()
-
-                if not active_chat:
-                    self.bot.edit_message_text(
+                if not user.data.get('active_chat_id'):
+                    self.outbox.edit_message_text(
                         "⚠️ چت قبلاً پایان یافته است.",
                         call.message.chat.id,
                         call.message.message_id
@@ -434,127 +426,68 @@ class ChatHandler(BaseHandler):
                     return
 
                 # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                partner = user.get_partner()
 
                 if partner and partner.data:
                     # ارسال پیام به هر دو کاربر
-                    self.bot.edit_message_text(
+                    self.outbox.edit_message_text(
                         "❌ شما درخواست چت خصوصی را رد کردید.",
                         call.message.chat.id,
                         call.message.message_id
                     )
 
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         partner.data['telegram_id'],
                         "❌ کاربر مقابل درخواست چت خصوصی را رد کرد."
                     )
                 else:
-                    self.bot.edit_message_text(
+                    self.outbox.edit_message_text(
                         "❌ خطا در دریافت اطلاعات کاربر مقابل.",
                         call.message.chat.id,
                         call.message.message_id
                     )
             except Exception as e:
                 self.logger.error(f"Error in reject private chat handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # پردازش پیام‌های چت
-        @self.bot.message_handler(func=lambda message: True, content_types=['text', 'photo', 'voice', 'sticker'],
-                                  chat_types=['private'])
+        @self.router.relay_handler(content_types=RELAY_CONTENT_TYPES)
         def handle_chat_messages(message):
             try:
-                # به‌روزرسانی وضعیت آنلاین
-                self.update_user_status(message)
+                # پیام‌های منو و دستورات پیش از این توسط مسیریاب جدا شده‌اند
 
-                # اگر پیام از منوی اصلی نباشد
-                if message.text and message.text in [
-                    "🔗 به یک ناشناس وصلم کن!",
-                    "🔍 جستجوی کاربران",
-                    "👤 پروفایل من",
-                    "💰 افزایش سکه",
-                    "📄 راهنما",
-                    "🎁 دعوت دوستان",
-                    "⛔ پایان چت",
-                    "🔓 فعال‌سازی چت خصوصی",
-                    "👤 مشاهده پروفایل مقابل"
-                ]:
-                    return
+                # دریافت جفت چت از جدول درون حافظه‌ای (بدون کوئری)
+                pairing = self.db_manager.chat_registry.get(message.from_user.id)
 
-                user = self.get_user(message.from_user.id)
-                active_chat = user.get_active_chat()
+                # به‌روزرسانی وضعیت آنلاین
+                self.update_user_status(message)
 
-                if not active_chat:
+                if not pairing:
                     return  # کاربر چت فعالی ندارد
 
-                # دریافت کاربر مقابل
-                partner_id = active_chat['user1_id'] if active_chat['user2_id'] == user.data['id'] else active_chat[
-                    'user2_id']
-                partner = User(self.db_manager, user_data=self.db_manager.get_user_by_telegram_id(partner_id))
+                # تمدید مهلت بی‌فعالیتی چت
+                self.db_manager.touch_chat(pairing.chat_id)
 
-                if not partner or not partner.data:
-                    self.bot.send_message(
-                        message.chat.id,
-                        "❌ خطا در دریافت اطلاعات کاربر مقابل. چت پایان یافت.",
-                        reply_markup=KeyboardGenerator.get_main_menu()
-                    )
-                    chat = Chat(self.db_manager, chat_id=active_chat['id'])
-                    chat.end()
+                # پیام‌های آلبوم جمع‌آوری شده و با یک فراخوانی ارسال می‌شوند
+                if message.media_group_id:
+                    self.media_groups.add(message.media_group_id, message, pairing)
                     return
 
-                # پردازش و ارسال پیام بر اساس نوع آن
-                chat = Chat(self.db_manager, chat_id=active_chat['id'])
-
-                if message.text:
-                    # ذخیره پیام متنی
-                    chat.add_message(user.data['id'], 'text', message.text)
-
-                    # ارسال پیام به کاربر مقابل
-                    self.bot.send_message(
-                        partner.data['telegram_id'],
-                        message.text
-                    )
-                elif message.photo:
-                    # دریافت عکس با بالاترین کیفیت
-                    file_id = message.photo[-1].file_id
-                    caption = message.caption or ""
-
-                    # ذخیره اطلاعات عکس
-                    content = {'file_id': file_id, 'caption': caption}
-                    chat.add_message(user.data['id'], 'photo', json.dumps(content))
-
-                    # ارسال عکس به کاربر مقابل
-                    self.bot.send_photo(
-                        partner.data['telegram_id'],
-                        file_id,
-                        caption=caption
-                    )
-                elif message.voice:
-                    # دریافت صدا
-                    file_id = message.voice.file_id
-
-                    # ذخیره اطلاعات صدا
-                    content = {'file_id': file_id}
-                    chat.add_message(user.data['id'], 'voice', json.dumps(content))
-
-                    # ارسال صدا به کاربر مقابل
-                    self.bot.send_voice(
-                        partner.data['telegram_id'],
-                        file_id
-                    )
-                elif message.sticker:
-                    # دریافت استیکر
-                    file_id = message.sticker.file_id
-
-                    # ذخیره اطلاعات استیکر
-                    content = {'file_id': file_id}
-                    chat.add_message(user.data['id'], 'sticker', json.dumps(content))
+                # ذخیره رکورد فشرده پیام (متن یا file_unique_id)
+                self.db_manager.add_message(
+                    pairing.chat_id,
+                    pairing.user_id,
+                    message.content_type,
+                    self.get_message_record(message)
+                )
 
-                    # ارسال استیکر به کاربر مقابل
-                    self.bot.send_sticker(
-                        partner.data['telegram_id'],
-                        file_id
-                    )
+                # کپی پیام برای کاربر مقابل در سمت سرور (بدون دانلود و آپلود مجدد)
+                self.outbox.copy_message(
+                    pairing.partner_telegram_id,
+                    message.chat.id,
+                    message.message_id
+                )
             except Exception as e:
                 self.logger.error(f"Error in chat messages handler: {str(e)}")
+                self.db_manager.mark_failed()
 
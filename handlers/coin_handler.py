@@ -15,7 +15,7 @@ class CoinHandler(BaseHandler):
         """
 
         # منوی افزایش سکه
-        @self.bot.message_handler(func=lambda message: message.text == "💰 افزایش سکه")
+        @self.router.message_handler(text="💰 افزایش سکه")
         def handle_coins(message):
             try:
                 self.update_user_status(message)
@@ -31,9 +31,10 @@ class CoinHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in coins handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # خرید سکه
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("buy_coin_"))
+        @self.router.callback_query_handler(prefix="buy_coin_")
         def handle_buy_coin(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -66,9 +67,10 @@ class CoinHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in buy coin handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # دریافت سکه رایگان
-        @self.bot.callback_query_handler(func=lambda call: call.data == "free_coins")
+        @self.router.callback_query_handler(data="free_coins")
         def handle_free_coins(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -88,9 +90,10 @@ class CoinHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in free coins handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # بازگشت به منوی سکه‌ها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "back_to_coins")
+        @self.router.callback_query_handler(data="back_to_coins")
         def handle_back_to_coins(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -107,4 +110,5 @@ class CoinHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in back to coins handler: {str(e)}")
+                self.db_manager.mark_failed()
 
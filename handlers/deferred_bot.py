@@ -0,0 +1,77 @@
+class DeferredResult:
+    """
+    نتیجه یک فراخوانی API که تا پایان واحد کار به تعویق افتاده است
+
+    می‌تواند به عنوان آرگومان فراخوانی‌های بعدی (مانند register_next_step_handler)
+    استفاده شود؛ هنگام اجرای آن‌ها با نتیجه واقعی جایگزین می‌شود.
+    """
+
+    __slots__ = ('value', 'ready')
+
+    def __init__(self):
+        self.value = None
+        self.ready = False
+
+    def set(self, value):
+        self.value = value
+        self.ready = True
+
+    def __getattr__(self, name):
+        if not self.ready:
+            raise RuntimeError("result of a deferred Telegram call is not available before the update commits")
+        return getattr(self.value, name)
+
+
+class DeferredBot:
+    """
+    پوشش TeleBot برای هندلرها
+
+    اگر نخ جاری درون واحد کار تراکنش نوشتن باز داشته باشد، فراخوانی‌های API تا پایان
+    واحد کار به تعویق می‌افتند تا قفل نوشتن SQLite در طول درخواست‌های شبکه نگه داشته
+    نشود؛ در غیر این صورت فراخوانی بلافاصله انجام شده و نتیجه آن برگردانده می‌شود.
+    """
+
+    def __init__(self, bot, db_manager):
+        """
+        مقداردهی اولیه پوشش ربات
+        """
+        self._bot = bot
+        self._db_manager = db_manager
+
+    def __getattr__(self, name):
+        attr = getattr(self._bot, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if not self._db_manager.has_pending_writes() and not self._has_unready(args, kwargs):
+                return attr(*self._resolve(args), **self._resolve_kwargs(kwargs))
+
+            result = DeferredResult()
+            self._db_manager.defer(
+                lambda: result.set(attr(*self._resolve(args), **self._resolve_kwargs(kwargs)))
+            )
+            return result
+
+        return call
+
+    @staticmethod
+    def _has_unready(args, kwargs):
+        """
+        بررسی وجود آرگومانی که نتیجه یک فراخوانی هنوز اجرا نشده است
+        """
+        return any(
+            isinstance(value, DeferredResult) and not value.ready
+            for value in (*args, *kwargs.values())
+        )
+
+    @staticmethod
+    def _resolve(args):
+        return [value.value if isinstance(value, DeferredResult) else value for value in args]
+
+    @staticmethod
+    def _resolve_kwargs(kwargs):
+        return {
+            key: value.value if isinstance(value, DeferredResult) else value
+            for key, value in kwargs.items()
+        }
@@ -15,25 +15,26 @@ class ProfileHandler(BaseHandler):
         """
 
         # نمایش پروفایل
-        @self.bot.message_handler(func=lambda message: message.text == "👤 پروفایل من")
+        @self.router.message_handler(text="👤 پروفایل من")
         def handle_profile(message):
             try:
                 self.update_user_status(message)
 
                 user = self.get_user(message.from_user.id)
-                profile_text = user.get_profile_text()
+                card = user.get_profile_card()
 
                 self.bot.send_message(
                     message.chat.id,
-                    profile_text,
+                    card.text,
                     parse_mode='Markdown',
-                    reply_markup=KeyboardGenerator.get_profile_menu()
+                    reply_markup=card.get_markup('profile', KeyboardGenerator.get_profile_menu)
                 )
             except Exception as e:
                 self.logger.error(f"Error in profile handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # ویرایش نام
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_name")
+        @self.router.callback_query_handler(data="edit_name")
         def handle_edit_name(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -47,6 +48,7 @@ class ProfileHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_name_step)
             except Exception as e:
                 self.logger.error(f"Error in edit name handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_name_step(message):
             try:
@@ -76,6 +78,7 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process name step: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -83,7 +86,7 @@ class ProfileHandler(BaseHandler):
                 )
 
         # ویرایش سن
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_age")
+        @self.router.callback_query_handler(data="edit_age")
         def handle_edit_age(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -97,6 +100,7 @@ class ProfileHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_age_step)
             except Exception as e:
                 self.logger.error(f"Error in edit age handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_age_step(message):
             try:
@@ -137,6 +141,7 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process age step: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -144,7 +149,7 @@ class ProfileHandler(BaseHandler):
                 )
 
         # ویرایش جنسیت
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_gender")
+        @self.router.callback_query_handler(data="edit_gender")
         def handle_edit_gender(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -157,8 +162,9 @@ class ProfileHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in edit gender handler: {str(e)}")
+                self.db_manager.mark_failed()
 
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("gender_"))
+        @self.router.callback_query_handler(prefix="gender_")
         def handle_gender_selection(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -193,9 +199,10 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in gender selection handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # ویرایش شهر
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_city")
+        @self.router.callback_query_handler(data="edit_city")
         def handle_edit_city(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -209,6 +216,7 @@ class ProfileHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_city_step)
             except Exception as e:
                 self.logger.error(f"Error in edit city handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_city_step(message):
             try:
@@ -238,6 +246,7 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process city step: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -245,7 +254,7 @@ class ProfileHandler(BaseHandler):
                 )
 
         # ویرایش بیوگرافی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_bio")
+        @self.router.callback_query_handler(data="edit_bio")
         def handle_edit_bio(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -259,6 +268,7 @@ class ProfileHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_bio_step)
             except Exception as e:
                 self.logger.error(f"Error in edit bio handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_bio_step(message):
             try:
@@ -288,6 +298,7 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process bio step: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -295,7 +306,7 @@ class ProfileHandler(BaseHandler):
                 )
 
         # آپلود عکس پروفایل
-        @self.bot.callback_query_handler(func=lambda call: call.data == "edit_pic")
+        @self.router.callback_query_handler(data="edit_pic")
         def handle_edit_pic(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -308,6 +319,7 @@ class ProfileHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_profile_pic)
             except Exception as e:
                 self.logger.error(f"Error in edit pic handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         def process_profile_pic(message):
             try:
@@ -356,6 +368,7 @@ class ProfileHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process profile pic: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -363,21 +376,22 @@ class ProfileHandler(BaseHandler):
                 )
 
         # انصراف از ویرایش
-        @self.bot.callback_query_handler(func=lambda call: call.data == "cancel_edit")
+        @self.router.callback_query_handler(data="cancel_edit")
         def handle_cancel_edit(call):
             try:
                 self.bot.answer_callback_query(call.id)
 
                 user = self.get_user(call.from_user.id)
-                profile_text = user.get_profile_text()
+                card = user.get_profile_card()
 
                 self.bot.edit_message_text(
-                    profile_text,
+                    card.text,
                     call.message.chat.id,
                     call.message.message_id,
                     parse_mode='Markdown',
-                    reply_markup=KeyboardGenerator.get_profile_menu()
+                    reply_markup=card.get_markup('profile', KeyboardGenerator.get_profile_menu)
                 )
             except Exception as e:
                 self.logger.error(f"Error in cancel edit handler: {str(e)}")
+                self.db_manager.mark_failed()
 
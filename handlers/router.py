@@ -0,0 +1,225 @@
+import time
+import logging
+import threading
+
+
+class PrefixTrie:
+    """
+    درخت پیشوندی برای یافتن طولانی‌ترین پیشوند منطبق با callback_data
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه درخت
+        """
+        self._root = {}
+        self._value_key = object()
+
+    def insert(self, prefix, value):
+        """
+        افزودن پیشوند به درخت
+        """
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._value_key] = value
+
+    def longest_match(self, text):
+        """
+        یافتن مقدار طولانی‌ترین پیشوند منطبق با متن
+        """
+        node = self._root
+        match = node.get(self._value_key)
+
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            if self._value_key in node:
+                match = node[self._value_key]
+
+        return match
+
+
+class UpdateRouter:
+    """
+    مسیریاب مرکزی آپدیت‌ها
+
+    به جای بررسی خطی lambdaهای telebot برای هر آپدیت، هندلرها در سه ساختار ثبت می‌شوند:
+    دیکشنری متن‌های دقیق منو (و دستورات)، درخت پیشوندی callback_data و مسیر سریع رله چت.
+    """
+
+    def __init__(self, bot, unit_of_work=None):
+        """
+        مقداردهی اولیه مسیریاب
+
+        unit_of_work (اختیاری) تابعی است که برای هر آپدیت یک context manager
+        برمی‌گرداند و اجرای هندلر درون آن انجام می‌شود.
+        """
+        self.bot = bot
+        self.unit_of_work = unit_of_work
+        self.logger = logging.getLogger('chatogram.handlers.router')
+
+        self._text_routes = {}
+        self._command_routes = {}
+        self._callback_routes = {}
+        self._callback_prefixes = PrefixTrie()
+        self._relay_handler = None
+        self._relay_content_types = set()
+
+        # آمار هزینه مسیریابی
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'updates': 0,
+            'unhandled': 0,
+            'total_dispatch_ns': 0,
+            'max_dispatch_ns': 0
+        }
+
+    def message_handler(self, text=None, commands=None):
+        """
+        ثبت هندلر پیام برای متن دقیق یا دستورات
+        """
+        def decorator(handler):
+            if text is not None:
+                self._text_routes[text] = handler
+            for command in commands or []:
+                self._command_routes[command] = handler
+            return handler
+
+        return decorator
+
+    def callback_query_handler(self, data=None, prefix=None):
+        """
+        ثبت هندلر callback برای داده دقیق یا پیشوند
+        """
+        def decorator(handler):
+            if data is not None:
+                self._callback_routes[data] = handler
+            if prefix is not None:
+                self._callback_prefixes.insert(prefix, handler)
+            return handler
+
+        return decorator
+
+    def relay_handler(self, content_types):
+        """
+        ثبت هندلر رله پیام‌های چت (مسیر پیش‌فرض پیام‌های خصوصی)
+        """
+        def decorator(handler):
+            self._relay_handler = handler
+            self._relay_content_types = set(content_types)
+            return handler
+
+        return decorator
+
+    def install(self):
+        """
+        ثبت مسیریاب به عنوان تنها هندلر پیام و callback در telebot
+        """
+        self.bot.message_handler(func=lambda message: True, content_types=self._message_content_types())(
+            self.dispatch_message
+        )
+        self.bot.callback_query_handler(func=lambda call: True)(self.dispatch_callback)
+
+        self.logger.info(
+            f"Router installed: {len(self._text_routes)} text, {len(self._command_routes)} command, "
+            f"{len(self._callback_routes)} callback routes"
+        )
+
+    def _message_content_types(self):
+        """
+        انواع محتوایی که مسیریاب باید دریافت کند
+        """
+        return sorted(self._relay_content_types | {'text'})
+
+    def resolve_message(self, message):
+        """
+        یافتن هندلر مناسب برای پیام
+        """
+        text = message.text
+
+        if text:
+            handler = self._text_routes.get(text)
+            if handler:
+                return handler
+
+            if text.startswith('/'):
+                command = text[1:].split(maxsplit=1)[0].split('@')[0] if len(text) > 1 else ''
+                handler = self._command_routes.get(command)
+                if handler:
+                    return handler
+
+        if (self._relay_handler and message.content_type in self._relay_content_types
+                and message.chat.type == 'private'):
+            return self._relay_handler
+
+        return None
+
+    def resolve_callback(self, call):
+        """
+        یافتن هندلر مناسب برای callback
+        """
+        data = call.data or ''
+
+        handler = self._callback_routes.get(data)
+        if handler:
+            return handler
+
+        return self._callback_prefixes.longest_match(data)
+
+    def dispatch_message(self, message):
+        """
+        ارسال پیام به هندلر مربوطه
+        """
+        self._dispatch(self.resolve_message, message)
+
+    def dispatch_callback(self, call):
+        """
+        ارسال callback به هندلر مربوطه
+        """
+        self._dispatch(self.resolve_callback, call)
+
+    def _dispatch(self, resolver, update):
+        """
+        مسیریابی آپدیت و ثبت هزینه آن
+        """
+        started = time.perf_counter_ns()
+        handler = resolver(update)
+        elapsed = time.perf_counter_ns() - started
+
+        self._record(elapsed, handler is not None)
+
+        if not handler:
+            return
+
+        if self.unit_of_work is None:
+            handler(update)
+            return
+
+        with self.unit_of_work():
+            handler(update)
+
+    def _record(self, elapsed_ns, handled):
+        """
+        ثبت آمار هزینه مسیریابی
+        """
+        with self._stats_lock:
+            self._stats['updates'] += 1
+            self._stats['total_dispatch_ns'] += elapsed_ns
+            if elapsed_ns > self._stats['max_dispatch_ns']:
+                self._stats['max_dispatch_ns'] = elapsed_ns
+            if not handled:
+                self._stats['unhandled'] += 1
+
+        self.logger.debug(f"Dispatch cost: {elapsed_ns} ns")
+
+    def get_stats(self):
+        """
+        دریافت آمار هزینه مسیریابی
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats['avg_dispatch_ns'] = stats['total_dispatch_ns'] / stats['updates'] if stats['updates'] else 0
+        return stats
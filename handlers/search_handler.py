@@ -10,20 +10,22 @@ class SearchHandler(BaseHandler):
     """
     کلاس مدیریت جستجوی کاربران
     """
-    def __init__(self, bot, db_manager):
+    def __init__(self, bot, db_manager, router, outbox):
         """
         مقداردهی اولیه هندلر جستجو
         """
-        super().__init__(bot, db_manager)
+        super().__init__(bot, db_manager, router, outbox)
         # ذخیره‌سازی فیلترهای جستجوی کاربران
         self.search_filters = {}
+        # وضعیت‌های رابطه پیش‌خوانده برای نتایج جستجوی فعلی هر کاربر
+        self.search_flags = {}
     
     def register_handlers(self):
         """
         ثبت هندلرهای پیام
         """
         # منوی جستجو
-        @self.bot.message_handler(func=lambda message: message.text == "🔍 جستجوی کاربران")
+        @self.router.message_handler(text="🔍 جستجوی کاربران")
         def handle_search(message):
             try:
                 self.update_user_status(message)
@@ -36,9 +38,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in search handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # بازگشت به منوی جستجو
-        @self.bot.callback_query_handler(func=lambda call: call.data == "back_to_search")
+        @self.router.callback_query_handler(data="back_to_search")
         def handle_back_to_search(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -52,9 +55,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in back to search handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # جستجوی پیشرفته
-        @self.bot.callback_query_handler(func=lambda call: call.data == "search_advanced")
+        @self.router.callback_query_handler(data="search_advanced")
         def handle_advanced_search(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -88,9 +92,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in advanced search handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # انتخاب جنسیت در جستجوی پیشرفته
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("adv_gender_"))
+        @self.router.callback_query_handler(prefix="adv_gender_")
         def handle_adv_gender_selection(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -119,9 +124,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in advanced gender selection handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # انتخاب محدوده سنی در جستجوی پیشرفته
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("adv_age_"))
+        @self.router.callback_query_handler(prefix="adv_age_")
         def handle_adv_age_selection(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -166,9 +172,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in advanced age selection handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # انتخاب شهر در جستجوی پیشرفته
-        @self.bot.callback_query_handler(func=lambda call: call.data == "adv_city_select")
+        @self.router.callback_query_handler(data="adv_city_select")
         def handle_adv_city_selection(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -182,6 +189,7 @@ class SearchHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, process_city_selection)
             except Exception as e:
                 self.logger.error(f"Error in advanced city selection handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         def process_city_selection(message):
             try:
@@ -226,9 +234,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in process city selection: {str(e)}")
+                self.db_manager.mark_failed()
         
         # پاک کردن فیلترها
-        @self.bot.callback_query_handler(func=lambda call: call.data == "adv_clear_filters")
+        @self.router.callback_query_handler(data="adv_clear_filters")
         def handle_adv_clear_filters(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -246,9 +255,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in advanced clear filters handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # شروع جستجو
-        @self.bot.callback_query_handler(func=lambda call: call.data == "adv_search_start")
+        @self.router.callback_query_handler(data="adv_search_start")
         def handle_adv_search_start(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -293,70 +303,14 @@ class SearchHandler(BaseHandler):
                 )
                 
                 # نمایش اولین کاربر
+                self.prefetch_relationship_flags(call.from_user.id, user.data['id'], users)
                 self.show_search_result(call.message.chat.id, users, 0)
             except Exception as e:
                 self.logger.error(f"Error in advanced search start handler: {str(e)}")
-        
-        def show_search_result(self ,chat_id, users, index):
-            """
-            نمایش نتیجه جستجو
-            """
-            if not users or index >= len(users):
-                self.bot.send_message(
-                    chat_id,
-                    "پایان نتایج جستجو.",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 بازگشت به جستجو", callback_data="back_to_search")
-                    )
-                )
-                return
-            
-            user = users[index]
-            user_model = User(self.db_manager, user_data=user)
-            profile_text = user_model.get_profile_text()
-            
-            # کیبورد نمایش کاربر
-            markup = types.InlineKeyboardMarkup(row_width=2)
-            
-            # دکمه‌های مشاهده پروفایل کاربر
-            actions_btn = types.InlineKeyboardButton("💬 اقدامات", callback_data=f"user_actions_{user['id']}")
-            next_btn = types.InlineKeyboardButton("➡️ بعدی", callback_data=f"next_user_{index + 1}")
-            back_search_btn = types.InlineKeyboardButton("🔙 بازگشت به جستجو", callback_data="back_to_search")
-            
-            if index < len(users) - 1:
-                markup.add(actions_btn, next_btn)
-            else:
-                markup.add(actions_btn)
-            
-            markup.add(back_search_btn)
-            
-            # ارسال پروفایل کاربر
-            if user.get('profile_pic'):
-                try:
-                    self.bot.send_photo(
-                        chat_id,
-                        user['profile_pic'],
-                        caption=profile_text,
-                        parse_mode='Markdown',
-                        reply_markup=markup
-                    )
-                except Exception:
-                    self.bot.send_message(
-                        chat_id,
-                        profile_text,
-                        parse_mode='Markdown',
-                        reply_markup=markup
-                    )
-            else:
-                self.bot.send_message(
-                    chat_id,
-                    profile_text,
-                    parse_mode='Markdown',
-                    reply_markup=markup
-                )
+                self.db_manager.mark_failed()
         
         # نمایش کاربر بعدی
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("next_user_"))
+        @self.router.callback_query_handler(prefix="next_user_")
         def handle_next_user(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -371,12 +325,14 @@ class SearchHandler(BaseHandler):
                 users = self.db_manager.search_users(search_params, user.data['id'])
                 
                 # نمایش کاربر بعدی
+                self.prefetch_relationship_flags(call.from_user.id, user.data['id'], users)
                 self.show_search_result(call.message.chat.id, users, index)
             except Exception as e:
                 self.logger.error(f"Error in next user handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # نمایش اقدامات روی کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("user_actions_"))
+        @self.router.callback_query_handler(prefix="user_actions_")
         def handle_user_actions(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -396,17 +352,24 @@ class SearchHandler(BaseHandler):
                     )
                     return
                 
+                # وضعیت فعلی لایک، دنبال کردن و بلاک از پیش‌خوانی نتایج جستجو یا با یک کوئری
+                flags = self.search_flags.get(call.from_user.id, {}).pop(user_id, None)
+                if flags is None:
+                    viewer = self.get_user(call.from_user.id)
+                    flags = viewer.get_relationship_flags(user_id)
+                
                 # نمایش اقدامات
                 self.bot.edit_message_reply_markup(
                     call.message.chat.id,
                     call.message.message_id,
-                    reply_markup=KeyboardGenerator.get_user_profile_actions(user_id)
+                    reply_markup=KeyboardGenerator.get_user_profile_actions(user_id, flags)
                 )
             except Exception as e:
                 self.logger.error(f"Error in user actions handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # درخواست چت به کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("chat_request_"))
+        @self.router.callback_query_handler(prefix="chat_request_")
         def handle_chat_request(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -465,6 +428,7 @@ class SearchHandler(BaseHandler):
                 self.bot.register_next_step_handler(msg, lambda m: process_chat_request_message(m, target_user_id, request_id))
             except Exception as e:
                 self.logger.error(f"Error in chat request handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         def process_chat_request_message(message, target_user_id, request_id):
             try:
@@ -485,7 +449,7 @@ class SearchHandler(BaseHandler):
                 self.db_manager.update_chat_request(request_id, message.text)
                 
                 # ارسال درخواست به کاربر هدف
-                self.bot.send_message(
+                self.outbox.send_message(
                     target_user_data['telegram_id'],
                     f"💬 *درخواست چت جدید*\n\nکاربر «{user.data.get('display_name', 'کاربر ناشناس')}» می‌خواهد با شما چت کند.\n\nپیام کاربر:\n\"{message.text}\"",
                     parse_mode='Markdown',
@@ -499,6 +463,7 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in process chat request message: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطا در ارسال درخواست چت. لطفاً مجدداً تلاش کنید.",
@@ -506,7 +471,7 @@ class SearchHandler(BaseHandler):
                 )
         
         # پذیرش درخواست چت
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("accept_chat_request_"))
+        @self.router.callback_query_handler(prefix="accept_chat_request_")
         def handle_accept_chat_request(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -556,16 +521,17 @@ class SearchHandler(BaseHandler):
                     reply_markup=KeyboardGenerator.get_chat_menu()
                 )
                 
-                self.bot.send_message(
+                self.outbox.send_message(
                     requester.data['telegram_id'],
                     f"✅ کاربر «{user.data.get('display_name', 'کاربر ناشناس')}» درخواست چت شما را پذیرفت. اکنون می‌توانید با ایشان گفتگو کنید.",
                     reply_markup=KeyboardGenerator.get_chat_menu()
                 )
             except Exception as e:
                 self.logger.error(f"Error in accept chat request handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # رد درخواست چت
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("reject_chat_request_"))
+        @self.router.callback_query_handler(prefix="reject_chat_request_")
         def handle_reject_chat_request(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -598,15 +564,16 @@ class SearchHandler(BaseHandler):
                     reply_markup=None
                 )
                 
-                self.bot.send_message(
+                self.outbox.send_message(
                     requester.data['telegram_id'],
                     f"❌ کاربر «{user.data.get('display_name', 'کاربر ناشناس')}» درخواست چت شما را رد کرد."
                 )
             except Exception as e:
                 self.logger.error(f"Error in reject chat request handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # لایک کردن پروفایل
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("like_profile_"))
+        @self.router.callback_query_handler(prefix="like_profile_")
         def handle_like_profile(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -632,7 +599,7 @@ class SearchHandler(BaseHandler):
                 
                 # ارسال نوتیفیکیشن به کاربر هدف در صورت لایک شدن
                 if is_liked:
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         target_user_data['telegram_id'],
                         f"❤️ کاربر «{user.data.get('display_name', 'کاربر ناشناس')}» پروفایل شما را لایک کرد."
                     )
@@ -650,9 +617,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in like profile handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # دنبال کردن کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("follow_user_"))
+        @self.router.callback_query_handler(prefix="follow_user_")
         def handle_follow_user(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -678,7 +646,7 @@ class SearchHandler(BaseHandler):
                 
                 # ارسال نوتیفیکیشن به کاربر هدف در صورت دنبال شدن
                 if is_following:
-                    self.bot.send_message(
+                    self.outbox.send_message(
                         target_user_data['telegram_id'],
                         f"👁 کاربر «{user.data.get('display_name', 'کاربر ناشناس')}» شما را دنبال کرد."
                     )
@@ -696,9 +664,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in follow user handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # بلاک کردن کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("block_user_"))
+        @self.router.callback_query_handler(prefix="block_user_")
         def handle_block_user(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -747,9 +716,10 @@ class SearchHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in block user handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # گزارش تخلف کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("report_user_"))
+        @self.router.callback_query_handler(prefix="report_user_")
         def handle_report_user(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -783,9 +753,10 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in report user handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         # انتخاب دلیل گزارش
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("report_") and not call.data.startswith("report_user_"))
+        @self.router.callback_query_handler(prefix="report_")
         def handle_report_reason(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -835,7 +806,7 @@ class SearchHandler(BaseHandler):
                         try:
                             target_user = User(self.db_manager, user_data=self.db_manager.get_user_by_id(target_user_id))
                             
-                            self.bot.send_message(
+                            self.outbox.send_message(
                                 admin_id,
                                 f"🚩 *گزارش تخلف جدید*\n\nگزارش‌دهنده: {user.data.get('display_name', 'کاربر ناشناس')} (ID: {user.data['telegram_id']})\n\nکاربر گزارش‌شده: {target_user.data.get('display_name', 'کاربر ناشناس')} (ID: {target_user.data['telegram_id']})\n\nدلیل: {reason}",
                                 parse_mode='Markdown',
@@ -864,6 +835,7 @@ class SearchHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in report reason handler: {str(e)}")
+                self.db_manager.mark_failed()
         
         def process_report_details(message):
             try:
@@ -890,7 +862,7 @@ class SearchHandler(BaseHandler):
                         try:
                             target_user = User(self.db_manager, user_data=self.db_manager.get_user_by_id(target_user_id))
                             
-                            self.bot.send_message(
+                            self.outbox.send_message(
                                 admin_id,
                                 f"🚩 *گزارش تخلف جدید*\n\nگزارش‌دهنده: {user.data.get('display_name', 'کاربر ناشناس')} (ID: {user.data['telegram_id']})\n\nکاربر گزارش‌شده: {target_user.data.get('display_name', 'کاربر ناشناس')} (ID: {target_user.data['telegram_id']})\n\nدلیل: {reason}",
                                 parse_mode='Markdown',
@@ -919,6 +891,7 @@ class SearchHandler(BaseHandler):
                     )
             except Exception as e:
                 self.logger.error(f"Error in process report details: {str(e)}")
+                self.db_manager.mark_failed()
                 self.bot.send_message(
                     message.chat.id,
                     "❌ خطایی رخ داد. لطفاً مجدداً تلاش کنید.",
@@ -926,7 +899,7 @@ class SearchHandler(BaseHandler):
                 )
         
         # انصراف از گزارش
-        @self.bot.callback_query_handler(func=lambda call: call.data == "cancel_report")
+        @self.router.callback_query_handler(data="cancel_report")
         def handle_cancel_report(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -944,7 +917,74 @@ class SearchHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in cancel report handler: {str(e)}")
+                self.db_manager.mark_failed()
     
+    def prefetch_relationship_flags(self, telegram_id, viewer_id, users):
+        """
+        خواندن وضعیت‌های رابطه بیننده با همه نتایج جستجو در یک کوئری
+
+        هر وضعیت فقط یک بار (با باز کردن اقدامات همان کاربر) مصرف می‌شود تا پس از
+        لایک یا دنبال کردن وضعیت قدیمی دوباره نمایش داده نشود.
+        """
+        self.search_flags[telegram_id] = self.db_manager.get_relationship_flags_many(
+            viewer_id, [result['id'] for result in users]
+        )
+
+    def show_search_result(self, chat_id, users, index):
+        """
+        نمایش نتیجه جستجو
+        """
+        if not users or index >= len(users):
+            self.outbox.send_message(
+                chat_id,
+                "پایان نتایج جستجو.",
+                reply_markup=types.InlineKeyboardMarkup().add(
+                    types.InlineKeyboardButton("🔙 بازگشت به جستجو", callback_data="back_to_search")
+                )
+            )
+            return
+        
+        user = users[index]
+        card = User(self.db_manager, user_data=user).get_profile_card()
+        has_next = index < len(users) - 1
+
+        def build_markup():
+            # کیبورد نمایش کاربر
+            markup = types.InlineKeyboardMarkup(row_width=2)
+
+            # دکمه‌های مشاهده پروفایل کاربر
+            actions_btn = types.InlineKeyboardButton("💬 اقدامات", callback_data=f"user_actions_{user['id']}")
+            next_btn = types.InlineKeyboardButton("➡️ بعدی", callback_data=f"next_user_{index + 1}")
+            back_search_btn = types.InlineKeyboardButton("🔙 بازگشت به جستجو", callback_data="back_to_search")
+
+            if has_next:
+                markup.add(actions_btn, next_btn)
+            else:
+                markup.add(actions_btn)
+
+            markup.add(back_search_btn)
+            return markup
+
+        # کیبورد آماده کارت برای همین موقعیت در نتایج
+        markup = card.get_markup(('search', index, has_next), build_markup)
+        
+        # ارسال پروفایل کاربر
+        if card.photo:
+            self.outbox.send_photo(
+                chat_id,
+                card.photo,
+                caption=card.text,
+                parse_mode='Markdown',
+                reply_markup=markup
+            )
+        else:
+            self.outbox.send_message(
+                chat_id,
+                card.text,
+                parse_mode='Markdown',
+                reply_markup=markup
+            )
+
     def update_keyboard_button(self, markup, callback_data_prefix, new_text):
         """
         به‌روزرسانی متن دکمه در کیبورد
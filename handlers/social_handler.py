@@ -1,6 +1,5 @@
 from telebot import types
 from handlers.base_handler import BaseHandler
-from models.user import User
 
 
 class SocialHandler(BaseHandler):
@@ -14,7 +13,7 @@ class SocialHandler(BaseHandler):
         """
 
         # مشاهده لیست دنبال‌کنندگان
-        @self.bot.message_handler(commands=['followers'])
+        @self.router.message_handler(commands=['followers'])
         def handle_followers(message):
             try:
                 self.update_user_status(message)
@@ -35,8 +34,7 @@ class SocialHandler(BaseHandler):
                 follower_text = "👁 *لیست دنبال‌کنندگان شما*\n\n"
 
                 for i, follower in enumerate(followers, 1):
-                    follower_user = User(self.db_manager, user_data=follower)
-                    follower_text += f"{i}. {follower_user.data.get('display_name', 'کاربر ناشناس')}\n"
+                    follower_text += f"{i}. {follower.get('display_name', 'کاربر ناشناس')}\n"
 
                 self.bot.send_message(
                     message.chat.id,
@@ -45,9 +43,10 @@ class SocialHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in followers handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مشاهده لیست دنبال‌شده‌ها
-        @self.bot.message_handler(commands=['following'])
+        @self.router.message_handler(commands=['following'])
         def handle_following(message):
             try:
                 self.update_user_status(message)
@@ -68,8 +67,7 @@ class SocialHandler(BaseHandler):
                 following_text = "👁 *لیست کاربرانی که دنبال می‌کنید*\n\n"
 
                 for i, followed in enumerate(following, 1):
-                    followed_user = User(self.db_manager, user_data=followed)
-                    following_text += f"{i}. {followed_user.data.get('display_name', 'کاربر ناشناس')}\n"
+                    following_text += f"{i}. {followed.get('display_name', 'کاربر ناشناس')}\n"
 
                 self.bot.send_message(
                     message.chat.id,
@@ -78,9 +76,10 @@ class SocialHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in following handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مشاهده لیست لایک‌ها
-        @self.bot.message_handler(commands=['likes'])
+        @self.router.message_handler(commands=['likes'])
         def handle_likes(message):
             try:
                 self.update_user_status(message)
@@ -101,8 +100,7 @@ class SocialHandler(BaseHandler):
                 likes_text = "❤️ *لیست کاربرانی که پروفایل شما را لایک کرده‌اند*\n\n"
 
                 for i, like in enumerate(likes, 1):
-                    like_user = User(self.db_manager, user_data=like)
-                    likes_text += f"{i}. {like_user.data.get('display_name', 'کاربر ناشناس')}\n"
+                    likes_text += f"{i}. {like.get('display_name', 'کاربر ناشناس')}\n"
 
                 self.bot.send_message(
                     message.chat.id,
@@ -111,9 +109,10 @@ class SocialHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in likes handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # مشاهده لیست بلاک
-        @self.bot.message_handler(commands=['blocks'])
+        @self.router.message_handler(commands=['blocks'])
         def handle_blocks(message):
             try:
                 self.update_user_status(message)
@@ -134,9 +133,8 @@ class SocialHandler(BaseHandler):
                 blocks_text = "⛔ *لیست کاربران بلاک شده*\n\n"
 
                 for i, block in enumerate(blocks, 1):
-                    block_user = User(self.db_manager, user_data=block)
-                    blocks_text += f"{i}. {block_user.data.get('display_name', 'کاربر ناشناس')} "
-                    blocks_text += f"- [آنبلاک](/unblock_{block_user.data['id']})\n"
+                    blocks_text += f"{i}. {block.get('display_name', 'کاربر ناشناس')} "
+                    blocks_text += f"- [آنبلاک](/unblock_{block['id']})\n"
 
                 blocks_text += "\nبرای آنبلاک کردن یک کاربر، روی لینک «آنبلاک» کلیک کنید."
 
@@ -147,9 +145,10 @@ class SocialHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in blocks handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # آنبلاک کردن کاربر
-        @self.bot.callback_query_handler(func=lambda call: call.data.startswith("unblock_"))
+        @self.router.callback_query_handler(prefix="unblock_")
         def handle_unblock(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -167,3 +166,4 @@ class SocialHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in unblock handler: {str(e)}")
+                self.db_manager.mark_failed()
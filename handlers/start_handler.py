@@ -14,17 +14,19 @@ class StartHandler(BaseHandler):
         ثبت هندلرهای پیام
         """
 
-        @self.bot.message_handler(commands=['start'])
+        @self.router.message_handler(commands=['start'])
         def handle_start(message):
             try:
                 self.update_user_status(message)
 
+                # دریافت یا ثبت‌نام کاربر
+                user = self.get_user(message.from_user.id)
+
                 # بررسی کد دعوت
                 args = message.text.split()
                 if len(args) > 1:
                     try:
                         invite_code = int(args[1])
-                        user = self.get_user(message.from_user.id)
 
                         # ثبت استفاده از کد دعوت
                         inviter_id = self.db_manager.register_invite(invite_code, user.data['id'])
@@ -52,8 +54,9 @@ class StartHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in start handler: {str(e)}")
+                self.db_manager.mark_failed()
 
-        @self.bot.message_handler(func=lambda message: message.text == "📄 راهنما")
+        @self.router.message_handler(text="📄 راهنما")
         def handle_help(message):
             try:
                 self.update_user_status(message)
@@ -65,8 +68,9 @@ class StartHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in help handler: {str(e)}")
+                self.db_manager.mark_failed()
 
-        @self.bot.message_handler(func=lambda message: message.text == "🎁 دعوت دوستان")
+        @self.router.message_handler(text="🎁 دعوت دوستان")
         def handle_invite(message):
             try:
                 self.update_user_status(message)
@@ -83,9 +87,10 @@ class StartHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in invite handler: {str(e)}")
+                self.db_manager.mark_failed()
 
         # هندلر بازگشت به منوی اصلی
-        @self.bot.callback_query_handler(func=lambda call: call.data == "back_to_main")
+        @self.router.callback_query_handler(data="back_to_main")
         def handle_back_to_main(call):
             try:
                 self.bot.answer_callback_query(call.id)
@@ -99,3 +104,4 @@ class StartHandler(BaseHandler):
                 )
             except Exception as e:
                 self.logger.error(f"Error in back to main handler: {str(e)}")
+                self.db_manager.mark_failed()
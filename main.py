@@ -4,6 +4,8 @@ from config.settings import BOT_TOKEN, LOG_LEVEL
 from database.db_manager import DBManager
 from handlers import register_all_handlers
 from utils.logger import setup_logger
+from utils.outbound_queue import OutboundQueue
+from utils.chat_reaper import ChatReaper
 
 
 class ChatogramBot:
@@ -18,6 +20,9 @@ class ChatogramBot:
         self.bot = telebot.TeleBot(token)
         self.logger = setup_logger('chatogram', LOG_LEVEL)
         self.db_manager = DBManager()
+        # پیام‌های هندلرها پس از ثبت تراکنش آپدیت در صف ارسال قرار می‌گیرند
+        self.outbox = OutboundQueue(self.bot, defer=self.db_manager.defer)
+        self.reaper = ChatReaper(self.db_manager, self.outbox)
         self.logger.info("Initializing Chatogram Bot...")
 
     def setup(self):
@@ -28,7 +33,7 @@ class ChatogramBot:
         self.db_manager.setup()
 
         self.logger.info("Registering handlers...")
-        register_all_handlers(self.bot, self.db_manager)
+        self.router = register_all_handlers(self.bot, self.db_manager, self.outbox)
 
         self.logger.info("Bot setup completed")
 
@@ -37,7 +42,15 @@ class ChatogramBot:
         شروع به کار ربات
         """
         self.logger.info("Starting bot polling...")
-        self.bot.polling(none_stop=True, interval=0, timeout=20)
+        self.outbox.start()
+        self.reaper.start()
+        try:
+            self.bot.polling(none_stop=True, interval=0, timeout=20)
+        finally:
+            self.logger.info("Shutting down, flushing pending writes...")
+            self.reaper.stop()
+            self.outbox.stop()
+            self.db_manager.close()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import logging
-from utils.crypto import encrypt, decrypt
+from utils.crypto import decrypt_many
 
 
 class Chat:
@@ -38,14 +38,14 @@ class Chat:
         chat_id = db_manager.start_chat(user1_id, user2_id)
         return cls(db_manager, chat_id)
 
-    def end(self):
+    def end(self, commit=True):
         """
         پایان دادن به چت
         """
         if not self.data or not self.data.get('is_active', False):
             return False
 
-        success = self.db_manager.end_chat(self.data['id'])
+        success = self.db_manager.end_chat(self.data['id'], commit=commit)
 
         if success:
             self.data['is_active'] = False
@@ -80,7 +80,7 @@ class Chat:
             """
             SELECT * FROM messages 
             WHERE chat_id = ? 
-            ORDER BY sent_at DESC 
+            ORDER BY id DESC 
             LIMIT ?
             """,
             (self.data['id'], limit)
@@ -88,14 +88,15 @@ class Chat:
 
         messages = [dict(row) for row in cursor.fetchall()]
 
-        # رمزگشایی محتوای پیام‌ها
-        for message in messages:
-            if message.get('content'):
-                try:
-                    message['content'] = decrypt(message['content'])
-                except Exception as e:
-                    self.logger.error(f"Error decrypting message: {str(e)}")
-                    message['content'] = "[خطا در رمزگشایی پیام]"
+        # رمزگشایی دسته‌ای محتوای پیام‌ها
+        encrypted = [message for message in messages if message.get('content')]
+        decrypted = decrypt_many([message['content'] for message in encrypted])
+
+        for message, content in zip(encrypted, decrypted):
+            if content is None:
+                self.logger.error(f"Error decrypting message {message['id']}")
+                content = "[خطا در رمزگشایی پیام]"
+            message['content'] = content
 
         # مرتب‌سازی پیام‌ها به ترتیب زمان ارسال
         messages.sort(key=lambda m: m.get('sent_at', ''))
@@ -79,7 +79,7 @@ class Report:
                         existing['id']
                     )
                 )
-                conn.commit()
+                db_manager.commit(conn)
                 return cls(db_manager, existing['id'])
 
             # ایجاد گزارش جدید
@@ -98,7 +98,6 @@ class Report:
                     datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 )
             )
-            conn.commit()
 
             report_id = cursor.lastrowid
 
@@ -114,11 +113,11 @@ class Report:
                     f'گزارش جدید با شناسه {report_id} ثبت شد'
                 )
             )
-            conn.commit()
+            db_manager.commit(conn)
 
             return cls(db_manager, report_id)
         except Exception as e:
-            conn.rollback()
+            db_manager.rollback(conn)
             logger = logging.getLogger('chatogram.models.report')
             logger.error(f"Error creating report: {str(e)}")
             return None
@@ -159,7 +158,6 @@ class Report:
                     self.data['id']
                 )
             )
-            conn.commit()
 
             # لاگ تغییر وضعیت در admin_logs
             if admin_id:
@@ -174,7 +172,8 @@ class Report:
                         f'وضعیت گزارش {self.data["id"]} به {status} تغییر یافت'
                     )
                 )
-                conn.commit()
+
+            self.db_manager.commit(conn)
 
             self.data['status'] = status
             self.data['admin_notes'] = admin_notes
@@ -186,7 +185,7 @@ class Report:
 
             return True
         except Exception as e:
-            conn.rollback()
+            self.db_manager.rollback(conn)
             self.logger.error(f"Error updating report status: {str(e)}")
             return False
 
@@ -213,20 +212,11 @@ class Report:
                 (self.data['reported_id'],)
             )
 
-            # پایان دادن به تمام چت‌های فعال کاربر
-            cursor.execute(
-                """
-                UPDATE chats 
-                SET is_active = 0, ended_at = ?
-                WHERE (user1_id = ? OR user2_id = ?) AND is_active = 1
-                """,
-                (
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    self.data['reported_id'],
-                    self.data['reported_id']
-                )
-            )
-            conn.commit()
+            # پایان دادن به چت فعال کاربر در همان تراکنش
+            self.db_manager.end_all_active_chats(self.data['reported_id'], commit=False)
+
+            # خروج کاربر از صف انتظار چت تصادفی
+            self.db_manager.leave_waiting_pool(self.data['reported_id'])
 
             # لاگ مسدودسازی در admin_logs
             if admin_id:
@@ -241,11 +231,14 @@ class Report:
                         f'کاربر {self.data["reported_id"]} به دلیل تأیید گزارش {self.data["id"]} مسدود شد'
                     )
                 )
-                conn.commit()
+
+            self.db_manager.invalidate_users(self.data['reported_id'])
+
+            self.db_manager.commit(conn)
 
             return True
         except Exception as e:
-            conn.rollback()
+            self.db_manager.rollback(conn)
             self.logger.error(f"Error banning reported user: {str(e)}")
             return False
 
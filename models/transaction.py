@@ -73,12 +73,12 @@ class Transaction:
                     datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 )
             )
-            conn.commit()
+            db_manager.commit(conn)
 
             transaction_id = cursor.lastrowid
             return cls(db_manager, transaction_id)
         except Exception as e:
-            conn.rollback()
+            db_manager.rollback(conn)
             logger = logging.getLogger('chatogram.models.transaction')
             logger.error(f"Error creating transaction: {str(e)}")
             return None
@@ -112,7 +112,7 @@ class Transaction:
                     self.data['id']
                 )
             )
-            conn.commit()
+            self.db_manager.commit(conn)
 
             self.data['status'] = status
             self.data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -126,7 +126,7 @@ class Transaction:
 
             return True
         except Exception as e:
-            conn.rollback()
+            self.db_manager.rollback(conn)
             self.logger.error(f"Error updating transaction status: {str(e)}")
             return False
 
@@ -159,14 +159,14 @@ class Transaction:
                     self.data['id']
                 )
             )
-            conn.commit()
+            self.db_manager.commit(conn)
 
             self.data['payment_info'] = payment_info
             self.data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
             return True
         except Exception as e:
-            conn.rollback()
+            self.db_manager.rollback(conn)
             self.logger.error(f"Error updating payment info: {str(e)}")
             return False
 
@@ -204,11 +204,12 @@ class Transaction:
                 "UPDATE users SET coins = ? WHERE id = ?",
                 (new_coins, self.data['user_id'])
             )
-            conn.commit()
+            self.db_manager.invalidate_users(self.data['user_id'])
+            self.db_manager.commit(conn)
 
             return True
         except Exception as e:
-            conn.rollback()
+            self.db_manager.rollback(conn)
             self.logger.error(f"Error updating user coins: {str(e)}")
             return False
 
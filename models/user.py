@@ -2,27 +2,34 @@ import time
 import logging
 from telebot import types
 from utils.validators import validate_name, validate_age, validate_bio
+from utils.profile_card_cache import ProfileCard, ProfileCardCache
 
 
 class User:
     """
     کلاس مدل کاربر
+
+    داده کاربر یک UserRecord فشرده است؛ logger در سطح کلاس تعریف شده تا ساخت
+    شیء برای هر ردیف هزینه‌ای جز دو ارجاع نداشته باشد.
     """
 
+    __slots__ = ('db_manager', 'data')
+
+    logger = logging.getLogger('chatogram.models.user')
+
+    # کارت‌های رندرشده پروفایل (مشترک بین همه اشیاء کاربر)
+    profile_cards = ProfileCardCache()
+
     def __init__(self, db_manager, telegram_id=None, user_data=None):
         """
         مقداردهی اولیه مدل کاربر
         """
         self.db_manager = db_manager
-        self.logger = logging.getLogger('chatogram.models.user')
 
         if user_data:
             self.data = user_data
         elif telegram_id:
-            self.data = self.db_manager.get_user_by_telegram_id(telegram_id)
-            if not self.data:
-                user_id = self.db_manager.add_user(telegram_id)
-                self.data = self.db_manager.get_user_by_telegram_id(telegram_id)
+            self.data = self.db_manager.get_or_create_user(telegram_id)
         else:
             self.data = None
 
@@ -57,13 +64,15 @@ class User:
             if not validate_bio(value):
                 return False
 
-        # به‌روزرسانی در دیتابیس
-        success = self.db_manager.update_user(self.data['id'], **{field: value})
+        # به‌روزرسانی در دیتابیس همراه با افزایش نسخه پروفایل (کارت قبلی در کش منسوخ می‌شود)
+        version = self.db_manager.update_profile(self.data['id'], field, value)
+        if version is None:
+            return False
 
-        if success:
-            self.data[field] = value
+        self.data[field] = value
+        self.data['profile_version'] = version
 
-        return success
+        return True
 
     def get_coins(self):
         """
@@ -120,6 +129,19 @@ class User:
 
         return self.db_manager.get_active_chat(self.data['id'])
 
+    def get_partner(self):
+        """
+        دریافت کاربر مقابل در چت فعال (از ستون partner_id ردیف کاربر)
+        """
+        if not self.data or not self.data.get('partner_id'):
+            return None
+
+        partner_data = self.db_manager.get_user_by_id(self.data['partner_id'])
+        if not partner_data:
+            return None
+
+        return User(self.db_manager, user_data=partner_data)
+
     def is_following(self, user_id):
         """
         بررسی دنبال کردن کاربر
@@ -161,15 +183,16 @@ class User:
         if not self.data:
             return False
 
-        conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        return self.db_manager.block_cache.has_blocked(self.data['id'], user_id)
 
-        cursor.execute(
-            "SELECT id FROM blocks WHERE blocker_id = ? AND blocked_id = ?",
-            (self.data['id'], user_id)
-        )
+    def get_relationship_flags(self, user_id):
+        """
+        دریافت همه وضعیت‌های رابطه با کاربر دیگر (دنبال کردن، لایک و بلاک در هر دو جهت)
+        """
+        if not self.data:
+            return None
 
-        return cursor.fetchone() is not None
+        return self.db_manager.get_relationship_flags(self.data['id'], user_id)
 
     def get_invite_code(self):
         """
@@ -195,6 +218,27 @@ class User:
             # ایجاد کد دعوت جدید
             return self.db_manager.create_invite(self.data['id'])
 
+    def get_profile_card(self):
+        """
+        دریافت کارت رندرشده پروفایل کاربر از کش
+
+        کلید کش شناسه کاربر و نسخه پروفایل است؛ کارت فقط برای ردیف‌هایی که ستون
+        profile_version را دارند در کش قرار می‌گیرد.
+        """
+        if not self.data:
+            return None
+
+        version = self.data.get('profile_version')
+        if version is None:
+            return ProfileCard(self.render_profile_text(), self.data.get('profile_pic'))
+
+        card = self.profile_cards.get(self.data['id'], version)
+        if card is None:
+            card = ProfileCard(self.render_profile_text(), self.data.get('profile_pic'))
+            self.profile_cards.put(self.data['id'], version, card)
+
+        return card
+
     def get_profile_text(self):
         """
         دریافت متن پروفایل کاربر
@@ -202,6 +246,12 @@ class User:
         if not self.data:
             return "پروفایل یافت نشد."
 
+        return self.get_profile_card().text
+
+    def render_profile_text(self):
+        """
+        ساخت متن پروفایل کاربر
+        """
         gender_text = {
             "male": "مرد 👨",
             "female": "زن 👩",
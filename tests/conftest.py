@@ -0,0 +1,7 @@
+import os
+import sys
+
+# ریشه مخزن برای import بسته‌ها و مقدار پیش‌فرض تنظیمات الزامی در محیط آزمون
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if not os.environ.get('ADMIN_IDS'):
+    os.environ['ADMIN_IDS'] = '0'
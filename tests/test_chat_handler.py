@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+import pytest
+from config.constants import MESSAGES
+from database.db_manager import DBManager
+from handlers.chat_handler import ChatHandler
+from models.user import User
+
+
+class Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(('send_message', chat_id, text))
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.sent.append(('edit_message_text', chat_id, text))
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'chat.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+def test_random_search_waits_then_connects(db_manager):
+    outbox = Outbox()
+    handler = ChatHandler(None, db_manager, None, outbox)
+    db_manager.get_or_create_users([1, 2])
+    db_manager.update_user(db_manager.get_user_by_telegram_id(2)['id'], gender='male')
+
+    handler._start_random_search(1, User(db_manager, 1), 'male', edit_message=SimpleNamespace(message_id=10))
+    assert outbox.sent == [
+        ('edit_message_text', 1, "🔄 در حال جستجو برای یک پسر...\nلطفاً صبر کنید."),
+        ('edit_message_text', 1, MESSAGES['random_chat_waiting']),
+    ]
+
+    # کاربر در صف دوباره وارد صف نمی‌شود
+    outbox.sent.clear()
+    handler._start_random_search(1, User(db_manager, 1), 'male', edit_message=SimpleNamespace(message_id=10))
+    assert outbox.sent == [('send_message', 1, MESSAGES['random_chat_already_waiting'])]
+
+    outbox.sent.clear()
+    handler._start_random_search(2, User(db_manager, 2), None)
+    assert outbox.sent == [
+        ('send_message', 2, MESSAGES['random_chat_start']),
+        ('send_message', 2, MESSAGES['random_chat_connected']),
+        ('send_message', 1, MESSAGES['random_chat_connected']),
+    ]
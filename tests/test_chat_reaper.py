@@ -0,0 +1,41 @@
+import time
+import pytest
+from database.db_manager import DBManager
+from utils.chat_reaper import ChatReaper
+
+
+class Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'reaper.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+def test_idle_waiting_users_are_evicted_and_notified(db_manager):
+    outbox = Outbox()
+    reaper = ChatReaper(db_manager, outbox)
+    db_manager.presence.on_idle = reaper.evict_idle_waiting
+    db_manager.presence.idle_timeout = 0.01
+
+    users = db_manager.get_or_create_users([1, 2])
+    assert db_manager.pair_random_partner(users[1]) is None
+
+    time.sleep(1.1)
+    conn = db_manager.get_connection()
+    db_manager.presence.flush(conn)
+
+    assert not db_manager.waiting_pool.is_waiting(users[1]['id'])
+    assert [chat_id for chat_id, _ in outbox.sent] == [1]
+
+    # کاربر فعال با کاربر بی‌فعالیت جفت نمی‌شود
+    db_manager.presence.idle_timeout = 300
+    assert db_manager.pair_random_partner(users[2]) is None
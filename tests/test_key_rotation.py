@@ -0,0 +1,28 @@
+import pytest
+from database.db_manager import DBManager
+from database.key_rotation import MessageReencryptor
+from utils import crypto
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'rotation.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+def test_malformed_row_is_counted_as_failed(db_manager):
+    conn = db_manager.get_connection()
+    conn.executemany(
+        "INSERT INTO messages (chat_id, sender_id, message_type, content) VALUES (1, 1, 'text', ?)",
+        [(b'\xff\x00',), (b'',), (crypto.key_ring.encrypt(b'hello'),)]
+    )
+    conn.commit()
+
+    reencryptor = MessageReencryptor(db_manager.db_name, pause=0)
+    reencryptor.run(conn)
+
+    progress = reencryptor.get_progress()
+    assert progress['done']
+    assert progress['failed'] == 2
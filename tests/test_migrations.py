@@ -0,0 +1,32 @@
+import sqlite3
+from database.migrations import SCHEMA_VERSION, apply_schema_migrations
+
+
+def test_legacy_transactions_upgrade(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'legacy.db'))
+    # جدول تراکنش‌های ساخته‌شده با DBManager.setup قدیمی
+    conn.execute("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            amount INTEGER,
+            transaction_type TEXT,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO transactions (user_id, amount, transaction_type) VALUES (1, 10, 'gift')")
+    conn.commit()
+
+    assert apply_schema_migrations(conn) == SCHEMA_VERSION
+
+    status, updated_at, created_at = conn.execute(
+        "SELECT status, updated_at, created_at FROM transactions WHERE id = 1"
+    ).fetchone()
+    assert status == 'completed'
+    assert updated_at == created_at
+
+    # تراکنش جدید مانند طرح تازه در وضعیت pending ثبت می‌شود
+    conn.execute("INSERT INTO transactions (user_id, amount, transaction_type) VALUES (1, 5, 'purchase')")
+    assert conn.execute("SELECT status FROM transactions WHERE id = 2").fetchone()[0] == 'pending'
+    conn.close()
@@ -0,0 +1,89 @@
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database.db_manager import DBManager
+
+
+def test_concurrent_pairing(tmp_path, users=500, requests=5000, workers=32, seed=1):
+    """
+    آزمون فشار جفت‌سازی همزمان
+
+    تعداد زیادی درخواست جفت‌سازی (جستجوی تصادفی، پایان چت و پذیرش درخواست چت
+    مستقیم) به صورت همزمان از چند نخ ارسال می‌شود و در پایان بررسی می‌شود که هیچ
+    کاربری در بیش از یک چت فعال نباشد و جدول جفت‌های حافظه با پایگاه داده یکسان باشد.
+    """
+    db_manager = DBManager(str(tmp_path / 'stress.db'))
+    db_manager.setup()
+
+    rng = random.Random(seed)
+    genders = ['male', 'female', 'other', None]
+
+    user_rows = []
+    for telegram_id, user in db_manager.get_or_create_users(range(1, users + 1)).items():
+        db_manager.update_user(user['id'], gender=rng.choice(genders))
+        user_rows.append(db_manager.get_user_by_telegram_id(telegram_id))
+
+    barrier = threading.Barrier(workers)
+    counters = {'paired': 0, 'queued': 0, 'direct': 0, 'ended': 0}
+    counters_lock = threading.Lock()
+
+    def count(key):
+        with counters_lock:
+            counters[key] += 1
+
+    def worker(index):
+        local_rng = random.Random(seed + index)
+        barrier.wait()
+
+        for _ in range(requests // workers):
+            user = local_rng.choice(user_rows)
+            action = local_rng.random()
+
+            if action < 0.7:
+                gender = local_rng.choice(genders)
+                if db_manager.pair_random_partner(user, gender=gender):
+                    count('paired')
+                else:
+                    count('queued')
+            elif action < 0.85:
+                other = local_rng.choice(user_rows)
+                if db_manager.start_chat(user['id'], other['id']):
+                    count('direct')
+            else:
+                pairing = db_manager.chat_registry.get(user['telegram_id'])
+                if pairing and db_manager.end_chat(pairing.chat_id):
+                    count('ended')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(worker, range(workers)))
+
+    conn = sqlite3.connect(db_manager.db_name)
+    try:
+        duplicates = conn.execute("""
+            SELECT user_id, COUNT(*) FROM (
+                SELECT user1_id AS user_id FROM chats WHERE is_active = 1
+                UNION ALL
+                SELECT user2_id FROM chats WHERE is_active = 1
+            ) GROUP BY user_id HAVING COUNT(*) > 1
+        """).fetchall()
+        active_chats = conn.execute("SELECT COUNT(*) FROM chats WHERE is_active = 1").fetchone()[0]
+        # چت فعال و هم‌صحبت ذخیره‌شده در ردیف کاربران باید با جدول chats یکسان باشد
+        mismatched = conn.execute("""
+            SELECT u.id FROM users u
+            LEFT JOIN chats c ON c.is_active = 1 AND (c.user1_id = u.id OR c.user2_id = u.id)
+            WHERE u.active_chat_id IS NOT c.id
+               OR u.partner_id IS NOT CASE WHEN c.user1_id = u.id THEN c.user2_id ELSE c.user1_id END
+        """).fetchall()
+    finally:
+        conn.close()
+
+    db_manager.close()
+
+    assert not duplicates, f"Users in more than one active chat: {duplicates[:10]}"
+    assert not mismatched, f"Users with a stale active_chat_id/partner_id: {mismatched[:10]}"
+    assert active_chats == len(db_manager.chat_registry), \
+        f"Registry has {len(db_manager.chat_registry)} chats, database has {active_chats}"
+
+    # هر نوع درخواست واقعاً اجرا شده است
+    assert counters['paired'] and counters['queued'] and counters['ended']
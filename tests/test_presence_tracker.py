@@ -0,0 +1,57 @@
+import sqlite3
+import pytest
+from database.db_manager import DBManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'presence.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+def read_online(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return dict(conn.execute("SELECT telegram_id, is_online FROM users").fetchall())
+    finally:
+        conn.close()
+
+
+def test_failed_flush_is_retried(db_manager):
+    presence = db_manager.presence
+    db_manager.get_or_create_users([1, 2])
+    db_manager.get_connection().execute("UPDATE users SET is_online = CASE telegram_id WHEN 1 THEN 0 ELSE 1 END")
+    db_manager.commit()
+
+    presence.touch(1)
+    presence.mark_offline(2)
+
+    # نوشتن روی اتصال فقط‌خواندنی شکست می‌خورد (مانند database is locked)
+    read_only = sqlite3.connect(f"file:{db_manager.db_name}?mode=ro", uri=True)
+    presence.flush(read_only)
+    read_only.close()
+    assert read_online(db_manager.db_name) == {1: 0, 2: 1}
+
+    conn = sqlite3.connect(db_manager.db_name)
+    presence.flush(conn)
+    conn.close()
+    assert read_online(db_manager.db_name) == {1: 1, 2: 0}
+
+
+def test_newer_state_wins_over_failed_flush(db_manager):
+    presence = db_manager.presence
+    db_manager.get_or_create_users([1])
+
+    presence.touch(1)
+    read_only = sqlite3.connect(f"file:{db_manager.db_name}?mode=ro", uri=True)
+    presence.flush(read_only)
+    read_only.close()
+
+    # کاربر پیش از دور بعدی آفلاین شده است؛ وضعیت آنلاین قدیمی دوباره نوشته نمی‌شود
+    presence.mark_offline(1)
+    conn = sqlite3.connect(db_manager.db_name)
+    presence.flush(conn)
+    conn.close()
+    assert read_online(db_manager.db_name) == {1: 0}
@@ -0,0 +1,218 @@
+import re
+import sqlite3
+import pytest
+from collections import namedtuple
+from contextlib import contextmanager
+from admin.stats_admin import StatsAdmin
+from database.db_manager import DBManager
+from models.chat import Chat
+from models.report import Report
+from models.user import User
+
+
+# کوئری ثبت‌شده؛ allow_scan فقط برای تجمیع‌ها و خروجی‌های کل جدول که پیمایش کامل ذاتی آن‌هاست
+PlannedQuery = namedtuple('PlannedQuery', ['name', 'sql', 'allow_scan'])
+
+# متدهایی که پیمایش برای آن‌ها مجاز است
+ALLOW_SCAN = {
+    # پیمایش ایندکس جزئی چت‌های فعال (فقط ردیف‌های is_active = 1)
+    'DBManager.load_active_chats',
+    'StatsAdmin._get_active_chats_count',
+    # شمارش و تجمیع کل جدول
+    'StatsAdmin._get_total_users',
+    'StatsAdmin._get_total_chats',
+    'StatsAdmin._get_total_messages',
+    'StatsAdmin._get_total_transactions',
+    'StatsAdmin._get_average_chat_duration',
+    'StatsAdmin._get_total_coins',
+    'StatsAdmin._get_coins_spent',
+    # خروجی کامل جداول برای ادمین
+    'StatsAdmin.export_users_excel',
+    'StatsAdmin.export_transactions_excel',
+    'StatsAdmin.export_chats_excel',
+}
+
+# دستورهایی که طرح اجرای آن‌ها بررسی می‌شود (BEGIN، COMMIT و PRAGMA نادیده گرفته می‌شوند)
+PLANNED_STATEMENT = re.compile(r'^(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+# پیمایش جدول یا کل یک ایندکس (SCAN ... USING INDEX نیز پیمایش کامل است)
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)')
+
+
+class QueryRecorder:
+    """
+    ثبت کوئری‌های واقعی اجراشده با set_trace_callback
+
+    به جای نگهداری نسخه دستی کوئری‌ها، متدهای واقعی DBManager، مدل‌ها و آمار ادمین
+    اجرا شده و دستورهای SQL آن‌ها (با مقادیر جایگذاری‌شده) به نام متد ثبت می‌شوند.
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه ثبت‌کننده
+        """
+        self.queries = []
+        self._seen = set()
+        self._name = None
+
+    def attach(self, *connections):
+        """
+        شروع ثبت دستورهای اتصال‌ها
+        """
+        for conn in connections:
+            conn.set_trace_callback(self._trace)
+
+    @contextmanager
+    def record(self, name):
+        """
+        ثبت دستورهای اجراشده در این بلوک به نام متد
+        """
+        self._name = name
+        try:
+            yield
+        finally:
+            self._name = None
+
+    def _trace(self, statement):
+        if self._name is None:
+            return
+
+        sql = ' '.join(statement.split())
+        if not PLANNED_STATEMENT.match(sql) or (self._name, sql) in self._seen:
+            return
+
+        self._seen.add((self._name, sql))
+        self.queries.append(PlannedQuery(self._name, sql, self._name in ALLOW_SCAN))
+
+
+class _NullBot:
+    """
+    ربات بدون ارسال برای اجرای متدهای آمار و خروجی ادمین
+    """
+
+    class _Message:
+        message_id = 0
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._Message()
+
+
+def record_queries(db_manager):
+    """
+    اجرای مسیرهای پرتکرار روی یک پایگاه داده نمونه و ثبت کوئری‌های آن‌ها
+    """
+    recorder = QueryRecorder()
+    recorder.attach(db_manager.get_connection(), db_manager.get_read_connection())
+
+    def run(name, call, *args, **kwargs):
+        # حافظه‌های نهان خالی می‌شوند تا کوئری پایگاه داده واقعاً اجرا شود
+        db_manager.user_cache.clear()
+        db_manager.block_cache.invalidate()
+        with recorder.record(name):
+            return call(*args, **kwargs)
+
+    users = run('DBManager.get_or_create_users', db_manager.get_or_create_users, [1, 2, 3, 4])
+    user1, user2, user3, user4 = (users[telegram_id] for telegram_id in (1, 2, 3, 4))
+
+    run('DBManager.get_or_create_user', db_manager.get_or_create_user, 5, 'user5')
+    run('DBManager.get_user_by_telegram_id', db_manager.get_user_by_telegram_id, 1)
+    run('DBManager.get_user_by_id', db_manager.get_user_by_id, user1['id'])
+    run('DBManager.load_user_text', db_manager.load_user_text, user1['id'])
+    run('DBManager.update_user', db_manager.update_user, user1['id'], display_name='x', gender='female', age=25)
+    run('DBManager.update_profile', db_manager.update_profile, user1['id'], 'bio', 'x')
+
+    chat_id = run('DBManager.start_chat', db_manager.start_chat, user1['id'], user2['id'])
+    run('DBManager.get_active_chat', db_manager.get_active_chat, user1['id'])
+    run('DBManager.get_chat_partner', db_manager.get_chat_partner, chat_id, user1['id'])
+    run('Chat.get_messages', Chat(db_manager, chat_id).get_messages)
+    run('DBManager.load_active_chats', db_manager.load_active_chats)
+    run('DBManager.end_chat', db_manager.end_chat, chat_id)
+
+    chat_id = db_manager.start_chat(user1['id'], user2['id'])
+    run('DBManager.end_all_active_chats', db_manager.end_all_active_chats, user1['id'])
+
+    run('DBManager.get_report_count', db_manager.get_report_count, user1['id'])
+    run('DBManager.pair_random_partner', db_manager.pair_random_partner, user3)
+    run('DBManager.pair_random_partner', db_manager.pair_random_partner, user4)
+    run('DBManager.search_users', db_manager.search_users,
+        {'gender': 'female', 'city': 'تهران', 'min_age': 18, 'max_age': 30}, user2['id'])
+
+    run('DBManager.add_coins', db_manager.add_coins, user1['id'], 10, 'purchase', 'x')
+    run('DBManager.use_coins', db_manager.use_coins, user1['id'], 5, 'chat', 'x')
+    run('DBManager.toggle_follow', db_manager.toggle_follow, user1['id'], user2['id'])
+    run('DBManager.toggle_like', db_manager.toggle_like, user1['id'], user2['id'])
+    run('DBManager.toggle_block', db_manager.toggle_block, user1['id'], user3['id'])
+    run('BlockCache.get_excluded_ids', db_manager.block_cache.get_excluded_ids, user1['id'])
+    run('DBManager.get_relationship_flags', db_manager.get_relationship_flags, user1['id'], user2['id'])
+    run('DBManager.get_relationship_flags_many', db_manager.get_relationship_flags_many,
+        user1['id'], [user2['id'], user3['id']])
+
+    user = User(db_manager, user_data=db_manager.get_user_by_id(user1['id']))
+    invite_code = run('User.get_invite_code', user.get_invite_code)
+    run('DBManager.register_invite', db_manager.register_invite, invite_code, user4['id'])
+
+    report = run('Report.create', Report.create, db_manager, user2['id'], user1['id'], 'spam')
+    run('Report.update_status', report.update_status, 'approved', admin_id=1)
+
+    with recorder.record('MessageJournal._write_batch'):
+        db_manager.message_journal._write_batch(db_manager.get_connection(), [(chat_id, user1['id'], 'text', 'x')])
+    with recorder.record('MessageReencryptor.run'):
+        db_manager.reencryptor.run(db_manager.get_connection())
+
+    # آمار و خروجی‌های پنل ادمین
+    stats_admin = StatsAdmin(_NullBot(), db_manager, None)
+    for name in sorted(dir(stats_admin)):
+        if name.startswith('_get_') or name.startswith('export_'):
+            method = getattr(stats_admin, name)
+            args = (0,) if name.startswith('export_') else ()
+            run(f'StatsAdmin.{name}', method, *args)
+
+    return recorder.queries
+
+
+def explain(conn, planned):
+    """
+    دریافت خطوط طرح اجرای یک کوئری
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {planned.sql}").fetchall()
+    return [row[3] for row in rows]
+
+
+@pytest.fixture(scope='module')
+def recorded(tmp_path_factory):
+    """
+    پایگاه داده موقت با طرح کامل (جداول و مهاجرت‌ها) و کوئری‌های ثبت‌شده مسیرهای پرتکرار
+    """
+    db_manager = DBManager(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+    db_manager.setup()
+    try:
+        queries = record_queries(db_manager)
+    finally:
+        db_manager.close()
+
+    conn = sqlite3.connect(db_manager.db_name)
+    yield conn, queries
+    conn.close()
+
+
+def test_hot_queries_use_indexes(recorded):
+    """
+    هیچ کوئری خارج از ALLOW_SCAN به پیمایش کامل جدول یا ایندکس نمی‌رسد
+    """
+    conn, queries = recorded
+    failures = []
+
+    for planned in queries:
+        plan = explain(conn, planned)
+        if not planned.allow_scan and any(FULL_SCAN.match(detail) for detail in plan):
+            failures.append(f"{planned.name}: {planned.sql}\n    {' | '.join(plan)}")
+
+    assert not failures, f"{len(failures)} queries fall back to a full scan:\n" + '\n'.join(failures)
+
+
+def test_allow_scan_entries_are_recorded(recorded):
+    """
+    هر متد فهرست ALLOW_SCAN واقعاً اجرا و ثبت شده است (فهرست کهنه نمی‌شود)
+    """
+    _, queries = recorded
+    assert ALLOW_SCAN <= {planned.name for planned in queries}
@@ -0,0 +1,65 @@
+import pytest
+from database.db_manager import DBManager
+from handlers.search_handler import SearchHandler
+
+
+class Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text, kwargs.get('reply_markup')))
+
+    def send_photo(self, chat_id, photo, **kwargs):
+        self.sent.append((chat_id, kwargs.get('caption'), kwargs.get('reply_markup')))
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'search.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+def test_search_result_reuses_cached_card(db_manager):
+    outbox = Outbox()
+    handler = SearchHandler(None, db_manager, None, outbox)
+
+    users = db_manager.get_or_create_users([1, 2, 3])
+    for telegram_id in (2, 3):
+        db_manager.update_profile(users[telegram_id]['id'], 'display_name', f'user{telegram_id}')
+
+    results = db_manager.search_users({}, users[1]['id'])
+    assert len(results) == 2
+
+    handler.show_search_result(1, results, 0)
+    handler.show_search_result(1, db_manager.search_users({}, users[1]['id']), 0)
+
+    (_, first_text, first_markup), (_, second_text, second_markup) = outbox.sent
+    assert first_text == second_text
+    # کیبورد همان موقعیت از کش کارت برگردانده می‌شود
+    assert first_markup is second_markup
+
+    # پایان نتایج
+    handler.show_search_result(1, results, len(results))
+    assert outbox.sent[-1][1] == "پایان نتایج جستجو."
+
+
+def test_search_prefetches_relationship_flags(db_manager):
+    handler = SearchHandler(None, db_manager, None, Outbox())
+
+    users = db_manager.get_or_create_users([1, 2, 3])
+    db_manager.toggle_like(users[1]['id'], users[2]['id'])
+    db_manager.toggle_follow(users[3]['id'], users[1]['id'])
+
+    results = db_manager.search_users({}, users[1]['id'])
+    handler.prefetch_relationship_flags(1, users[1]['id'], results)
+
+    flags = handler.search_flags[1]
+    assert flags == {
+        result['id']: db_manager.get_relationship_flags(users[1]['id'], result['id'])
+        for result in results
+    }
+    assert flags[users[2]['id']]['liked']
+    assert flags[users[3]['id']]['followed_by']
@@ -0,0 +1,81 @@
+import time
+import pytest
+from database.db_manager import DBManager
+from utils.outbound_queue import OutboundQueue
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DBManager(str(tmp_path / 'unit.db'))
+    db_manager.setup()
+    yield db_manager
+    db_manager.close()
+
+
+@pytest.fixture
+def outbox(db_manager):
+    # نخ‌های کارگر شروع نمی‌شوند؛ فقط پیام‌های قرارگرفته در صف بررسی می‌شوند
+    return OutboundQueue(None, defer=db_manager.defer)
+
+
+def pair_and_notify(db_manager, outbox, user):
+    """
+    مسیر handle_random_chat: جفت‌سازی و اطلاع به هر دو طرف
+    """
+    partner = db_manager.pair_random_partner(user)
+    outbox.send_message(user['telegram_id'], 'connected')
+    outbox.send_message(partner['telegram_id'], 'connected')
+    return partner
+
+
+def test_committed_pairing_sends_after_commit(db_manager, outbox):
+    users = db_manager.get_or_create_users([1, 2])
+    assert db_manager.pair_random_partner(users[1]) is None
+
+    with db_manager.unit_of_work():
+        pair_and_notify(db_manager, outbox, users[2])
+        assert outbox.depth() == 0
+
+    assert outbox.depth() == 2
+    assert db_manager.get_active_chat(users[1]['id'])
+
+
+def test_rolled_back_pairing_sends_nothing(db_manager, outbox):
+    users = db_manager.get_or_create_users([1, 2])
+    assert db_manager.pair_random_partner(users[1]) is None
+
+    with db_manager.unit_of_work():
+        pair_and_notify(db_manager, outbox, users[2])
+        db_manager.mark_failed()
+
+    assert outbox.depth() == 0
+    assert db_manager.get_active_chat(users[1]['id']) is None
+    assert db_manager.chat_registry.get(1) is None
+
+
+def test_failed_unit_sends_nothing(db_manager, outbox):
+    users = db_manager.get_or_create_users([1, 2])
+    assert db_manager.pair_random_partner(users[1]) is None
+
+    with pytest.raises(RuntimeError):
+        with db_manager.unit_of_work():
+            pair_and_notify(db_manager, outbox, users[2])
+            raise RuntimeError('handler failed')
+
+    assert outbox.depth() == 0
+    assert db_manager.get_active_chat(users[1]['id']) is None
+
+
+def test_rolled_back_pairing_requeues_partner(db_manager, outbox):
+    users = db_manager.get_or_create_users([1, 2])
+    assert db_manager.pair_random_partner(users[1]) is None
+    queued_before = time.time()
+
+    with db_manager.unit_of_work():
+        pair_and_notify(db_manager, outbox, users[2])
+        assert not db_manager.waiting_pool.is_waiting(users[1]['id'])
+        db_manager.mark_failed()
+
+    assert db_manager.waiting_pool.is_waiting(users[1]['id'])
+    # زمان انتظار اولیه حفظ می‌شود
+    assert db_manager.waiting_pool.remove(users[1]['id']).enqueued_at < queued_before
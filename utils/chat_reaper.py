@@ -0,0 +1,149 @@
+import threading
+import logging
+import time
+from config.settings import CHAT_REAPER_INTERVAL, CHAT_REAPER_RETRY_DELAY
+from config.constants import MESSAGES
+from models.chat import Chat
+from utils.keyboard_generator import KeyboardGenerator
+
+
+class ChatReaper:
+    """
+    پایان خودکار چت‌های بی‌فعالیت
+
+    مهلت هر چت فعال در چرخ زمان‌سنج DBManager نگهداری و با هر پیام تمدید می‌شود؛
+    این نخ در هر تیک فقط چت‌های منقضی‌شده را دریافت کرده، همه را در یک تراکنش
+    پایان می‌دهد و پیام پایان چت را برای طرفین در صف ارسال قرار می‌دهد. کاربرانی
+    که در صف انتظار بی‌فعالیت (آفلاین) شوند نیز با اطلاع از صف خارج می‌شوند تا با
+    کاربر فعال جفت نشوند.
+    """
+
+    def __init__(self, db_manager, outbox, interval=CHAT_REAPER_INTERVAL, retry_delay=CHAT_REAPER_RETRY_DELAY):
+        """
+        مقداردهی اولیه پاک‌کننده چت‌ها
+        """
+        self.db_manager = db_manager
+        self.outbox = outbox
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.logger = logging.getLogger('chatogram.utils.chat_reaper')
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # آمار عملکرد
+        self.reaped = 0
+
+    def start(self):
+        """
+        شروع نخ پاک‌کننده
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self.db_manager.presence.on_idle = self.evict_idle_waiting
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='chat-reaper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        توقف نخ پاک‌کننده
+        """
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+
+        self.db_manager.presence.on_idle = None
+
+    def _run(self):
+        """
+        حلقه بررسی چت‌های منقضی
+        """
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.reap()
+            except Exception as e:
+                self.logger.error(f"Error reaping idle chats: {str(e)}")
+
+    def reap(self, now=None):
+        """
+        پایان دادن به چت‌هایی که مهلت بی‌فعالیتی آن‌ها گذشته است
+        """
+        expired = self.db_manager.chat_timers.advance(now)
+        if not expired:
+            return 0
+
+        recipients = []
+        conn = self.db_manager.get_connection()
+
+        # همه چت‌ها روی اتصال همین نخ و در یک تراکنش پایان می‌یابند
+        try:
+            for chat_id in expired:
+                telegram_ids = self.db_manager.chat_registry.get_telegram_ids(chat_id)
+                if not telegram_ids:
+                    continue
+
+                chat = Chat(self.db_manager, chat_data={'id': chat_id, 'is_active': True})
+                if chat.end(commit=False):
+                    recipients.extend(telegram_ids)
+
+            self.db_manager.commit(conn)
+        except Exception as e:
+            self.logger.error(f"Error ending idle chats: {str(e)}")
+            self.db_manager.rollback(conn)
+            self._retry(expired, now)
+            return 0
+
+        for telegram_id in recipients:
+            self.outbox.send_message(
+                telegram_id,
+                MESSAGES['chat_idle_ended'],
+                reply_markup=KeyboardGenerator.get_main_menu()
+            )
+
+        self.reaped += len(recipients) // 2
+        self.logger.info(f"Ended {len(recipients) // 2} idle chats")
+
+        return len(recipients) // 2
+
+    def evict_idle_waiting(self, telegram_ids):
+        """
+        خروج کاربران بی‌فعالیت از صف انتظار و اطلاع به آن‌ها
+
+        خروجی تعداد کاربران خارج‌شده از صف است.
+        """
+        evicted = 0
+
+        for telegram_id in telegram_ids:
+            # کاربر ممکن است در این فاصله دوباره فعال شده باشد
+            if self.db_manager.presence.is_online(telegram_id):
+                continue
+
+            if self.db_manager.waiting_pool.remove_by_telegram_id(telegram_id):
+                self.outbox.send_message(
+                    telegram_id,
+                    MESSAGES['random_chat_idle_removed'],
+                    reply_markup=KeyboardGenerator.get_main_menu()
+                )
+                evicted += 1
+
+        if evicted:
+            self.logger.info(f"Removed {evicted} idle users from the waiting pool")
+
+        return evicted
+
+    def _retry(self, chat_ids, now=None):
+        """
+        زمان‌بندی دوباره چت‌هایی که پایان آن‌ها ناموفق بوده است
+
+        مهلت این چت‌ها هنگام پیشروی چرخ برداشته شده است؛ چت‌هایی که پس از rollback
+        هنوز فعال‌اند با تأخیر کوتاه دوباره بررسی می‌شوند.
+        """
+        retry_at = (time.time() if now is None else now) + self.retry_delay
+
+        for chat_id in chat_ids:
+            if self.db_manager.chat_registry.get_telegram_ids(chat_id):
+                self.db_manager.chat_timers.schedule(chat_id, retry_at)
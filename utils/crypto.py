@@ -1,15 +1,17 @@
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import base64
-from config.settings import ENCRYPTION_KEY
+import hashlib
+import os
+from config.settings import ENCRYPTION_KEY, ENCRYPTION_KEYS, ENCRYPTION_KEY_ID, CIPHER_ENGINE
 
 
 # ایجاد کلید رمزنگاری بر اساس کلید امنیتی
-def get_encryption_key():
+def get_encryption_key(key=ENCRYPTION_KEY):
     """
     ایجاد کلید رمزنگاری از کلید امنیتی
     """
     # تبدیل کلید به یک رشته ۳۲ بایتی
-    key = ENCRYPTION_KEY
     if len(key) < 32:
         key = key.ljust(32, 'x')
     elif len(key) > 32:
@@ -20,24 +22,216 @@ def get_encryption_key():
     return base64.urlsafe_b64encode(key_bytes)
 
 
-# ایجاد نمونه Fernet
-fernet = Fernet(get_encryption_key())
+class FernetEngine:
+    """
+    موتور رمزنگاری Fernet (AES-CBC + HMAC)
+    """
+
+    version = 1
+    keyed_version = 3
+
+    def __init__(self, key):
+        """
+        مقداردهی اولیه با کلید base64 شده Fernet
+        """
+        self.fernet = Fernet(key)
+
+    def encrypt(self, data):
+        """
+        رمزگذاری بایت‌ها
+        """
+        return self.fernet.encrypt(data)
+
+    def decrypt(self, data):
+        """
+        رمزگشایی بایت‌ها
+        """
+        return self.fernet.decrypt(data)
+
+
+class AESGCMEngine:
+    """
+    موتور رمزنگاری AES-GCM با خروجی خام (بدون base64)
+    """
+
+    version = 2
+    keyed_version = 4
+    nonce_size = 12
+
+    def __init__(self, key):
+        """
+        مقداردهی اولیه با کلید base64 شده؛ کلید AES از آن مشتق می‌شود
+        """
+        key_material = base64.urlsafe_b64decode(key)
+        self.aesgcm = AESGCM(hashlib.sha256(b'chatogram-aes-gcm' + key_material).digest())
+
+    def encrypt(self, data):
+        """
+        رمزگذاری بایت‌ها (nonce + متن رمز شده)
+        """
+        nonce = os.urandom(self.nonce_size)
+        return nonce + self.aesgcm.encrypt(nonce, data, None)
+
+    def decrypt(self, data):
+        """
+        رمزگشایی بایت‌ها
+        """
+        return self.aesgcm.decrypt(data[:self.nonce_size], data[self.nonce_size:], None)
+
+
+ENGINES = {
+    'fernet': FernetEngine,
+    'aesgcm': AESGCMEngine
+}
+
+
+def get_engine(name=CIPHER_ENGINE, key=None):
+    """
+    ایجاد موتور رمزنگاری با نام
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown cipher engine: {name}")
+    return ENGINES[name](key or get_encryption_key())
+
+
+def parse_key_ring(keys=ENCRYPTION_KEYS):
+    """
+    تبدیل رشته «شناسه:کلید,...» به دیکشنری کلیدها (کلید ۰ همان ENCRYPTION_KEY است)
+    """
+    ring = {0: ENCRYPTION_KEY}
+
+    for entry in keys.split(','):
+        if not entry.strip():
+            continue
+        key_id, key = entry.split(':', 1)
+        ring[int(key_id)] = key.strip()
+
+    return ring
+
+
+class KeyRing:
+    """
+    حلقه کلیدهای رمزنگاری
+
+    قالب داده‌های رمز شده: [نسخه][شناسه کلید][داده رمز شده]. نسخه‌های ۱ و ۲
+    قدیمی و بدون شناسه کلید هستند (کلید ۰) و داده‌های متنی، توکن Fernet قدیمی‌اند.
+    """
+
+    def __init__(self, keys, active_key_id=ENCRYPTION_KEY_ID, engine_name=CIPHER_ENGINE):
+        """
+        مقداردهی اولیه حلقه کلیدها
+        """
+        if active_key_id not in keys:
+            raise ValueError(f"Active encryption key {active_key_id} is not in the key ring")
+        if not 0 <= active_key_id <= 255:
+            raise ValueError("Encryption key ids must be between 0 and 255")
+
+        self.keys = keys
+        self.active_key_id = active_key_id
+        self.engine_name = engine_name
+        self.engine_class = ENGINES[engine_name]
+        self._engines = {}
+
+        self._versions = {}
+        for cls in ENGINES.values():
+            self._versions[cls.version] = (cls, False)
+            self._versions[cls.keyed_version] = (cls, True)
+
+    def _engine(self, engine_class, key_id):
+        """
+        دریافت (یا ایجاد) موتور برای یک کلید
+        """
+        engine = self._engines.get((engine_class, key_id))
+        if engine is None:
+            if key_id not in self.keys:
+                raise ValueError(f"Unknown encryption key id: {key_id}")
+            engine = engine_class(get_encryption_key(self.keys[key_id]))
+            self._engines[(engine_class, key_id)] = engine
+        return engine
+
+    def encrypt(self, data):
+        """
+        رمزگذاری با موتور و کلید فعال
+        """
+        engine = self._engine(self.engine_class, self.active_key_id)
+        return bytes([engine.keyed_version, self.active_key_id]) + engine.encrypt(data)
+
+    def _parse(self, data):
+        """
+        جدا کردن کلاس موتور، شناسه کلید و داده از یک BLOB
+        """
+        version = data[0]
+        if version not in self._versions:
+            raise ValueError(f"Unknown cipher version: {version}")
+
+        engine_class, keyed = self._versions[version]
+        if keyed:
+            return engine_class, data[1], data[2:]
+        return engine_class, 0, data[1:]
+
+    def decrypt(self, data):
+        """
+        رمزگشایی داده با موتور و کلید مشخص‌شده در سرآیند آن
+        """
+        if isinstance(data, str):
+            # پیام‌های قدیمی: توکن Fernet به صورت متن با کلید ۰
+            return self._engine(FernetEngine, 0).decrypt(data.encode('utf-8'))
+
+        engine_class, key_id, payload = self._parse(bytes(data))
+        return self._engine(engine_class, key_id).decrypt(payload)
+
+    def is_current(self, data):
+        """
+        بررسی اینکه داده با موتور و کلید فعال رمز شده است
+        """
+        if isinstance(data, str):
+            return False
+
+        engine_class, key_id, _ = self._parse(bytes(data))
+        return engine_class is self.engine_class and key_id == self.active_key_id
+
+
+key_ring = KeyRing(parse_key_ring())
+
+# ایجاد نمونه Fernet (کلید ۰، برای سازگاری با کدهای قدیمی)
+fernet = key_ring._engine(FernetEngine, 0).fernet
 
 
 def encrypt(data):
     """
     رمزگذاری داده
+
+    خروجی به صورت BLOB است و با نسخه موتور و شناسه کلید فعال شروع می‌شود.
     """
     if isinstance(data, str):
         data = data.encode('utf-8')
-    return fernet.encrypt(data).decode('utf-8')
+    return key_ring.encrypt(data)
 
 
 def decrypt(data):
     """
     رمزگشایی داده
     """
-    if isinstance(data, str):
-        data = data.encode('utf-8')
-    return fernet.decrypt(data).decode('utf-8')
+    return key_ring.decrypt(data).decode('utf-8')
+
 
+def encrypt_many(items):
+    """
+    رمزگذاری دسته‌ای داده‌ها
+    """
+    return [encrypt(item) for item in items]
+
+
+def decrypt_many(items):
+    """
+    رمزگشایی دسته‌ای داده‌ها
+
+    برای مواردی که رمزگشایی نشوند None برگردانده می‌شود.
+    """
+    results = []
+    for item in items:
+        try:
+            results.append(decrypt(item))
+        except Exception:
+            results.append(None)
+    return results
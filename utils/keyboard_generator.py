@@ -141,16 +141,23 @@ class KeyboardGenerator:
         return markup
 
     @staticmethod
-    def get_user_profile_actions(user_id):
+    def get_user_profile_actions(user_id, flags=None):
         """
         ایجاد کیبورد اکشن‌های پروفایل کاربر
+
+        در صورت دادن flags (وضعیت‌های رابطه بیننده با کاربر) متن دکمه‌ها وضعیت فعلی را نشان می‌دهد.
         """
+        flags = flags or {}
         markup = types.InlineKeyboardMarkup(row_width=2)
 
+        like_text = "❤️ لایک شده" if flags.get('liked') else "❤️ لایک پروفایل"
+        follow_text = "👁 دنبال شده" if flags.get('following') else "👁 دنبال کردن"
+        block_text = "⛔ بلاک شده" if flags.get('blocked') else "⛔ بلاک کردن"
+
         chat_request = types.InlineKeyboardButton("💬 درخواست چت", callback_data=f"chat_request_{user_id}")
-        like_profile = types.InlineKeyboardButton("❤️ لایک پروفایل", callback_data=f"like_profile_{user_id}")
-        follow_user = types.InlineKeyboardButton("👁 دنبال کردن", callback_data=f"follow_user_{user_id}")
-        block_user = types.InlineKeyboardButton("⛔ بلاک کردن", callback_data=f"block_user_{user_id}")
+        like_profile = types.InlineKeyboardButton(like_text, callback_data=f"like_profile_{user_id}")
+        follow_user = types.InlineKeyboardButton(follow_text, callback_data=f"follow_user_{user_id}")
+        block_user = types.InlineKeyboardButton(block_text, callback_data=f"block_user_{user_id}")
         report_user = types.InlineKeyboardButton("🚩 گزارش تخلف", callback_data=f"report_user_{user_id}")
         back = types.InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_search")
 
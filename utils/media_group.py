@@ -0,0 +1,114 @@
+import threading
+import logging
+from telebot import types
+from config.settings import MEDIA_GROUP_DELAY
+
+
+# نگاشت نوع محتوا به کلاس InputMedia متناظر
+INPUT_MEDIA_TYPES = {
+    'photo': types.InputMediaPhoto,
+    'video': types.InputMediaVideo,
+    'document': types.InputMediaDocument,
+    'audio': types.InputMediaAudio
+}
+
+
+def get_file_unique_id(message):
+    """
+    دریافت file_unique_id فایل پیام (در صورت وجود)
+    """
+    if message.content_type == 'photo':
+        return message.photo[-1].file_unique_id
+
+    media = getattr(message, message.content_type, None)
+    return getattr(media, 'file_unique_id', None)
+
+
+def split_media_group(messages):
+    """
+    جدا کردن پیام‌های قابل ارسال در آلبوم از سایر پیام‌ها
+
+    send_media_group حداقل دو عضو می‌خواهد؛ اگر کمتر از دو پیام قابل گروه‌بندی
+    باشد، همه پیام‌ها به صورت جداگانه ارسال می‌شوند.
+    """
+    grouped = [message for message in messages if message.content_type in INPUT_MEDIA_TYPES]
+    if len(grouped) < 2:
+        return [], list(messages)
+
+    return grouped, [message for message in messages if message.content_type not in INPUT_MEDIA_TYPES]
+
+
+def build_input_media(messages):
+    """
+    ساخت لیست InputMedia از پیام‌های یک آلبوم بدون آپلود مجدد فایل‌ها
+    """
+    media = []
+
+    for message in messages:
+        media_class = INPUT_MEDIA_TYPES.get(message.content_type)
+        if not media_class:
+            continue
+
+        if message.content_type == 'photo':
+            file_id = message.photo[-1].file_id
+        else:
+            file_id = getattr(message, message.content_type).file_id
+
+        media.append(media_class(
+            file_id,
+            caption=message.caption,
+            caption_entities=message.caption_entities
+        ))
+
+    return media
+
+
+class MediaGroupCollector:
+    """
+    جمع‌آوری پیام‌های یک آلبوم (media_group_id) برای ارسال در یک فراخوانی
+    """
+
+    def __init__(self, on_flush, delay=MEDIA_GROUP_DELAY):
+        """
+        مقداردهی اولیه جمع‌آورنده
+
+        on_flush(messages, context) پس از پایان مهلت جمع‌آوری فراخوانی می‌شود.
+        """
+        self.on_flush = on_flush
+        self.delay = delay
+        self.logger = logging.getLogger('chatogram.utils.media_group')
+
+        self._lock = threading.Lock()
+        self._groups = {}
+
+    def add(self, media_group_id, message, context):
+        """
+        افزودن پیام به آلبوم در حال جمع‌آوری
+        """
+        with self._lock:
+            group = self._groups.get(media_group_id)
+            if group is None:
+                group = self._groups[media_group_id] = ([], context)
+
+                timer = threading.Timer(self.delay, self._flush, args=(media_group_id,))
+                timer.daemon = True
+                timer.start()
+
+            group[0].append(message)
+
+    def _flush(self, media_group_id):
+        """
+        ارسال آلبوم جمع‌آوری‌شده
+        """
+        with self._lock:
+            messages, context = self._groups.pop(media_group_id, ([], None))
+
+        if not messages:
+            return
+
+        messages.sort(key=lambda m: m.message_id)
+
+        try:
+            self.on_flush(messages, context)
+        except Exception as e:
+            self.logger.error(f"Error flushing media group {media_group_id}: {str(e)}")
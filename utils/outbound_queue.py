@@ -0,0 +1,345 @@
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from telebot.apihelper import ApiTelegramException
+from config.settings import OUTBOUND_WORKERS, OUTBOUND_GLOBAL_RATE, OUTBOUND_PER_CHAT_RATE
+
+
+class TokenBucket:
+    """
+    سطل توکن برای محدودسازی نرخ ارسال
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        مقداردهی اولیه سطل با نرخ (توکن در ثانیه) و ظرفیت
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """
+        پر کردن سطل بر اساس زمان سپری‌شده
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self):
+        """
+        برداشتن یک توکن و برگرداندن مدت انتظار لازم (ثانیه)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def is_full(self):
+        """
+        بررسی پر بودن سطل (عدم ارسال اخیر)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+
+class OutboundQueue:
+    """
+    صف ارسال پیام‌ها به تلگرام با رعایت محدودیت نرخ
+
+    هر گیرنده صف مخصوص خود را دارد تا ترتیب پیام‌ها حفظ شود، در حالی که
+    گیرنده‌های مختلف به صورت موازی توسط نخ‌های کارگر سرویس‌دهی می‌شوند. پاسخ 429
+    فقط صف همان گیرنده را تا پایان retry_after متوقف می‌کند؛ اگر چند گیرنده مختلف
+    در بازه کوتاهی 429 بگیرند، محدودیت سراسری در نظر گرفته شده و همه ارسال‌ها متوقف می‌شوند.
+    """
+
+    MAX_RETRIES = 3
+
+    # تعداد گیرنده‌های متفاوت با پاسخ 429 در بازه GLOBAL_FLOOD_WINDOW (ثانیه) برای توقف سراسری
+    GLOBAL_FLOOD_CHATS = 3
+    GLOBAL_FLOOD_WINDOW = 1.0
+
+    def __init__(self, bot, workers=OUTBOUND_WORKERS, global_rate=OUTBOUND_GLOBAL_RATE,
+                 per_chat_rate=OUTBOUND_PER_CHAT_RATE, defer=None):
+        """
+        مقداردهی اولیه صف ارسال
+
+        defer (مانند DBManager.defer) افزودن پیام‌های درون واحد کار را تا پایان آن به
+        تعویق می‌اندازد تا پیام نوشتن‌هایی که برگردانده می‌شوند هرگز ارسال نشود.
+        """
+        self.bot = bot
+        self.defer = defer
+        self.workers = workers
+        self.per_chat_rate = per_chat_rate
+        self.logger = logging.getLogger('chatogram.utils.outbound_queue')
+
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._pending = {}
+        self._ready = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._paused_until = 0.0
+
+        # تعداد تلاش‌های مجدد پیام سر صف هر گیرنده و زمان آخرین 429 هر گیرنده
+        self._retries = {}
+        self._rate_limited_at = {}
+
+        # آمار عملکرد
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'throttled': 0,
+            'retry_after': 0,
+            'global_pauses': 0,
+            'total_lag': 0.0,
+            'max_lag': 0.0
+        }
+
+    def start(self):
+        """
+        شروع نخ‌های کارگر
+        """
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbound-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info(f"Outbound queue started with {self.workers} workers")
+
+    def stop(self, timeout=10):
+        """
+        ارسال پیام‌های باقی‌مانده و توقف نخ‌ها
+        """
+        deadline = time.monotonic() + timeout
+        while self.depth() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        for _ in self._threads:
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        self._threads = []
+        self.logger.info(f"Outbound queue stopped: {self.get_stats()}")
+
+    def enqueue(self, chat_id, method, *args, **kwargs):
+        """
+        افزودن یک فراخوانی API به صف گیرنده
+
+        درون واحد کار، پیام پس از ثبت تراکنش به صف اضافه می‌شود و با mark_failed یا
+        شکست commit حذف می‌شود.
+        """
+        if self.defer:
+            self.defer(lambda: self._enqueue(chat_id, method, args, kwargs))
+        else:
+            self._enqueue(chat_id, method, args, kwargs)
+
+    def _enqueue(self, chat_id, method, args, kwargs):
+        """
+        افزودن فراخوانی به صف FIFO گیرنده
+        """
+        item = (method, args, kwargs, time.monotonic())
+
+        with self._lock:
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                # گیرنده در حال سرویس نیست؛ آن را به صف آماده اضافه می‌کنیم
+                self._pending[chat_id] = deque([item])
+                self._ready.put(chat_id)
+            else:
+                pending.append(item)
+
+        with self._stats_lock:
+            self._stats['enqueued'] += 1
+
+    def send_message(self, chat_id, text, **kwargs):
+        """
+        ارسال پیام متنی از طریق صف
+        """
+        self.enqueue(chat_id, 'send_message', chat_id, text, **kwargs)
+
+    def send_photo(self, chat_id, photo, **kwargs):
+        """
+        ارسال عکس از طریق صف
+        """
+        self.enqueue(chat_id, 'send_photo', chat_id, photo, **kwargs)
+
+    def send_voice(self, chat_id, voice, **kwargs):
+        """
+        ارسال صدا از طریق صف
+        """
+        self.enqueue(chat_id, 'send_voice', chat_id, voice, **kwargs)
+
+    def send_sticker(self, chat_id, sticker, **kwargs):
+        """
+        ارسال استیکر از طریق صف
+        """
+        self.enqueue(chat_id, 'send_sticker', chat_id, sticker, **kwargs)
+
+    def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        """
+        کپی پیام در سمت سرور تلگرام از طریق صف
+        """
+        self.enqueue(chat_id, 'copy_message', chat_id, from_chat_id, message_id, **kwargs)
+
+    def send_media_group(self, chat_id, media, **kwargs):
+        """
+        ارسال آلبوم از طریق صف
+        """
+        self.enqueue(chat_id, 'send_media_group', chat_id, media, **kwargs)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        """
+        ویرایش متن پیام از طریق صف
+        """
+        self.enqueue(chat_id, 'edit_message_text', text, chat_id, message_id, **kwargs)
+
+    def depth(self):
+        """
+        تعداد پیام‌های در انتظار ارسال
+        """
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def get_stats(self):
+        """
+        دریافت آمار صف ارسال
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats['depth'] = self.depth()
+        stats['avg_lag'] = stats['total_lag'] / stats['sent'] if stats['sent'] else 0.0
+        return stats
+
+    def _chat_bucket(self, chat_id):
+        """
+        دریافت یا ایجاد سطل توکن یک چت
+        """
+        with self._lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, capacity=3)
+            return bucket
+
+    def _wait_for_tokens(self, chat_id):
+        """
+        انتظار تا مجاز شدن ارسال بر اساس محدودیت سراسری و محدودیت چت
+        """
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+
+        delay = max(self._global_bucket.reserve(), self._chat_bucket(chat_id).reserve())
+        if delay > 0:
+            with self._stats_lock:
+                self._stats['throttled'] += 1
+            time.sleep(delay)
+
+    def _run(self):
+        """
+        حلقه نخ کارگر
+        """
+        while True:
+            chat_id = self._ready.get()
+            if chat_id is None:
+                break
+
+            with self._lock:
+                item = self._pending[chat_id][0]
+
+            retry_after = self._deliver(chat_id, item)
+
+            with self._lock:
+                if retry_after:
+                    # پیام سر صف می‌ماند و فقط همین گیرنده تا پایان retry_after متوقف می‌شود
+                    self._resume_later(chat_id, retry_after)
+                    continue
+
+                self._retries.pop(chat_id, None)
+                pending = self._pending[chat_id]
+                pending.popleft()
+                if pending:
+                    self._ready.put(chat_id)
+                else:
+                    del self._pending[chat_id]
+                    bucket = self._chat_buckets.get(chat_id)
+                    if bucket and bucket.is_full():
+                        del self._chat_buckets[chat_id]
+
+    def _resume_later(self, chat_id, delay):
+        """
+        بازگرداندن گیرنده به صف آماده پس از مدت مشخص (بدون اشغال نخ کارگر)
+        """
+        timer = threading.Timer(delay, self._ready.put, (chat_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _is_global_flood(self, chat_id):
+        """
+        ثبت 429 گیرنده و تشخیص محدودیت سراسری (429 چند گیرنده مختلف در بازه کوتاه)
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._rate_limited_at[chat_id] = now
+            for key, limited_at in list(self._rate_limited_at.items()):
+                if now - limited_at > self.GLOBAL_FLOOD_WINDOW:
+                    del self._rate_limited_at[key]
+            return len(self._rate_limited_at) >= self.GLOBAL_FLOOD_CHATS
+
+    def _deliver(self, chat_id, item):
+        """
+        اجرای فراخوانی API
+
+        در صورت پاسخ 429 مدت retry_after برگردانده می‌شود تا پیام پس از آن دوباره
+        ارسال شود؛ در غیر این صورت (ارسال موفق یا خطای نهایی) صفر برگردانده می‌شود.
+        """
+        method, args, kwargs, enqueued_at = item
+        self._wait_for_tokens(chat_id)
+
+        try:
+            getattr(self.bot, method)(*args, **kwargs)
+
+            lag = time.monotonic() - enqueued_at
+            with self._stats_lock:
+                self._stats['sent'] += 1
+                self._stats['total_lag'] += lag
+                if lag > self._stats['max_lag']:
+                    self._stats['max_lag'] = lag
+            return 0
+        except ApiTelegramException as e:
+            attempt = self._retries.get(chat_id, 0)
+            if e.error_code != 429 or attempt >= self.MAX_RETRIES:
+                self.logger.error(f"Error in outbound {method} to {chat_id}: {str(e)}")
+            else:
+                retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+                self._retries[chat_id] = attempt + 1
+
+                with self._stats_lock:
+                    self._stats['retry_after'] += 1
+
+                if self._is_global_flood(chat_id):
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                    with self._stats_lock:
+                        self._stats['global_pauses'] += 1
+                    self.logger.warning(f"Global flood limit from Telegram, pausing all sends for {retry_after}s")
+                else:
+                    self.logger.warning(f"Rate limited by Telegram for {chat_id}, retrying after {retry_after}s")
+
+                return retry_after
+        except Exception as e:
+            self.logger.error(f"Error in outbound {method} to {chat_id}: {str(e)}")
+
+        with self._stats_lock:
+            self._stats['failed'] += 1
+        return 0
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+from config.settings import PROFILE_CARD_CACHE_SIZE
+
+
+class ProfileCard:
+    """
+    کارت رندرشده پروفایل یک کاربر
+
+    شامل متن Markdown، شناسه عکس پروفایل و کیبوردهای اینلاین آماده (به صورت JSON
+    سریال‌شده) است؛ نمایش پروفایل فقط یک جستجو در کش و یک فراخوانی API است.
+    """
+
+    __slots__ = ('text', 'photo', '_markups')
+
+    def __init__(self, text, photo=None):
+        """
+        مقداردهی اولیه کارت پروفایل
+        """
+        self.text = text
+        self.photo = photo
+        self._markups = {}
+
+    def get_markup(self, key, build):
+        """
+        دریافت کیبورد آماده کارت (در اولین درخواست با build ساخته و سریال می‌شود)
+        """
+        markup = self._markups.get(key)
+        if markup is None:
+            markup = build().to_json()
+            self._markups[key] = markup
+        return markup
+
+
+class ProfileCardCache:
+    """
+    کش کارت‌های پروفایل با کلید شناسه کاربر و نسخه پروفایل
+
+    هر ویرایش پروفایل ستون profile_version را افزایش می‌دهد؛ کارت نسخه قدیمی دیگر
+    استفاده نمی‌شود و با اولین نمایش نسخه جدید جایگزین می‌شود. برای هر کاربر فقط
+    آخرین نسخه در یک LRU محدود نگهداری می‌شود.
+    """
+
+    def __init__(self, max_size=PROFILE_CARD_CACHE_SIZE):
+        """
+        مقداردهی اولیه کش کارت‌ها
+        """
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._cards = OrderedDict()
+
+        # آمار عملکرد
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, version):
+        """
+        دریافت کارت نسخه مشخص پروفایل کاربر
+        """
+        with self._lock:
+            item = self._cards.get(user_id)
+            if item is None or item[0] != version:
+                self.misses += 1
+                return None
+
+            self._cards.move_to_end(user_id)
+            self.hits += 1
+            return item[1]
+
+    def put(self, user_id, version, card):
+        """
+        افزودن کارت به کش (کارت نسخه جدیدتر موجود جایگزین نمی‌شود)
+        """
+        with self._lock:
+            item = self._cards.get(user_id)
+            if item is not None and item[0] > version:
+                return
+
+            self._cards[user_id] = (version, card)
+            self._cards.move_to_end(user_id)
+
+            while len(self._cards) > self.max_size:
+                self._cards.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """
+        حذف کارت کاربر
+        """
+        with self._lock:
+            self._cards.pop(user_id, None)
+
+    def get_stats(self):
+        """
+        دریافت آمار کش
+        """
+        total = self.hits + self.misses
+        return {
+            'cards': len(self._cards),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._cards)
@@ -0,0 +1,128 @@
+import math
+import threading
+import time
+
+
+class TimerWheel:
+    """
+    چرخ زمان‌سنج سلسله‌مراتبی برای تعداد زیادی مهلت کلیددار
+
+    هر سطح ۶۴ خانه دارد و هر خانه سطح بالاتر ۶۴ برابر بازه سطح پایین‌تر را پوشش
+    می‌دهد؛ زمان‌بندی، لغو و پیشروی هر تیک O(1) سرشکن است. تمدید مهلت یک کلید
+    فقط مهلت آن را به‌روز می‌کند و زمان‌سنج هنگام رسیدن به خانه‌اش دوباره زمان‌بندی
+    می‌شود، بنابراین ثبت فعالیت‌های پرتکرار هزینه‌ای روی چرخ ندارد.
+    """
+
+    BITS = 6
+    SLOTS = 1 << BITS
+    MASK = SLOTS - 1
+
+    def __init__(self, tick=1.0, levels=4, now=None):
+        """
+        مقداردهی اولیه چرخ با طول تیک (ثانیه) و تعداد سطوح
+        """
+        self.tick = tick
+        self.levels = levels
+
+        self._lock = threading.Lock()
+        self._wheels = [[[] for _ in range(self.SLOTS)] for _ in range(levels)]
+        self._current = self._to_tick(time.time() if now is None else now)
+
+        # کلید -> [تیک مهلت، تیکی که زمان‌سنج فعلی با آن در چرخ قرار گرفته]
+        self._timers = {}
+
+    def _to_tick(self, timestamp):
+        """
+        تبدیل زمان به شماره تیک
+        """
+        return int(math.ceil(timestamp / self.tick))
+
+    def _insert(self, key, deadline):
+        """
+        قرار دادن زمان‌سنج در خانه مناسب سلسله‌مراتب
+        """
+        delta = max(deadline - self._current, 1)
+        level = (delta.bit_length() - 1) // self.BITS
+
+        if level >= self.levels:
+            # مهلت‌های خارج از بازه چرخ در آخرین سطح قرار گرفته و هنگام آبشار دوباره بررسی می‌شوند
+            level = self.levels - 1
+            target = self._current + (1 << (self.BITS * self.levels)) - 1
+        else:
+            # مهلت‌های گذشته در تیک بعدی بررسی می‌شوند
+            target = max(deadline, self._current + 1)
+
+        slot = (target >> (self.BITS * level)) & self.MASK
+        self._wheels[level][slot].append((key, deadline))
+
+    def schedule(self, key, timestamp):
+        """
+        زمان‌بندی یا تمدید مهلت یک کلید
+        """
+        deadline = self._to_tick(timestamp)
+
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] <= deadline:
+                # زمان‌سنج فعلی زودتر می‌رسد و در آن زمان دوباره زمان‌بندی می‌شود
+                timer[0] = deadline
+                return
+
+            self._timers[key] = [deadline, deadline]
+            self._insert(key, deadline)
+
+    def cancel(self, key):
+        """
+        لغو مهلت یک کلید (ورودی‌های باقی‌مانده در چرخ هنگام رسیدن نادیده گرفته می‌شوند)
+        """
+        with self._lock:
+            return self._timers.pop(key, None) is not None
+
+    def _process(self, entries, expired):
+        """
+        بررسی ورودی‌های یک خانه: منقضی، تمدیدشده یا قدیمی
+        """
+        for key, armed in entries:
+            timer = self._timers.get(key)
+            if timer is None or timer[1] != armed:
+                continue
+
+            if timer[0] <= self._current:
+                del self._timers[key]
+                expired.append(key)
+            else:
+                timer[1] = timer[0]
+                self._insert(key, timer[0])
+
+    def advance(self, timestamp=None):
+        """
+        پیشروی چرخ تا زمان داده‌شده و برگرداندن کلیدهای منقضی‌شده
+        """
+        target = self._to_tick(time.time() if timestamp is None else timestamp)
+        expired = []
+
+        with self._lock:
+            while self._current < target:
+                self._current += 1
+
+                # آبشار خانه‌های سطوح بالاتر هنگام چرخش کامل سطح پایین‌تر
+                for level in range(1, self.levels):
+                    if self._current & ((1 << (self.BITS * level)) - 1):
+                        break
+                    slot = (self._current >> (self.BITS * level)) & self.MASK
+                    entries = self._wheels[level][slot]
+                    self._wheels[level][slot] = []
+                    self._process(entries, expired)
+
+                slot = self._current & self.MASK
+                entries = self._wheels[0][slot]
+                self._wheels[0][slot] = []
+                self._process(entries, expired)
+
+        return expired
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def __len__(self):
+        return len(self._timers)